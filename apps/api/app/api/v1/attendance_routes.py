@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import Principal, require_roles
+from app.core.metrics import attendance_marks_total
+from app.db.models.attendance import AttendanceSession
+from app.db.session import get_db, get_routed_db
+from app.modules.attendance.buffer import mark_buffer
+from app.modules.attendance.qr import ExpiredQrToken, InvalidQrToken, qr_signer
+from app.modules.attendance.rollups import record_session
+from app.modules.attendance.sessions import as_utc, session_directory
+from app.modules.realtime.events import publish_session
+from app.schemas.attendance import (
+    MarkRequest,
+    MarkResponse,
+    QrCodeResponse,
+    SessionCreate,
+    SessionResponse,
+)
+
+router = APIRouter()
+
+staff_only = require_roles(["teacher", "principal"], claims_only=True)
+
+
+def check_session_access(principal: Principal, teacher_id: str) -> None:
+    """Teachers manage their own sessions; principals manage all of them"""
+    if principal.role != "principal" and principal.id != teacher_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your session")
+
+
+@router.post("/sessions", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
+def create_session(
+    request: SessionCreate,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Open an attendance session"""
+    starts_at = as_utc(request.starts_at) if request.starts_at else datetime.now(timezone.utc)
+    session = AttendanceSession(
+        class_id=request.class_id,
+        title=request.title,
+        teacher_id=principal.id,
+        starts_at=starts_at,
+        ends_at=starts_at + timedelta(minutes=request.duration_minutes),
+        is_open=True,
+    )
+    db.add(session)
+    record_session(db, session)
+    db.commit()
+    db.refresh(session)
+    session_directory.remember(session)
+    publish_session(session.class_id, session.id, True)
+    return session
+
+
+@router.get("/sessions", response_model=list[SessionResponse])
+def list_sessions(
+    class_id: Optional[str] = None,
+    limit: int = 50,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """List recent sessions; teachers only see their own"""
+    query = db.query(AttendanceSession)
+    if principal.role != "principal":
+        query = query.filter(AttendanceSession.teacher_id == principal.id)
+    if class_id:
+        query = query.filter(AttendanceSession.class_id == class_id)
+    return query.order_by(AttendanceSession.starts_at.desc()).limit(min(limit, 200)).all()
+
+
+@router.get("/sessions/{session_id}/qr", response_model=QrCodeResponse)
+def get_qr_code(
+    session_id: str,
+    response: Response,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Current QR code for an open session.
+    Codes rotate every ATTENDANCE_QR_ROTATE_SECONDS; poll again at `refresh_at`.
+    """
+    info = session_directory.get(db, session_id)
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    check_session_access(principal, info.teacher_id)
+    if not info.accepting_marks():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Session is closed")
+
+    token, refresh_at = qr_signer.mint(info.id)
+    response.headers["Cache-Control"] = "no-store"
+    return QrCodeResponse(
+        session_id=info.id,
+        token=token,
+        refresh_at=refresh_at,
+        rotate_seconds=qr_signer.rotate_seconds,
+    )
+
+
+@router.post(
+    "/sessions/{session_id}/mark",
+    response_model=MarkResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def mark_attendance(
+    session_id: str,
+    request: MarkRequest,
+    principal: Principal = Depends(require_roles(["student"], claims_only=True)),
+) -> Any:
+    """
+    Mark the caller present with a scanned QR code.
+    The code is verified without a database read; the mark is acknowledged
+    once it is in the local mark log and written to the database in the
+    next batch.
+    """
+    try:
+        token_session = qr_signer.verify(request.token)
+    except ExpiredQrToken as e:
+        attendance_marks_total.inc("expired")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except InvalidQrToken as e:
+        attendance_marks_total.inc("invalid")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    if token_session != session_id:
+        attendance_marks_total.inc("invalid")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid QR code")
+    if mark_buffer.is_closed(session_id):
+        attendance_marks_total.inc("closed")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Session is closed")
+
+    if await mark_buffer.mark(session_id, principal.id, datetime.now(timezone.utc)):
+        attendance_marks_total.inc("marked")
+        return MarkResponse(session_id=session_id, status="marked")
+    attendance_marks_total.inc("duplicate")
+    return MarkResponse(session_id=session_id, status="already_marked")
+
+
+@router.post("/sessions/{session_id}/close", response_model=SessionResponse)
+def close_session(
+    session_id: str,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Stop accepting marks for a session"""
+    session = db.get(AttendanceSession, session_id)
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    check_session_access(principal, str(session.teacher_id))
+
+    now = datetime.now(timezone.utc)
+    session.is_open = False
+    session.ends_at = min(as_utc(session.ends_at), now)
+    db.commit()
+    db.refresh(session)
+    session_directory.invalidate(session_id)
+    mark_buffer.close_session(session_id)
+    publish_session(session.class_id, session_id, False)
+    return session
@@ -1,102 +1,69 @@
-from datetime import timedelta
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password, get_password_hash, decode_access_token
-from app.db.session import get_db
+from app.core.hashing import password_hasher
+from app.core.metrics import auth_failures_total
+from app.core.rate_limit import login_throttle, rate_limit
+from app.core.revocation import TokenVersionState, token_versions
+from app.core.security import create_access_token, decode_access_token
+from app.core.sessions import RefreshFamily, session_store
+from app.db.session import SessionLocal, get_db
 from app.db.models.user import User
 from app.schemas.auth import (
     LoginRequest,
     RegisterRequest,
+    SessionResponse,
     TokenResponse,
     UserResponse,
     RefreshTokenRequest,
     UserMeResponse,
 )
-from app.core.dependencies import get_current_user
-
-router = APIRouter()
-
-
-@router.get("/health")
-async def auth_health_check():
-    """Health check endpoint for auth routes"""
-    return {"status": "healthy", "auth_version": "1.0.0"}
+from app.core.dependencies import Principal, get_current_principal, get_current_user, token_state
 
+logger = logging.getLogger(__name__)
 
-@router.post("/register", response_model=UserResponse)
-def register(
-    *,
-    db: Session = Depends(get_db),
-    request: RegisterRequest
-) -> Any:
-    """
-    Register a new user.
-    """
-    # Check if user already exists
-    user = db.query(User).filter(User.email == request.email).first()
-    if user:
-        raise HTTPException(
-            status_code=400,
-            detail="The user with this email already exists in the system.",
-        )
+router = APIRouter()
 
-    # Create new user
-    user = User(
-        email=request.email,
-        hashed_password=get_password_hash(request.password),
-        full_name=request.full_name,
-        role=request.role,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+# Per client IP, ahead of the per-account LoginThrottle
+login_rate_limit = rate_limit(
+    "login", settings.RATE_LIMIT_LOGIN_IP_BURST, settings.RATE_LIMIT_LOGIN_IP_PERIOD_SECONDS
+)
 
 
-@router.post("/login", response_model=TokenResponse)
-def login(
-    *,
-    db: Session = Depends(get_db),
-    response: Response,
-    request: LoginRequest
-) -> Any:
+def issue_tokens(family: RefreshFamily) -> tuple[str, str]:
     """
-    OAuth2 compatible token login, get an access token for future requests.
-    Sets both access token and refresh token as httpOnly cookies.
+    Create the (access, refresh) token pair for a session. The refresh token
+    names its family and token id; only the family's current id is accepted.
     """
-    user = db.query(User).filter(User.email == request.email).first()
-    if not user or not verify_password(request.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Incorrect email or password",
-        )
-
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User account is disabled",
-        )
-
-    # Create access token
+    now = int(time.time())
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=str(user.id),
+        subject=family.user_id,
         expires_delta=access_token_expires,
-        data={"role": user.role}
+        data={"role": family.role, "ver": family.token_version},
+        now=now,
     )
 
-    # Create refresh token
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     refresh_token = create_access_token(
-        subject=str(user.id),
+        subject=family.user_id,
         expires_delta=refresh_token_expires,
-        data={"type": "refresh"}
+        data={"type": "refresh", "fam": family.id, "jti": family.current},
+        now=now,
     )
+    return access_token, refresh_token
+
 
+def set_auth_cookies(response: Response, access_token: str, refresh_token: str, role: str) -> None:
+    """Set the access token, refresh token and user_role cookies"""
     # Set access token cookie
     response.set_cookie(
         key=settings.COOKIE_NAME,
@@ -122,7 +89,7 @@ def login(
     # Set user_role cookie (not httpOnly, accessible to JS for redirects)
     response.set_cookie(
         key="user_role",
-        value=user.role,
+        value=role,
         httponly=False,  # Not httpOnly so JS can read it for redirects
         max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         expires=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
@@ -130,17 +97,9 @@ def login(
         samesite="lax",
     )
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-    }
 
-
-@router.post("/logout")
-def logout(response: Response) -> Any:
-    """
-    Logout user by clearing all auth cookies.
-    """
+def clear_auth_cookies(response: Response) -> None:
+    """Clear all auth cookies"""
     # Clear access token cookie
     response.delete_cookie(
         key=settings.COOKIE_NAME,
@@ -165,27 +124,27 @@ def logout(response: Response) -> Any:
         samesite="lax",
     )
 
-    return {"message": "Successfully logged out"}
-
 
-@router.post("/refresh", response_model=TokenResponse)
-def refresh_token(
-    *,
+def read_refresh_claims(
     request: Request,
-    response: Response,
-    refresh_request: Optional[RefreshTokenRequest] = None,
-    db: Session = Depends(get_db)
-) -> Any:
+    refresh_request: Optional[RefreshTokenRequest],
+    required: bool = True,
+) -> Optional[dict]:
     """
-    Refresh access token using refresh token from cookie or JSON body.
+    Extract and validate the refresh token from cookie or JSON body.
+    Returns its claims (sub, fam, jti), or None when `required` is off and
+    there is no usable token.
     """
     # Try to get refresh token from cookie first, then from JSON body
     refresh_token = request.cookies.get("refresh_token")
-    
+
     if not refresh_token and refresh_request:
         refresh_token = refresh_request.refresh_token
-    
+
     if not refresh_token:
+        if not required:
+            return None
+        auth_failures_total.inc("missing_refresh_token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token not found in cookie or body",
@@ -193,88 +152,199 @@ def refresh_token(
 
     try:
         payload = decode_access_token(refresh_token)
-        token_type = payload.get("type")
-        
-        if token_type != "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type",
-            )
-        
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
-        
     except Exception:
+        payload = {}
+    # Tokens issued before refresh-token families carry no fam/jti and are refused
+    if payload.get("type") != "refresh" or not all(payload.get(claim) for claim in ("sub", "fam", "jti")):
+        if not required:
+            return None
+        auth_failures_total.inc("invalid_refresh_token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token",
         )
+    return payload
+
+
+def load_token_state(user_id: str) -> Optional[TokenVersionState]:
+    db = SessionLocal()
+    try:
+        return token_state(user_id, db)
+    finally:
+        db.close()
+
+
+def me_response(current_user) -> dict:
+    """Serialize the current user for /me"""
+    return {
+        "id": str(current_user.id),
+        "email": current_user.email,
+        "full_name": current_user.full_name,
+        "is_active": current_user.is_active,
+        "role": current_user.role,
+    }
+
+
+@router.get("/health")
+async def auth_health_check():
+    """Health check endpoint for auth routes"""
+    return {"status": "healthy", "auth_version": "1.0.0"}
+
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+@router.post("/register", response_model=UserResponse)
+def register(
+    *,
+    db: Session = Depends(get_db),
+    request: RegisterRequest
+) -> Any:
+    """
+    Register a new user.
+    """
+    # Check if user already exists
+    user = db.query(User).filter(User.email == request.email).first()
+    if user:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            status_code=400,
+            detail="The user with this email already exists in the system.",
+        )
+
+    # Create new user
+    user = User(
+        email=request.email,
+        hashed_password=password_hasher.hash_sync(request.password),
+        full_name=request.full_name,
+        role=request.role,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(login_rate_limit)])
+def login(
+    *,
+    db: Session = Depends(get_db),
+    response: Response,
+    request: LoginRequest
+) -> Any:
+    """
+    OAuth2 compatible token login, get an access token for future requests.
+    Sets both access token and refresh token as httpOnly cookies.
+    Rate limited per client IP and, for failed attempts, per account (429).
+    """
+    anyio.from_thread.run(login_throttle.check, request.email)
+    user = db.query(User).filter(User.email == request.email).first()
+    verified, new_hash = (
+        password_hasher.verify_and_update_sync(request.password, user.hashed_password)
+        if user else (False, None)
+    )
+    if not verified:
+        anyio.from_thread.run(login_throttle.failed, request.email)
+        auth_failures_total.inc("bad_credentials")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Incorrect email or password",
         )
 
     if not user.is_active:
+        auth_failures_total.inc("disabled")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User account is disabled",
         )
 
-    # Create new access token
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=str(user.id),
-        expires_delta=access_token_expires,
-        data={"role": user.role}
-    )
+    # Re-hash with the current cost factor when BCRYPT_ROUNDS has changed
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
 
-    # Create new refresh token
-    refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    new_refresh_token = create_access_token(
-        subject=str(user.id),
-        expires_delta=refresh_token_expires,
-        data={"type": "refresh"}
-    )
+    family = anyio.from_thread.run(session_store.create, str(user.id), user.role, user.token_version or 0)
+    access_token, refresh_token = issue_tokens(family)
+    set_auth_cookies(response, access_token, refresh_token, user.role)
 
-    # Set new access token cookie
-    response.set_cookie(
-        key=settings.COOKIE_NAME,
-        value=access_token,
-        httponly=True,
-        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        expires=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        secure=False,
-        samesite="lax",
-    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+    }
 
-    # Set new refresh token cookie
-    response.set_cookie(
-        key="refresh_token",
-        value=new_refresh_token,
-        httponly=True,
-        max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
-        expires=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
-        secure=False,
-        samesite="lax",
-    )
 
-    # Update user_role cookie
-    response.set_cookie(
-        key="user_role",
-        value=user.role,
-        httponly=False,
-        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        expires=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-        secure=False,
-        samesite="lax",
-    )
+@router.post("/logout")
+async def logout(
+    request: Request,
+    response: Response,
+    refresh_request: Optional[RefreshTokenRequest] = None,
+) -> Any:
+    """
+    Logout user by revoking the session's refresh tokens and clearing all auth cookies.
+    """
+    claims = read_refresh_claims(request, refresh_request, required=False)
+    if claims is not None:
+        await session_store.revoke(claims["fam"])
+    clear_auth_cookies(response)
+
+    return {"message": "Successfully logged out"}
+
+
+@router.post("/logout/all")
+async def logout_everywhere(
+    response: Response,
+    principal: Principal = Depends(get_current_principal),
+) -> Any:
+    """
+    Revoke every session of the current user. Access tokens already issued
+    stay valid until they expire (ACCESS_TOKEN_EXPIRE_MINUTES).
+    """
+    revoked = await session_store.revoke_user(principal.id)
+    clear_auth_cookies(response)
+
+    return {"message": f"Revoked {revoked} sessions"}
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_token(
+    *,
+    request: Request,
+    response: Response,
+    refresh_request: Optional[RefreshTokenRequest] = None,
+) -> Any:
+    """
+    Refresh access token using refresh token from cookie or JSON body.
+
+    The refresh token is rotated: the presented one stops working and a new
+    one is set. Presenting a rotated-out token again revokes the whole
+    session (it was probably stolen). The user's role and token version are
+    taken from the session, not the users table, and checked against the
+    token version registry like claims-only authentication.
+    """
+    claims = read_refresh_claims(request, refresh_request)
+
+    rotation = await session_store.rotate(claims["fam"], claims["jti"])
+    if rotation.status == "reused":
+        auth_failures_total.inc("refresh_token_reused")
+        logger.warning(f"Refresh token reuse for user {rotation.user_id}; session {claims['fam']} revoked")
+    family = rotation.family
+    if family is None or family.user_id != claims["sub"]:
+        if rotation.status != "reused":
+            auth_failures_total.inc("revoked_refresh_token")
+        clear_auth_cookies(response)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked",
+        )
+
+    state = token_versions.lookup(family.user_id) or await asyncio.to_thread(load_token_state, family.user_id)
+    if state is None or not state.is_active or state.version != family.token_version:
+        # Deactivated, or role changed since login: the session ends with the old claims
+        await session_store.revoke(family.id)
+        auth_failures_total.inc("revoked")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked",
+        )
+
+    access_token, new_refresh_token = issue_tokens(family)
+    set_auth_cookies(response, access_token, new_refresh_token, family.role)
 
     return {
         "access_token": access_token,
@@ -282,6 +352,40 @@ def refresh_token(
     }
 
 
+@router.get("/sessions", response_model=list[SessionResponse])
+async def list_sessions(
+    request: Request,
+    principal: Principal = Depends(get_current_principal),
+) -> Any:
+    """The current user's signed-in sessions"""
+    claims = read_refresh_claims(request, None, required=False)
+    current = claims["fam"] if claims else None
+    families = await session_store.families(principal.id)
+    return [
+        SessionResponse(
+            id=family.id,
+            created_at=datetime.fromtimestamp(family.created_at, timezone.utc),
+            last_refreshed_at=(
+                datetime.fromtimestamp(family.rotated_at, timezone.utc) if family.rotated_at else None
+            ),
+            current=family.id == current,
+        )
+        for family in sorted(families, key=lambda family: family.created_at, reverse=True)
+    ]
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_session(
+    session_id: str,
+    principal: Principal = Depends(get_current_principal),
+) -> Response:
+    """Sign one of the current user's sessions out"""
+    if not any(family.id == session_id for family in await session_store.families(principal.id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Session not found")
+    await session_store.revoke(session_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.get("/me", response_model=UserMeResponse)
 def read_users_me(
     current_user: User = Depends(get_current_user),
@@ -289,11 +393,4 @@ def read_users_me(
     """
     Get current user.
     """
-    return {
-        "id": str(current_user.id),
-        "email": current_user.email,
-        "full_name": current_user.full_name,
-        "is_active": current_user.is_active,
-        "role": current_user.role,
-    }
-
+    return me_response(current_user)
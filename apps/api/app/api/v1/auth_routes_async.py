@@ -0,0 +1,136 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.auth_routes import (
+    auth_health_check,
+    issue_tokens,
+    list_sessions,
+    login_rate_limit,
+    logout,
+    logout_everywhere,
+    me_response,
+    refresh_token,
+    revoke_session,
+    set_auth_cookies,
+)
+from app.core.dependencies import get_current_user_async
+from app.core.hashing import password_hasher
+from app.core.metrics import auth_failures_total
+from app.core.rate_limit import login_throttle
+from app.core.sessions import session_store
+from app.db.models.user import User
+from app.db.session import get_async_db
+from app.schemas.auth import (
+    LoginRequest,
+    RegisterRequest,
+    SessionResponse,
+    TokenResponse,
+    UserMeResponse,
+    UserResponse,
+)
+
+# Same contract as app.api.v1.auth_routes, served from the AsyncSession layer.
+# Selected instead of the sync router when DB_ASYNC is enabled.
+router = APIRouter()
+
+router.add_api_route("/health", auth_health_check, methods=["GET"])
+router.add_api_route("/logout", logout, methods=["POST"])
+router.add_api_route("/logout/all", logout_everywhere, methods=["POST"])
+# Refresh and the session endpoints never touch the database session
+router.add_api_route("/refresh", refresh_token, methods=["POST"], response_model=TokenResponse)
+router.add_api_route("/sessions", list_sessions, methods=["GET"], response_model=list[SessionResponse])
+router.add_api_route(
+    "/sessions/{session_id}", revoke_session, methods=["DELETE"], status_code=status.HTTP_204_NO_CONTENT
+)
+
+
+@router.post("/register", response_model=UserResponse)
+async def register(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    request: RegisterRequest
+) -> Any:
+    """
+    Register a new user.
+    """
+    # Check if user already exists
+    result = await db.execute(select(User.id).where(User.email == request.email))
+    if result.first():
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this email already exists in the system.",
+        )
+
+    # Create new user
+    user = User(
+        email=request.email,
+        hashed_password=await password_hasher.hash(request.password),
+        full_name=request.full_name,
+        role=request.role,
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(login_rate_limit)])
+async def login(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    response: Response,
+    request: LoginRequest
+) -> Any:
+    """
+    OAuth2 compatible token login, get an access token for future requests.
+    Sets both access token and refresh token as httpOnly cookies.
+    Rate limited per client IP and, for failed attempts, per account (429).
+    """
+    await login_throttle.check(request.email)
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalar_one_or_none()
+    verified, new_hash = (
+        await password_hasher.verify_and_update(request.password, user.hashed_password)
+        if user else (False, None)
+    )
+    if not verified:
+        await login_throttle.failed(request.email)
+        auth_failures_total.inc("bad_credentials")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Incorrect email or password",
+        )
+
+    if not user.is_active:
+        auth_failures_total.inc("disabled")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User account is disabled",
+        )
+
+    # Re-hash with the current cost factor when BCRYPT_ROUNDS has changed
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
+    family = await session_store.create(str(user.id), user.role, user.token_version or 0)
+    access_token, new_refresh_token = issue_tokens(family)
+    set_auth_cookies(response, access_token, new_refresh_token, user.role)
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+    }
+
+
+@router.get("/me", response_model=UserMeResponse)
+async def read_users_me(
+    current_user: User = Depends(get_current_user_async),
+) -> Any:
+    """
+    Get current user.
+    """
+    return me_response(current_user)
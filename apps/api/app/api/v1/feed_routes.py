@@ -0,0 +1,74 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.dependencies import Principal, get_current_principal, require_roles
+from app.db.session import get_db, get_routed_db
+from app.modules.feed.timeline import (
+    InvalidCursor,
+    audiences_for,
+    feed_row,
+    fetch_page,
+    publish,
+    timeline_cache,
+)
+from app.schemas.feed import AnnouncementCreate, FeedItemResponse, FeedPage
+
+router = APIRouter()
+
+
+@router.get("/", response_model=FeedPage)
+def get_feed(
+    class_id: Optional[list[str]] = Query(default=None),
+    limit: int = Query(default=settings.FEED_PAGE_SIZE, ge=1, le=settings.FEED_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """
+    The caller's timeline, newest first: school-wide items, items for the
+    given classes, staff items for teachers and principals, and items
+    addressed to the caller. Page with `next_cursor`.
+    """
+    class_ids = class_id or []
+    if len(class_ids) > settings.FEED_MAX_CLASSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.FEED_MAX_CLASSES} classes per request",
+        )
+    audiences = audiences_for(principal.id, principal.role, class_ids)
+
+    if cursor is None:
+        page = timeline_cache.get(audiences, limit)
+        if page is None:
+            generations = timeline_cache.generations(audiences)
+            page = fetch_page(db, audiences, limit)
+            timeline_cache.put(audiences, limit, page, generations)
+    else:
+        try:
+            page = fetch_page(db, audiences, limit, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    items, next_cursor = page
+    return FeedPage(items=items, next_cursor=next_cursor)
+
+
+@router.post("/announcements", response_model=FeedItemResponse, status_code=status.HTTP_201_CREATED)
+def post_announcement(
+    request: AnnouncementCreate,
+    principal: Principal = Depends(require_roles(["teacher", "principal"], claims_only=True)),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Post an announcement to a class, or school- or staff-wide as a principal"""
+    if request.audience != "class" and principal.role != "principal":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    audience = f"class:{request.class_id}" if request.audience == "class" else request.audience
+
+    row = feed_row(audience, "announcement", request.title, actor_id=principal.id, body=request.body)
+    publish(db, [row])
+    db.commit()
+    timeline_cache.touch([audience])
+    return row
@@ -0,0 +1,108 @@
+import mimetypes
+import os
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import Principal, require_roles
+from app.db.models.job import Job
+from app.db.session import get_db
+from app.modules.jobs.runner import job_runner
+from app.schemas.job import JOB_PARAMS, JobCreate, JobResponse
+
+router = APIRouter()
+
+principal_only = require_roles(["principal"], claims_only=True)
+
+
+def get_job_or_404(db: Session, job_id: str) -> Job:
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_job(
+    request: JobCreate,
+    principal: Principal = Depends(principal_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Queue a background job: "learning_gaps", "rollup_rebuild" (params: since)
+    or "export" (params: report, format, start, end, class_ids). Poll it with
+    GET /{id}; exports are downloaded from GET /{id}/artifact.
+    """
+    try:
+        params = JOB_PARAMS[request.kind].model_validate(request.params)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False),
+        ) from e
+    if getattr(params, "start", None) and getattr(params, "end", None) and params.start > params.end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    return job_runner.enqueue(
+        db,
+        request.kind,
+        params.model_dump(mode="json"),
+        priority=request.priority,
+        created_by=principal.id,
+    )
+
+
+@router.get("/", response_model=list[JobResponse])
+def list_jobs(
+    job_status: Optional[str] = Query(default=None, alias="status"),
+    kind: Optional[str] = None,
+    limit: int = 50,
+    principal: Principal = Depends(principal_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Recent jobs, newest first"""
+    query = db.query(Job)
+    if job_status:
+        query = query.filter(Job.status == job_status)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    return query.order_by(Job.created_at.desc()).limit(min(limit, 500)).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: str,
+    principal: Principal = Depends(principal_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """A job's status, progress and result"""
+    return get_job_or_404(db, job_id)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(
+    job_id: str,
+    principal: Principal = Depends(principal_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Cancel a queued job, or ask a running one to stop"""
+    return job_runner.cancel(db, get_job_or_404(db, job_id))
+
+
+@router.get("/{job_id}/artifact")
+def download_artifact(
+    job_id: str,
+    principal: Principal = Depends(principal_only),
+    db: Session = Depends(get_db),
+) -> FileResponse:
+    """The file a finished job produced"""
+    job = get_job_or_404(db, job_id)
+    path = os.path.join(job_runner.artifact_dir, job.id, job.artifact or "")
+    if job.status != "succeeded" or not job.artifact or not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No artifact for this job")
+    media_type, encoding = mimetypes.guess_type(job.artifact)
+    if encoding == "gzip":
+        media_type = "application/gzip"
+    return FileResponse(path, media_type=media_type or "application/octet-stream", filename=job.artifact)
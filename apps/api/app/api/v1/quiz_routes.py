@@ -0,0 +1,316 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.dependencies import Principal, get_current_principal, require_roles
+from app.db.models.quiz import Quiz, QuizSubmission
+from app.db.session import SessionLocal, get_db, get_routed_db
+from app.modules.quiz.attempts import Attempt, AttemptClosed, attempt_store, load_checkpoint
+from app.modules.quiz.grading import AnswerKey, answer_keys
+from app.modules.quiz.submissions import submission_batcher
+from app.modules.quiz.views import quiz_detail, quiz_views
+from app.schemas.quiz import (
+    AttemptResponse,
+    AutosaveRequest,
+    AutosaveResponse,
+    QuizCreate,
+    QuizDetail,
+    QuizSubmissionResponse,
+    QuizSubmitRequest,
+    QuizSubmitResponse,
+    QuizSummary,
+    QuizUpdate,
+)
+
+router = APIRouter()
+
+staff_only = require_roles(["teacher", "principal"], claims_only=True)
+
+
+def check_quiz_access(principal: Principal, teacher_id: str) -> None:
+    """Teachers manage their own quizzes; principals manage all of them"""
+    if principal.role != "principal" and principal.id != teacher_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your quiz")
+
+
+def get_quiz_or_404(db: Session, quiz_id: str) -> Quiz:
+    quiz = db.get(Quiz, quiz_id)
+    if quiz is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    return quiz
+
+
+def load_answer_key(quiz_id: str) -> Optional[AnswerKey]:
+    db = SessionLocal()
+    try:
+        return answer_keys.get(db, quiz_id)
+    finally:
+        db.close()
+
+
+@router.post("/", response_model=QuizDetail, status_code=status.HTTP_201_CREATED)
+def create_quiz(
+    request: QuizCreate,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Create a quiz"""
+    quiz = Quiz(
+        title=request.title,
+        class_id=request.class_id,
+        teacher_id=principal.id,
+        questions=[question.model_dump() for question in request.questions],
+        version=1,
+        is_published=request.is_published,
+        time_limit_minutes=request.time_limit_minutes,
+    )
+    db.add(quiz)
+    db.commit()
+    db.refresh(quiz)
+    return quiz_detail(quiz)
+
+
+@router.get("/", response_model=list[QuizSummary])
+def list_quizzes(
+    class_id: Optional[str] = None,
+    limit: int = 50,
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """List quizzes; students see published quizzes, teachers their own"""
+    query = db.query(Quiz)
+    if principal.role == "student":
+        query = query.filter(Quiz.is_published.is_(True))
+    elif principal.role != "principal":
+        query = query.filter(Quiz.teacher_id == principal.id)
+    if class_id:
+        query = query.filter(Quiz.class_id == class_id)
+    return query.order_by(Quiz.created_at.desc()).limit(min(limit, 200)).all()
+
+
+@router.get(
+    "/{quiz_id}",
+    response_model=QuizDetail,
+    responses={304: {"description": "Not modified"}},
+)
+def get_quiz(
+    quiz_id: str,
+    request: Request,
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """
+    A quiz with its questions; answers are only included for staff.
+    Served from pre-serialized views with an ETag per quiz version, so
+    repeated fetches during an exam skip the database and, with
+    If-None-Match, the body.
+    """
+    view = quiz_views.get(db, quiz_id)
+    if view is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    if principal.role == "student":
+        if not view.is_published:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+        with_answers = False
+    else:
+        check_quiz_access(principal, view.teacher_id)
+        with_answers = True
+
+    etag = view.etag(with_answers)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=view.body(with_answers), media_type="application/json", headers=headers)
+
+
+@router.put("/{quiz_id}", response_model=QuizDetail)
+def update_quiz(
+    quiz_id: str,
+    request: QuizUpdate,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Replace a quiz; submissions already graded keep the version they answered"""
+    quiz = get_quiz_or_404(db, quiz_id)
+    check_quiz_access(principal, str(quiz.teacher_id))
+    quiz.title = request.title
+    quiz.class_id = request.class_id
+    quiz.questions = [question.model_dump() for question in request.questions]
+    quiz.is_published = request.is_published
+    quiz.time_limit_minutes = request.time_limit_minutes
+    quiz.version = quiz.version + 1
+    db.commit()
+    db.refresh(quiz)
+    answer_keys.invalidate(quiz_id)
+    quiz_views.invalidate(quiz_id)
+    return quiz_detail(quiz)
+
+
+async def published_key(quiz_id: str) -> AnswerKey:
+    key = answer_keys.peek(quiz_id) or await asyncio.to_thread(load_answer_key, quiz_id)
+    if key is None or not key.is_published:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Quiz not found")
+    return key
+
+
+def deadline_of(key: AnswerKey, attempt: Attempt) -> Optional[datetime]:
+    if not key.time_limit_minutes:
+        return None
+    return attempt.started_at + timedelta(minutes=key.time_limit_minutes)
+
+
+def set_closing_time(key: AnswerKey, attempt: Attempt) -> Attempt:
+    """Close a timed attempt QUIZ_SUBMIT_GRACE_SECONDS after its deadline"""
+    deadline = deadline_of(key, attempt)
+    if deadline is not None:
+        attempt.closes_at = deadline.timestamp() + settings.QUIZ_SUBMIT_GRACE_SECONDS
+    return attempt
+
+
+def attempt_response(key: AnswerKey, attempt: Attempt) -> AttemptResponse:
+    return AttemptResponse(
+        quiz_id=attempt.quiz_id,
+        quiz_version=attempt.quiz_version,
+        started_at=attempt.started_at,
+        deadline=deadline_of(key, attempt),
+        seq=attempt.seq,
+        answers=attempt.answers,
+    )
+
+
+def resume_from_database(quiz_id: str, student_id: str) -> Optional[Attempt]:
+    """The attempt's last checkpoint; 409 if the quiz was already submitted"""
+    db = SessionLocal()
+    try:
+        submitted = (
+            db.query(QuizSubmission.id)
+            .filter(QuizSubmission.quiz_id == quiz_id, QuizSubmission.student_id == student_id)
+            .first()
+        )
+        if submitted is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Quiz already submitted")
+        return load_checkpoint(db, quiz_id, student_id)
+    finally:
+        db.close()
+
+
+def checkpoint_from_database(quiz_id: str, student_id: str) -> Optional[Attempt]:
+    db = SessionLocal()
+    try:
+        return load_checkpoint(db, quiz_id, student_id)
+    finally:
+        db.close()
+
+
+@router.post("/{quiz_id}/attempt", response_model=AttemptResponse)
+async def start_attempt(
+    quiz_id: str,
+    principal: Principal = Depends(require_roles(["student"], claims_only=True)),
+) -> Any:
+    """
+    Start an attempt, or resume it with the answers saved so far.
+    The clock of a timed quiz starts on the first call.
+    """
+    key = await published_key(quiz_id)
+    attempt = await attempt_store.get(quiz_id, principal.id)
+    if attempt is None:
+        attempt = await asyncio.to_thread(resume_from_database, quiz_id, principal.id) or Attempt(
+            quiz_id=quiz_id,
+            student_id=principal.id,
+            quiz_version=key.version,
+            started_at=datetime.now(timezone.utc),
+        )
+        attempt = await attempt_store.create(set_closing_time(key, attempt))
+    return attempt_response(key, attempt)
+
+
+@router.patch("/{quiz_id}/attempt", response_model=AutosaveResponse)
+async def autosave_attempt(
+    quiz_id: str,
+    request: AutosaveRequest,
+    principal: Principal = Depends(require_roles(["student"], claims_only=True)),
+) -> Any:
+    """
+    Save the answers changed since the previous save.
+    Each save carries the next sequence number; a save at or below the
+    stored number (a retry, or one overtaken by a later save) is ignored,
+    and the stored number is returned either way.
+    """
+    key = await published_key(quiz_id)
+    unknown = set(request.answers).difference(key.question_ids)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown questions: {', '.join(sorted(unknown))}",
+        )
+    try:
+        seq = await attempt_store.apply(quiz_id, principal.id, request.seq, request.answers)
+    except AttemptClosed as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    if seq is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No attempt in progress")
+    return AutosaveResponse(seq=seq)
+
+
+@router.post("/{quiz_id}/submit", response_model=QuizSubmitResponse)
+async def submit_quiz(
+    quiz_id: str,
+    request: QuizSubmitRequest,
+    principal: Principal = Depends(require_roles(["student"], claims_only=True)),
+) -> Any:
+    """
+    Submit answers and receive the score.
+    If an attempt was started, the answers sent here are merged over the
+    autosaved ones; once a timed attempt's time is up only the autosaved
+    answers count. Grading uses the quiz's cached compiled answer key, and
+    the submission is written together with others arriving in the same
+    few milliseconds. Only the first submission per student counts.
+    A timed quiz can only be submitted after starting an attempt (409).
+    """
+    key = await published_key(quiz_id)
+    attempt = await attempt_store.get(quiz_id, principal.id)
+    if attempt is None:
+        # Started on another worker or before a restart: resume from its last checkpoint
+        attempt = await asyncio.to_thread(checkpoint_from_database, quiz_id, principal.id)
+        if attempt is not None:
+            set_closing_time(key, attempt)
+    if attempt is None:
+        if key.time_limit_minutes:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No attempt in progress")
+        answers = request.answers
+    elif attempt.is_closed():
+        answers = attempt.answers
+    else:
+        answers = {**attempt.answers, **request.answers}
+
+    result = await submission_batcher.submit(key, principal.id, answers)
+    if attempt is not None:
+        await attempt_store.remove(quiz_id, principal.id)
+    return QuizSubmitResponse(
+        quiz_id=quiz_id,
+        status=result.status,
+        score=result.score,
+        max_score=result.max_score,
+    )
+
+
+@router.get("/{quiz_id}/submissions", response_model=list[QuizSubmissionResponse])
+def list_submissions(
+    quiz_id: str,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """Every graded submission for a quiz"""
+    quiz = get_quiz_or_404(db, quiz_id)
+    check_quiz_access(principal, str(quiz.teacher_id))
+    return (
+        db.query(QuizSubmission)
+        .filter(QuizSubmission.quiz_id == quiz_id)
+        .order_by(QuizSubmission.submitted_at)
+        .all()
+    )
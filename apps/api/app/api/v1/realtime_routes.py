@@ -0,0 +1,113 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.dependencies import Principal, principal_from_token, require_roles
+from app.db.session import SessionLocal
+from app.modules.realtime.events import class_channel
+from app.modules.realtime.hub import hub
+
+router = APIRouter()
+
+staff_only = require_roles(["teacher", "principal"], claims_only=True)
+
+STAFF_ROLES = ("teacher", "principal")
+
+
+def check_channels(class_ids: list[str]) -> Optional[str]:
+    """Why a subscription request is invalid, or None"""
+    if not class_ids:
+        return "Subscribe to at least one class_id"
+    if len(class_ids) > settings.REALTIME_MAX_CHANNELS:
+        return f"At most {settings.REALTIME_MAX_CHANNELS} classes per connection"
+    return None
+
+
+def authenticate_socket(websocket: WebSocket) -> Principal:
+    """Claims-only authentication for a WebSocket handshake (browsers can't set headers, so ?token= works too)"""
+    token = websocket.query_params.get("token")
+    if not token:
+        header = websocket.headers.get("Authorization", "")
+        token = header[7:] if header.startswith("Bearer ") else websocket.cookies.get(settings.COOKIE_NAME)
+    db = SessionLocal()
+    try:
+        return principal_from_token(token, db)
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def event_socket(websocket: WebSocket):
+    """
+    Live attendance and quiz events for up to REALTIME_MAX_CHANNELS classes
+    (`?class_id=...&class_id=...`), one JSON event per text frame. A "ping"
+    event is sent after REALTIME_HEARTBEAT_SECONDS of silence.
+    """
+    try:
+        principal = await asyncio.to_thread(authenticate_socket, websocket)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    class_ids = websocket.query_params.getlist("class_id")
+    problem = check_channels(class_ids)
+    if principal.role not in STAFF_ROLES or problem:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=problem or "Not enough permissions")
+        return
+
+    await websocket.accept()
+    subscriber = hub.subscribe(class_channel(class_id) for class_id in class_ids)
+
+    async def pump() -> None:
+        while True:
+            batch = await subscriber.next_batch(settings.REALTIME_HEARTBEAT_SECONDS)
+            for event in batch or ['{"type": "ping"}']:
+                await websocket.send_text(event)
+
+    async def drain() -> None:
+        # Clients have nothing to say; reading just notices when they leave
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(drain())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.unsubscribe(subscriber)
+    try:
+        await websocket.close()
+    except (RuntimeError, WebSocketDisconnect):
+        pass
+
+
+@router.get("/events")
+async def event_stream(
+    class_id: Optional[list[str]] = Query(default=None),
+    principal: Principal = Depends(staff_only),
+) -> StreamingResponse:
+    """Server-sent events fallback for /ws: the same events, one `data:` line each"""
+    class_ids = class_id or []
+    problem = check_channels(class_ids)
+    if problem:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=problem)
+
+    async def stream():
+        subscriber = hub.subscribe(class_channel(class_id) for class_id in class_ids)
+        try:
+            yield f"retry: {int(settings.REALTIME_HEARTBEAT_SECONDS * 1000)}\n\n"
+            while True:
+                batch = await subscriber.next_batch(settings.REALTIME_HEARTBEAT_SECONDS)
+                yield "".join(f"data: {event}\n\n" for event in batch) if batch else ": ping\n\n"
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,170 @@
+from datetime import date
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import Principal, get_current_principal, require_roles
+from app.db.models.learning_gap import LearningGapAlert
+from app.db.session import get_db, get_routed_db
+from app.modules.attendance.reports import class_series, class_summaries, student_summaries
+from app.modules.exports.reports import stream_export
+from app.modules.jobs.runner import job_runner
+from app.schemas.report import (
+    ClassAttendanceSeries,
+    ClassAttendanceSummary,
+    LearningGapAlertResponse,
+    LearningGapRunResponse,
+    StudentAttendanceSummary,
+)
+
+router = APIRouter()
+
+staff_only = require_roles(["teacher", "principal"], claims_only=True)
+
+principal_only = require_roles(["principal"], claims_only=True)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def check_range(start: Optional[date], end: Optional[date]) -> None:
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+
+
+@router.get("/attendance/classes", response_model=list[ClassAttendanceSummary])
+def attendance_by_class(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    class_id: Optional[list[str]] = Query(default=None),
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """
+    Attendance rate per class between `start` and `end` (inclusive).
+    Ranges of whole Monday-Sunday weeks are answered from the weekly rollups.
+    """
+    check_range(start, end)
+    return class_summaries(db, start, end, class_ids=class_id)
+
+
+@router.get("/attendance/classes/{class_id}/series", response_model=ClassAttendanceSeries)
+def attendance_series(
+    class_id: str,
+    period: Literal["day", "week"] = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """Sessions held and marks recorded for a class per day or week"""
+    check_range(start, end)
+    return ClassAttendanceSeries(
+        class_id=class_id,
+        period=period,
+        points=class_series(db, class_id, period, start, end),
+    )
+
+
+@router.get("/attendance/classes/{class_id}/students", response_model=list[StudentAttendanceSummary])
+def attendance_by_student(
+    class_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """Attendance rate of every student seen in a class"""
+    check_range(start, end)
+    return student_summaries(db, class_id=class_id, start=start, end=end)
+
+
+@router.get("/attendance/students/{student_id}", response_model=list[StudentAttendanceSummary])
+def attendance_for_student(
+    student_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """Attendance rate per class for one student; students may only read their own"""
+    if principal.role == "student" and principal.id != student_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    check_range(start, end)
+    return student_summaries(db, student_id=student_id, start=start, end=end)
+
+
+@router.get("/learning-gaps", response_model=list[LearningGapAlertResponse])
+def list_learning_gaps(
+    class_id: Optional[str] = None,
+    kind: Optional[str] = None,
+    severity: Optional[str] = None,
+    limit: int = 200,
+    principal: Principal = Depends(staff_only),
+    db: Session = Depends(get_routed_db),
+) -> Any:
+    """Learning-gap alerts from the latest analysis run, most severe first"""
+    query = db.query(LearningGapAlert)
+    if class_id:
+        query = query.filter(LearningGapAlert.class_id == class_id)
+    if kind:
+        query = query.filter(LearningGapAlert.kind == kind)
+    if severity:
+        query = query.filter(LearningGapAlert.severity == severity)
+    return (
+        query.order_by(LearningGapAlert.severity, LearningGapAlert.class_id)
+        .limit(min(limit, 1000))
+        .all()
+    )
+
+
+@router.post(
+    "/learning-gaps/run",
+    response_model=LearningGapRunResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def run_learning_gaps(
+    principal: Principal = Depends(principal_only),
+    db: Session = Depends(get_db),
+) -> Any:
+    """Queue a recomputation of all learning-gap alerts as a background job"""
+    job = job_runner.enqueue(db, "learning_gaps", created_by=principal.id)
+    return LearningGapRunResponse(
+        status="running" if job.status == "running" else "scheduled",
+        job_id=job.id,
+    )
+
+
+@router.get("/exports/{report}")
+def export_report(
+    request: Request,
+    report: Literal["attendance", "grades"],
+    format: Literal["csv", "xlsx"] = "csv",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    class_id: Optional[list[str]] = Query(default=None),
+    principal: Principal = Depends(principal_only),
+) -> StreamingResponse:
+    """
+    Download every attendance mark or quiz grade in a range as CSV or XLSX.
+    The file is streamed as it is read, so memory use doesn't grow with the
+    report; CSV is gzipped on the fly for clients that accept it.
+    """
+    check_range(start, end)
+    compress = format == "csv" and "gzip" in request.headers.get("Accept-Encoding", "")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{report}-{start or "all"}-{end or "all"}.{format}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_export(report, format, compress, start=start, end=end, class_ids=class_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
@@ -1,28 +1,47 @@
 from fastapi import APIRouter
 
-from app.api.v1.auth_routes import router as auth_router
+from app.api.v1.attendance_routes import router as attendance_router
+from app.api.v1.feed_routes import router as feed_router
+from app.api.v1.job_routes import router as job_router
+from app.api.v1.quiz_routes import router as quiz_router
+from app.api.v1.realtime_routes import router as realtime_router
+from app.api.v1.report_routes import router as report_router
+from app.api.v1.user_routes import router as user_router
+from app.core.config import settings
+from app.core.timing import timing_summary
+from app.core.token_cache import token_cache
+from app.db.session import get_pool_status
+
+if settings.DB_ASYNC:
+    from app.api.v1.auth_routes_async import router as auth_router
+else:
+    from app.api.v1.auth_routes import router as auth_router
 
 api_router = APIRouter()
 
 # Register auth router
 api_router.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 
-# Placeholder routers for other modules
-# These will be implemented in their respective modules
-api_router_api = APIRouter()
-api_router.include_router(api_router_api, prefix="/user", tags=["User"])
+# Register user management router
+api_router.include_router(user_router, prefix="/user", tags=["User"])
 
-api_router_attendance = APIRouter()
-api_router.include_router(api_router_attendance, prefix="/attendance", tags=["Attendance"])
+# Register attendance router
+api_router.include_router(attendance_router, prefix="/attendance", tags=["Attendance"])
 
-api_router_quiz = APIRouter()
-api_router.include_router(api_router_quiz, prefix="/quiz", tags=["Quiz"])
+# Register reports router
+api_router.include_router(report_router, prefix="/reports", tags=["Reports"])
 
-api_router_feed = APIRouter()
-api_router.include_router(api_router_feed, prefix="/feed", tags=["Feed"])
+# Register background jobs router
+api_router.include_router(job_router, prefix="/reports/jobs", tags=["Jobs"])
 
-api_router_reports = APIRouter()
-api_router.include_router(api_router_reports, prefix="/reports", tags=["Reports"])
+# Register quiz router
+api_router.include_router(quiz_router, prefix="/quiz", tags=["Quiz"])
+
+# Register feed router
+api_router.include_router(feed_router, prefix="/feed", tags=["Feed"])
+
+# Register realtime router
+api_router.include_router(realtime_router, prefix="/realtime", tags=["Realtime"])
 
 api_router_health = APIRouter()
 
@@ -30,7 +49,13 @@ api_router_health = APIRouter()
 @api_router_health.get("/health")
 async def api_health_check():
     """Health check endpoint for API"""
-    return {"status": "healthy", "api_version": "1.0.0"}
+    return {
+        "status": "healthy",
+        "api_version": "1.0.0",
+        "token_cache": token_cache.stats(),
+        "db_pool": get_pool_status(),
+        "timings": timing_summary(),
+    }
 
 
 api_router.include_router(api_router_health, prefix="", tags=["Health"])
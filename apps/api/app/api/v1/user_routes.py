@@ -0,0 +1,52 @@
+import json
+from typing import Any, Iterable
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.dependencies import Principal, require_roles
+from app.db.session import SessionLocal
+from app.modules.users.provisioning import parse_roster_csv, provision_users
+from app.schemas.user import BulkRegisterRequest
+
+router = APIRouter()
+
+
+def _stream_results(rows: Iterable[dict]):
+    # Own session: the import outlives the request's dependencies while streaming
+    db = SessionLocal()
+    try:
+        for result in provision_users(db, rows, chunk_size=settings.BULK_IMPORT_CHUNK_SIZE):
+            yield json.dumps(result) + "\n"
+    finally:
+        db.close()
+
+
+@router.post("/bulk")
+def bulk_register(
+    request: BulkRegisterRequest,
+    principal: Principal = Depends(require_roles(["principal"], claims_only=True)),
+) -> Any:
+    """
+    Register a roster of users.
+    Streams one NDJSON result per row, then a summary line.
+    """
+    rows = [row.model_dump() for row in request.users]
+    return StreamingResponse(_stream_results(rows), media_type="application/x-ndjson")
+
+
+@router.post("/bulk/csv")
+async def bulk_register_csv(
+    file: UploadFile = File(...),
+    principal: Principal = Depends(require_roles(["principal"], claims_only=True)),
+) -> Any:
+    """
+    Register a roster uploaded as CSV (email,password,full_name,role).
+    Streams one NDJSON result per row, then a summary line.
+    """
+    try:
+        rows = parse_roster_csv(await file.read())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return StreamingResponse(_stream_results(rows), media_type="application/x-ndjson")
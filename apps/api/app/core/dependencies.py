@@ -1,12 +1,19 @@
-from typing import Generator, Optional
+from dataclasses import dataclass
+from typing import Generator, Optional, Union
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 
 from app.core.config import settings
+from app.core.metrics import auth_failures_total
+from app.core.revocation import TokenVersionState, token_versions
 from app.core.security import decode_access_token
-from app.db.session import get_db
+from app.core.timing import timed
+from app.core.token_cache import CachedUser, token_cache
+from app.db.session import get_async_db, get_db
 from app.db.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
@@ -28,10 +35,14 @@ def get_token_from_cookie(request: Request) -> Optional[str]:
 def get_current_user(
     request: Request,
     db: Session = Depends(get_db),
-) -> User:
+) -> Union[User, CachedUser]:
     """
     Get current user from either Bearer token header or cookie.
     Supports both authentication methods.
+
+    Verified tokens are cached in-process (see app.core.token_cache), so a
+    repeated token skips both the signature check and the user lookup and
+    resolves to a CachedUser snapshot instead of a session-bound User.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,23 +54,181 @@ def get_current_user(
     token = get_token_from_header(request) or get_token_from_cookie(request)
     
     if not token:
+        auth_failures_total.inc("missing_token")
         raise credentials_exception
+
+    if settings.TOKEN_CACHE_ENABLED:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached[1]
     
     try:
         payload = decode_access_token(token)
         user_id: str = payload.get("sub")
-        if user_id is None:
+        # Refresh tokens only ever go to /auth/refresh
+        if user_id is None or payload.get("type") == "refresh":
+            auth_failures_total.inc("invalid_token")
             raise credentials_exception
-    except JWTError:
+    except (JWTError, ValueError):
+        auth_failures_total.inc("invalid_token")
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    with timed("user_lookup"):
+        user = db.query(User).filter(User.id == user_id).first()
     if user is None:
+        auth_failures_total.inc("unknown_user")
         raise credentials_exception
+    if payload.get("ver", 0) != (user.token_version or 0):
+        auth_failures_total.inc("revoked")
+        raise credentials_exception
+
+    if settings.TOKEN_CACHE_ENABLED:
+        token_cache.set(token, payload, CachedUser.from_user(user))
     return user
 
 
-def require_roles(required_roles: list[str]):
+async def get_current_user_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+) -> Union[User, CachedUser]:
+    """
+    Async counterpart of get_current_user, backed by the AsyncSession layer.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    token = get_token_from_header(request) or get_token_from_cookie(request)
+    if not token:
+        auth_failures_total.inc("missing_token")
+        raise credentials_exception
+
+    if settings.TOKEN_CACHE_ENABLED:
+        cached = token_cache.get(token)
+        if cached is not None:
+            return cached[1]
+
+    try:
+        payload = decode_access_token(token)
+        user_id: str = payload.get("sub")
+        # Refresh tokens only ever go to /auth/refresh
+        if user_id is None or payload.get("type") == "refresh":
+            auth_failures_total.inc("invalid_token")
+            raise credentials_exception
+    except (JWTError, ValueError):
+        auth_failures_total.inc("invalid_token")
+        raise credentials_exception from None
+
+    with timed("user_lookup"):
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+    if user is None:
+        auth_failures_total.inc("unknown_user")
+        raise credentials_exception
+    if payload.get("ver", 0) != (user.token_version or 0):
+        auth_failures_total.inc("revoked")
+        raise credentials_exception
+
+    if settings.TOKEN_CACHE_ENABLED:
+        token_cache.set(token, payload, CachedUser.from_user(user))
+    return user
+
+
+# The user dependency matching the deployment's database layer (DB_ASYNC)
+get_authenticated_user = get_current_user_async if settings.DB_ASYNC else get_current_user
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated identity built from access token claims alone"""
+
+    id: str
+    role: str
+    token_version: int = 0
+
+
+def token_state(user_id: str, db: Session) -> Optional[TokenVersionState]:
+    """
+    A user's current token version and active flag, from the in-process
+    registry or, at most once per CLAIMS_RECHECK_SECONDS, the database.
+    None for an unknown user.
+    """
+    state = token_versions.lookup(user_id)
+    if state is None:
+        with timed("user_lookup"):
+            row = (
+                db.query(User.token_version, User.is_active)
+                .filter(User.id == user_id)
+                .first()
+            )
+        # Hand the connection back; async routes can hold this session while
+        # they await work that needs a connection of its own
+        db.rollback()
+        if row is None:
+            return None
+        state = token_versions.record(user_id, row.token_version or 0, row.is_active)
+    return state
+
+
+def principal_from_token(token: Optional[str], db: Session) -> Principal:
+    """
+    Claims-only authentication of one access token.
+
+    Trusts the `sub` and `role` claims of a valid access token instead of
+    loading the User row. The token's `ver` claim is checked against the
+    in-process token version registry, which is refreshed from the database at
+    most once per CLAIMS_RECHECK_SECONDS per user, so a deactivation or role
+    change takes effect everywhere within that window.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    if not token:
+        auth_failures_total.inc("missing_token")
+        raise credentials_exception
+
+    cached = token_cache.get(token) if settings.TOKEN_CACHE_ENABLED else None
+    if cached is not None:
+        payload = cached[0]
+    else:
+        try:
+            payload = decode_access_token(token)
+        except (JWTError, ValueError):
+            auth_failures_total.inc("invalid_token")
+            raise credentials_exception from None
+
+    user_id = payload.get("sub")
+    role = payload.get("role")
+    if user_id is None or role is None or payload.get("type") == "refresh":
+        auth_failures_total.inc("invalid_token")
+        raise credentials_exception
+
+    state = token_state(user_id, db)
+    if state is None:
+        auth_failures_total.inc("unknown_user")
+        raise credentials_exception
+
+    version = payload.get("ver", 0)
+    if not state.is_active or version != state.version:
+        auth_failures_total.inc("revoked")
+        raise credentials_exception
+    return Principal(id=user_id, role=role, token_version=version)
+
+
+def get_current_principal(
+    request: Request,
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Claims-only authentication from the Bearer header or cookie (see principal_from_token)"""
+    return principal_from_token(get_token_from_header(request) or get_token_from_cookie(request), db)
+
+
+def require_roles(required_roles: list[str], claims_only: bool = False):
     """
     Dependency factory for role-based access control.
     
@@ -67,13 +236,26 @@ def require_roles(required_roles: list[str]):
         @router.get("/admin")
         def admin_endpoint(user: User = Depends(require_roles(["principal"]))):
             ...
+
+    With `claims_only=True` the role is read from the access token and the
+    dependency resolves to a Principal without loading the User row.
     """
-    def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role not in required_roles:
+    def check(role: str) -> None:
+        if role not in required_roles:
+            auth_failures_total.inc("forbidden")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Not enough permissions. Required roles: {required_roles}",
             )
+
+    if claims_only:
+        def principal_checker(principal: Principal = Depends(get_current_principal)):
+            check(principal.role)
+            return principal
+        return principal_checker
+
+    def role_checker(current_user: Union[User, CachedUser] = Depends(get_authenticated_user)):
+        check(current_user.role)
         return current_user
     return role_checker
 
@@ -93,10 +275,10 @@ def get_current_user_from_cookie(
     try:
         payload = decode_access_token(token)
         user_id: str = payload.get("sub")
-        if user_id is None:
+        if user_id is None or payload.get("type") == "refresh":
             return None
         user = db.query(User).filter(User.id == user_id).first()
         return user
-    except JWTError:
+    except (JWTError, ValueError):
         return None
 
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+from app.core.timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full; mapped to 503 by app.main"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated process pool so hashing neither holds the
+    request threadpool nor serializes on the GIL.
+
+    At most `max_pending` hash/verify calls may be queued or running; beyond
+    that callers get HashingOverloaded immediately instead of every login
+    slowing down together.
+    """
+
+    def __init__(self, workers: int = 0, max_pending: int = 64):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingOverloaded()
+            self._pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        with timed("bcrypt"):
+            return await asyncio.wrap_future(self._submit(get_password_hash, password))
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash when the stored cost factor is outdated"""
+        with timed("bcrypt"):
+            return await asyncio.wrap_future(
+                self._submit(verify_and_update_password, password, hashed)
+            )
+
+    def hash_sync(self, password: str) -> str:
+        with timed("bcrypt"):
+            return self._submit(get_password_hash, password).result()
+
+    def verify_and_update_sync(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        with timed("bcrypt"):
+            return self._submit(verify_and_update_password, password, hashed).result()
+
+    def hash_many(self, passwords: Iterable[str], window: Optional[int] = None) -> Iterator[str]:
+        """
+        Hash passwords in parallel, yielding results in input order.
+
+        Keeps at most `window` hashes in flight (half the pending limit by
+        default) and waits instead of failing when the pool is busy, so bulk
+        work shares capacity with interactive logins rather than starving them.
+        """
+        window = window or max(1, self.max_pending // 2)
+        in_flight: deque[Future] = deque()
+        for password in passwords:
+            while True:
+                if len(in_flight) >= window:
+                    yield in_flight.popleft().result()
+                try:
+                    in_flight.append(self._submit(get_password_hash, password))
+                    break
+                except HashingOverloaded:
+                    if not in_flight:
+                        time.sleep(0.05)
+                    else:
+                        yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.HASHING_WORKERS,
+    max_pending=settings.HASHING_MAX_PENDING,
+)
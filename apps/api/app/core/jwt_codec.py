@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Optional
+
+try:
+    import orjson
+
+    def _dumps(value: dict) -> bytes:
+        return orjson.dumps(value)
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    def _dumps(value: dict) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+# Claims we rely on and the types they must have when present
+_CLAIM_TYPES = {"sub": str, "type": str, "role": str}
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class HS256Codec:
+    """
+    Minimal HS256 JWT encoder/decoder.
+
+    HMAC keys are prepared once and copied per token, and the encoded header
+    for each key id is computed up front. Only the claims the API uses are
+    validated (`exp`, plus the types of `sub`, `type` and `role`).
+
+    `keys` maps key id to secret. The active key signs new tokens and
+    every key in the ring verifies, so secrets can be rotated by adding a new
+    kid, making it active, and dropping the old one once its tokens expire.
+    Tokens without a `kid` header are verified with `default_secret`.
+    """
+
+    def __init__(
+        self,
+        keys: dict[str, str],
+        active_kid: Optional[str] = None,
+        default_secret: Optional[str] = None,
+    ):
+        if active_kid is not None and active_kid not in keys:
+            raise ValueError(f"Active key id {active_kid!r} is not in the key ring")
+        if active_kid is None and default_secret is None:
+            raise ValueError("A signing key is required")
+
+        self._macs = {
+            kid: hmac.new(secret.encode(), digestmod=hashlib.sha256)
+            for kid, secret in keys.items()
+        }
+        self._default_mac = (
+            hmac.new(default_secret.encode(), digestmod=hashlib.sha256)
+            if default_secret is not None
+            else None
+        )
+        # Encoded header segment -> MAC, so known headers skip JSON parsing entirely
+        self._headers: dict[str, "hmac.HMAC"] = {
+            self._header_segment(kid): mac for kid, mac in self._macs.items()
+        }
+        if self._default_mac is not None:
+            self._headers[self._header_segment(None)] = self._default_mac
+
+        self._signing_header = self._header_segment(active_kid).encode()
+        self._signing_mac = self._macs[active_kid] if active_kid else self._default_mac
+
+    @staticmethod
+    def _header_segment(kid: Optional[str]) -> str:
+        header = {"alg": "HS256", "typ": "JWT"}
+        if kid is not None:
+            header["kid"] = kid
+        return _b64encode(json.dumps(header, separators=(",", ":")).encode()).decode()
+
+    def encode(self, claims: dict) -> str:
+        signing_input = self._signing_header + b"." + _b64encode(_dumps(claims))
+        mac = self._signing_mac.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + _b64encode(mac.digest())).decode()
+
+    def decode(self, token: str, now: Optional[float] = None) -> dict:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+        except ValueError:
+            raise InvalidToken("Invalid token") from None
+
+        mac = self._headers.get(header_segment)
+        if mac is None:
+            mac = self._mac_for_header(header_segment)
+
+        mac = mac.copy()
+        mac.update(f"{header_segment}.{payload_segment}".encode())
+        try:
+            signature = _b64decode(signature_segment)
+            if not hmac.compare_digest(mac.digest(), signature):
+                raise InvalidToken("Invalid token")
+            claims = _loads(_b64decode(payload_segment))
+        except (ValueError, TypeError):
+            raise InvalidToken("Invalid token") from None
+
+        if not isinstance(claims, dict):
+            raise InvalidToken("Invalid token")
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise InvalidToken("Invalid token")
+        if (time.time() if now is None else now) >= exp:
+            raise ExpiredToken("Token has expired")
+        for claim, expected in _CLAIM_TYPES.items():
+            value = claims.get(claim)
+            if value is not None and not isinstance(value, expected):
+                raise InvalidToken("Invalid token")
+        return claims
+
+    def _mac_for_header(self, header_segment: str) -> "hmac.HMAC":
+        """Slow path for headers we did not issue verbatim (e.g. other key order)"""
+        try:
+            header = _loads(_b64decode(header_segment))
+        except (ValueError, TypeError):
+            raise InvalidToken("Invalid token") from None
+        if not isinstance(header, dict) or header.get("alg") != "HS256":
+            raise InvalidToken("Invalid token")
+        kid = header.get("kid")
+        mac = self._macs.get(kid) if kid is not None else self._default_mac
+        if mac is None:
+            raise InvalidToken("Invalid token")
+        return mac
+
+
+def parse_key_ring(spec: str) -> dict[str, str]:
+    """Parse "kid1:secret1,kid2:secret2" into {kid: secret}"""
+    keys = {}
+    for item in spec.split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if sep and kid and secret:
+            keys[kid] = secret
+    return keys
@@ -1,11 +1,100 @@
+import atexit
+import json
 import logging
+import queue
 import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
 logger = logging.getLogger("eduequity")
 
-def setup_logging(level: str = "INFO") -> None:
-    logging.basicConfig(
-        level=getattr(logging, level.upper(), logging.INFO),
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+# Correlates every record emitted while serving a request; set by RequestIdMiddleware
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(request_id)s | %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id (runs in the emitting context)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including structured extras such as `http`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        http = getattr(record, "http", None)
+        if http is not None:
+            entry["http"] = http
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_logger_levels(spec: str) -> dict[str, int]:
+    """Parse "sqlalchemy.engine=WARNING,eduequity.access=INFO" into logger levels"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = getattr(logging, level.strip().upper(), logging.INFO)
+    return levels
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", logger_levels: str = "") -> None:
+    """
+    Install a non-blocking logging pipeline.
+
+    Loggers only enqueue records through a QueueHandler; a QueueListener
+    thread formats them (text or JSON) and writes them to stdout, so a slow
+    or backpressured stdout never stalls request handling.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    else:
+        atexit.register(shutdown_logging)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    for name, logger_level in parse_logger_levels(logger_levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
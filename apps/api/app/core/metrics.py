@@ -0,0 +1,485 @@
+import glob
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Seconds; spans sub-millisecond JWT work up to slow bcrypt/SQL outliers
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Counters and histograms of exited workers, in the multiprocess directory
+RETIRED_FILE = "retired.json"
+
+
+class _Metric:
+    """
+    Base for in-process metrics.
+
+    Every thread writes to its own shard (a plain dict keyed by label values),
+    so updates never take a lock; a scrape sums the shards. Copying a dict is
+    atomic under the GIL, which keeps reads consistent per shard. Shards of
+    threads that have exited are folded into one retired shard whenever a
+    shard is added or read, so thread churn doesn't grow the list.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _retire_dead_shards(self) -> None:
+        """Called with _shards_lock held; a dead thread's shard no longer changes"""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._add(self._retired, shard)
+        self._shards = live
+
+    def _shard_copies(self) -> list[dict]:
+        with self._shards_lock:
+            self._retire_dead_shards()
+            shards = [shard for _, shard in self._shards]
+            retired = self._add({}, self._retired)
+        return [retired] + [dict(shard) for shard in shards]
+
+    def _add(self, totals: dict, shard: dict) -> dict:
+        """Add a shard's samples into `totals` and return it"""
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        totals: dict = {}
+        for shard in self._shard_copies():
+            self._add(totals, shard)
+        return totals
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0.0) + amount
+
+    def _add(self, totals: dict, shard: dict) -> dict:
+        for key, value in shard.items():
+            totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+class Gauge(Counter):
+    """Up/down gauge; each thread's shard holds its net delta"""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; bucket counts are stored non-cumulatively"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        shard = self._shard()
+        series = shard.get(label_values)
+        if series is None:
+            # [bucket counts..., +Inf count, sum]
+            series = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _add(self, totals: dict, shard: dict) -> dict:
+        for key, series in shard.items():
+            current = totals.get(key)
+            if current is None:
+                totals[key] = list(series)
+            else:
+                for index, value in enumerate(series):
+                    current[index] += value
+        return totals
+
+    def summary(self, series: list) -> dict:
+        counts = series[:-1]
+        count = sum(counts)
+        return {
+            "count": count,
+            "sum": series[-1],
+            "avg": series[-1] / count if count else 0.0,
+            "p50": self._quantile(counts, count, 0.5),
+            "p95": self._quantile(counts, count, 0.95),
+            "p99": self._quantile(counts, count, 0.99),
+        }
+
+    def _quantile(self, counts: list, count: int, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        # counts has one more entry, the +Inf bucket, which has no finite bound
+        for bound, bucket_count in zip(self.buckets, counts, strict=False):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+# A collector returns {metric name: {label values tuple: value}} at scrape time;
+# collectors may only produce counters and gauges
+Collector = Callable[[], dict]
+
+# A derived metric computes {label values tuple: value} from the merged samples
+Derivation = Callable[[dict], dict]
+
+
+class Registry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text format.
+
+    With a multiprocess directory configured, every worker periodically writes
+    its samples to `<dir>/<pid>.json` and a scrape on any worker merges all
+    files: counters and histograms are summed across workers (including
+    exited ones), gauges only across workers that flushed recently. The
+    counters and histograms of exited workers are folded into
+    `<dir>/retired.json` and their files deleted, so restarts don't leave
+    a file per pid behind.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[tuple[Collector, dict[str, tuple]]] = []
+        self._derived: list[tuple[str, str, Derivation]] = []
+        self.multiproc_dir: Optional[str] = None
+        self.stale_after = 60.0
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def register_collector(self, collector: Collector, metrics: dict[str, tuple]) -> None:
+        """`metrics` maps each produced name to (kind, documentation, labels)"""
+        self._collectors.append((collector, metrics))
+
+    def register_derived(self, name: str, documentation: str, derive: Derivation) -> None:
+        """Unlabelled gauge computed after merging, e.g. a ratio of two counters"""
+        self._derived.append((name, documentation, derive))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        """Current samples of this process, keyed by metric name"""
+        samples = {name: metric.collect() for name, metric in self._metrics.items()}
+        for collector, _ in self._collectors:
+            for name, values in collector().items():
+                samples[name] = values
+        return samples
+
+    def configure_multiprocess(self, directory: str, stale_after: float) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.multiproc_dir = directory
+        self.stale_after = stale_after
+
+    def flush(self) -> None:
+        """Write this worker's samples for the other workers to merge"""
+        if self.multiproc_dir is None:
+            return
+        payload = {
+            name: [[list(key), value] for key, value in values.items()]
+            for name, values in self.snapshot().items()
+        }
+        path = os.path.join(self.multiproc_dir, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def retire(self) -> None:
+        """On shutdown: fold this worker's samples into the retired file"""
+        if self.multiproc_dir is None:
+            return
+        self.flush()
+        self._retire_files([os.path.join(self.multiproc_dir, f"{os.getpid()}.json")])
+        # A later flush would write the same samples again
+        self.multiproc_dir = None
+
+    def _retire_files(self, paths: list[str]) -> None:
+        """Add the counters and histograms in `paths` to the retired file, then delete them"""
+        kinds = {name: kind for name, kind in self._kinds().items() if kind != "gauge"}
+        retired_path = os.path.join(self.multiproc_dir, RETIRED_FILE)
+        with open(os.path.join(self.multiproc_dir, "retired.lock"), "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another worker may have folded some of them while we waited
+            paths = [path for path in paths if os.path.exists(path)]
+            if not paths:
+                return
+            merged: dict = {}
+            for path in [retired_path] + paths:
+                self._add_file(merged, path, kinds, live=False)
+            payload = {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in merged.items()
+            }
+            tmp_path = f"{retired_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, retired_path)
+            for path in paths:
+                os.remove(path)
+
+    def _merged(self) -> dict:
+        if self.multiproc_dir is None:
+            return self.snapshot()
+
+        self.flush()
+        exited = [
+            path for path in glob.glob(os.path.join(self.multiproc_dir, "*.json"))
+            if _exited(path)
+        ]
+        if exited:
+            self._retire_files(exited)
+
+        kinds = self._kinds()
+        merged: dict = {}
+        now = time.time()
+        for path in glob.glob(os.path.join(self.multiproc_dir, "*.json")):
+            try:
+                live = now - os.path.getmtime(path) <= self.stale_after
+            except OSError:
+                continue
+            self._add_file(merged, path, kinds, live)
+        return merged
+
+    def _add_file(self, merged: dict, path: str, kinds: dict[str, str], live: bool) -> None:
+        """Add one worker file's samples of the metrics in `kinds` into `merged`"""
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, entries in payload.items():
+            kind = kinds.get(name)
+            if kind is None or (kind == "gauge" and not live):
+                continue
+            values = merged.setdefault(name, {})
+            for key, value in entries:
+                key = tuple(key)
+                if kind == "histogram":
+                    current = values.get(key)
+                    if current is None:
+                        values[key] = list(value)
+                    else:
+                        for index, item in enumerate(value):
+                            current[index] += item
+                else:
+                    values[key] = values.get(key, 0.0) + value
+
+    def _kinds(self) -> dict[str, str]:
+        kinds = {name: metric.kind for name, metric in self._metrics.items()}
+        for _, metrics in self._collectors:
+            kinds.update({name: spec[0] for name, spec in metrics.items()})
+        return kinds
+
+    def _descriptions(self) -> Iterable[tuple[str, str, str, tuple]]:
+        for name, metric in self._metrics.items():
+            yield name, metric.kind, metric.documentation, metric.labels
+        for _, metrics in self._collectors:
+            for name, (kind, documentation, labels) in metrics.items():
+                yield name, kind, documentation, labels
+
+    def render(self) -> str:
+        samples = self._merged()
+        lines = []
+        for name, kind, documentation, labels in self._descriptions():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(samples.get(name, {}).items()):
+                if kind == "histogram":
+                    metric = self._metrics[name]
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (math.inf,), value[:-1], strict=True):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else repr(bound)
+                        lines.append(
+                            f"{name}_bucket{_labels(labels + ('le',), key + (le,))} {cumulative}"
+                        )
+                    lines.append(f"{name}_sum{_labels(labels, key)} {value[-1]}")
+                    lines.append(f"{name}_count{_labels(labels, key)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(labels, key)} {_number(value)}")
+        for name, documentation, derive in self._derived:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for value in derive(samples).values():
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _exited(path: str) -> bool:
+    """Whether the worker that wrote `<pid>.json` is gone"""
+    name = os.path.basename(path)[:-len(".json")]
+    if not name.isdigit() or int(name) == os.getpid():
+        return False
+    try:
+        os.kill(int(name), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        # e.g. PermissionError: the pid is alive but not ours
+        return False
+    return False
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+REGISTRY = Registry()
+
+http_requests_total = REGISTRY.counter(
+    "eduequity_http_requests_total",
+    "HTTP requests by method, route template and status",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = REGISTRY.histogram(
+    "eduequity_http_request_duration_seconds",
+    "HTTP request latency by method and route template",
+    ("method", "route"),
+)
+http_requests_in_flight = REGISTRY.gauge(
+    "eduequity_http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+auth_failures_total = REGISTRY.counter(
+    "eduequity_auth_failures_total",
+    "Rejected authentication attempts by reason",
+    ("reason",),
+)
+request_phase_seconds = REGISTRY.histogram(
+    "eduequity_request_phase_seconds",
+    "Time spent per request in named phases (jwt, user_lookup, bcrypt, db, render)",
+    ("phase",),
+)
+attendance_marks_total = REGISTRY.counter(
+    "eduequity_attendance_marks_total",
+    "Attendance mark attempts by outcome",
+    ("outcome",),
+)
+attendance_flush_seconds = REGISTRY.histogram(
+    "eduequity_attendance_flush_seconds",
+    "Time to write one drained batch of attendance marks",
+)
+attendance_flushed_marks_total = REGISTRY.counter(
+    "eduequity_attendance_flushed_marks_total",
+    "Attendance marks written to the database, by source (buffer, replay)",
+    ("source",),
+)
+attendance_flush_failures_total = REGISTRY.counter(
+    "eduequity_attendance_flush_failures_total",
+    "Attendance flushes that failed and were requeued",
+)
+attendance_wal_sync_seconds = REGISTRY.histogram(
+    "eduequity_attendance_wal_sync_seconds",
+    "fsync latency of the attendance mark log",
+)
+rate_limited_total = REGISTRY.counter(
+    "eduequity_rate_limited_total",
+    "Requests rejected with 429 by the in-app rate limiter, by rule",
+    ("rule",),
+)
+quiz_submissions_total = REGISTRY.counter(
+    "eduequity_quiz_submissions_total",
+    "Quiz submissions by outcome (graded, duplicate, failed)",
+    ("outcome",),
+)
+quiz_grading_batch_seconds = REGISTRY.histogram(
+    "eduequity_quiz_grading_batch_seconds",
+    "Time to grade and write one batch of quiz submissions",
+)
+realtime_events_published_total = REGISTRY.counter(
+    "eduequity_realtime_events_published_total",
+    "Real-time events published, by type",
+    ("type",),
+)
+realtime_events_dropped_total = REGISTRY.counter(
+    "eduequity_realtime_events_dropped_total",
+    "Real-time events dropped from slow subscribers' queues",
+)
+jobs_finished_total = REGISTRY.counter(
+    "eduequity_jobs_finished_total",
+    "Background job runs by kind and outcome (succeeded, retried, failed, cancelled, interrupted)",
+    ("kind", "outcome"),
+)
+job_duration_seconds = REGISTRY.histogram(
+    "eduequity_job_duration_seconds",
+    "Run time of one background job attempt",
+    ("kind",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0),
+)
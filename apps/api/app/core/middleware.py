@@ -1,17 +1,128 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 import logging
+import random
+import time
+import uuid
 
-logger = logging.getLogger(__name__)
+from app.core.config import settings
+from app.core.logging import request_id_var
 
+logger = logging.getLogger("eduequity.access")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logger.info(f"Request: {request.method} {request.url}")
-        response = await call_next(request)
-        logger.info(f"Response: {response.status_code}")
-        return response
+
+def route_template(scope) -> str:
+    """
+    Path template of the matched route (e.g. "/api/v1/quiz/{quiz_id}").
+    Unmatched requests collapse into one value so labels stay bounded.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+class RequestIdMiddleware:
+    """
+    Bind a request id to the request's context so every log record emitted
+    while serving it can be correlated. Reuses an incoming X-Request-ID
+    (e.g. from nginx) and echoes it on the response.
+    """
+
+    header = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                request_id = value.decode("latin-1")[:128]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((self.header, request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI access log: one structured record per request carrying method,
+    route template, status, response bytes and duration.
+
+    Records are sampled at ACCESS_LOG_SAMPLE_RATE; server errors and requests
+    slower than ACCESS_LOG_SLOW_MS are always logged.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, slow_ms: float = 1000.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        response_bytes = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if (
+                status_code >= 500
+                or duration_ms >= self.slow_ms
+                or self.sample_rate >= 1.0
+                or random.random() < self.sample_rate
+            ):
+                route = route_template(scope)
+                logger.info(
+                    "%s %s %s %.1fms",
+                    scope["method"],
+                    route,
+                    status_code,
+                    duration_ms,
+                    extra={
+                        "http": {
+                            "method": scope["method"],
+                            "route": route,
+                            "path": scope["path"],
+                            "status": status_code,
+                            "bytes": response_bytes,
+                            "duration_ms": round(duration_ms, 3),
+                        }
+                    },
+                )
 
 
 def setup_middleware(app):
-    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+        slow_ms=settings.ACCESS_LOG_SLOW_MS,
+    )
+    # Added last so it is outermost and the id is bound before anything logs
+    app.add_middleware(RequestIdMiddleware)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.core.metrics import (
+    REGISTRY,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+)
+from app.core.middleware import route_template
+from app.core.token_cache import token_cache
+from app.db.session import get_pool_status
+from app.modules.attendance.buffer import mark_buffer
+from app.modules.jobs.runner import job_runner
+from app.modules.quiz.views import quiz_views
+from app.modules.realtime.hub import hub
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """Request counts, latency and in-flight requests keyed by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            route = route_template(scope)
+            method = scope["method"]
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, route)
+
+
+def _collect_runtime() -> dict:
+    pools = get_pool_status()
+    cache = token_cache.stats()
+    quizzes = quiz_views.stats()
+    samples = {
+        "eduequity_db_pool_checked_out": {},
+        "eduequity_db_pool_size": {},
+        "eduequity_db_pool_checkouts_total": {},
+        "eduequity_db_pool_timeouts_total": {},
+        "eduequity_db_pool_wait_seconds_total": {},
+        "eduequity_token_cache_hits_total": {(): cache["hits"]},
+        "eduequity_token_cache_misses_total": {(): cache["misses"]},
+        "eduequity_token_cache_entries": {(): cache["size"]},
+        "eduequity_hashing_pending": {(): password_hasher.pending},
+        "eduequity_attendance_buffer_depth": {(): mark_buffer.pending},
+        "eduequity_attendance_wal_segments": {(): mark_buffer.log.segments if mark_buffer.log else 0},
+        "eduequity_quiz_view_cache_hits_total": {(): quizzes["hits"]},
+        "eduequity_quiz_view_cache_misses_total": {(): quizzes["misses"]},
+        "eduequity_quiz_view_cache_bytes": {(): quizzes["bytes"]},
+        "eduequity_realtime_subscribers": {(): hub.subscribers},
+        "eduequity_jobs_running": {(lane,): job_runner.running(lane) for lane in job_runner.capacity},
+    }
+    for name, status in pools.items():
+        key = (name,)
+        samples["eduequity_db_pool_checked_out"][key] = status.get("checked_out", 0)
+        samples["eduequity_db_pool_size"][key] = status.get("size", 0)
+        samples["eduequity_db_pool_checkouts_total"][key] = status.get("checkouts", 0)
+        samples["eduequity_db_pool_timeouts_total"][key] = status.get("timeouts", 0)
+        samples["eduequity_db_pool_wait_seconds_total"][key] = status.get("wait_seconds_total", 0.0)
+    return samples
+
+
+def _token_cache_hit_ratio(samples: dict) -> dict:
+    hits = sum(samples.get("eduequity_token_cache_hits_total", {}).values())
+    misses = sum(samples.get("eduequity_token_cache_misses_total", {}).values())
+    return {(): hits / (hits + misses) if hits + misses else 0.0}
+
+
+REGISTRY.register_collector(
+    _collect_runtime,
+    {
+        "eduequity_db_pool_checked_out": ("gauge", "Connections checked out of the pool", ("pool",)),
+        "eduequity_db_pool_size": ("gauge", "Configured pool size", ("pool",)),
+        "eduequity_db_pool_checkouts_total": ("counter", "Connection checkouts", ("pool",)),
+        "eduequity_db_pool_timeouts_total": ("counter", "Checkouts that timed out waiting", ("pool",)),
+        "eduequity_db_pool_wait_seconds_total": ("counter", "Time spent waiting for connections", ("pool",)),
+        "eduequity_token_cache_hits_total": ("counter", "Verified-token cache hits", ()),
+        "eduequity_token_cache_misses_total": ("counter", "Verified-token cache misses", ()),
+        "eduequity_token_cache_entries": ("gauge", "Tokens currently cached", ()),
+        "eduequity_hashing_pending": ("gauge", "Password hash/verify calls in flight", ()),
+        "eduequity_attendance_buffer_depth": ("gauge", "Attendance marks waiting to be flushed", ()),
+        "eduequity_attendance_wal_segments": ("gauge", "Open attendance mark log segments", ()),
+        "eduequity_quiz_view_cache_hits_total": ("counter", "Quiz definitions served from the cache", ()),
+        "eduequity_quiz_view_cache_misses_total": ("counter", "Quiz definition cache misses and rechecks", ()),
+        "eduequity_quiz_view_cache_bytes": ("gauge", "Serialized quiz definitions held in memory", ()),
+        "eduequity_realtime_subscribers": ("gauge", "Live dashboards connected to this worker", ()),
+        "eduequity_jobs_running": ("gauge", "Background jobs running in this worker", ("lane",)),
+    },
+)
+REGISTRY.register_derived(
+    "eduequity_token_cache_hit_ratio",
+    "Share of token lookups served from the cache",
+    _token_cache_hit_ratio,
+)
+
+
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+async def _flush_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            REGISTRY.flush()
+        except OSError as e:
+            logger.warning(f"Could not flush metrics: {e}")
+
+
+def setup_metrics(app) -> None:
+    if not settings.METRICS_ENABLED:
+        return
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
+    if settings.METRICS_MULTIPROC_DIR:
+        REGISTRY.configure_multiprocess(
+            settings.METRICS_MULTIPROC_DIR,
+            stale_after=settings.METRICS_FLUSH_INTERVAL_SECONDS * 3,
+        )
+        flush_task = None
+
+        @app.on_event("startup")
+        async def start_metrics_flush():
+            nonlocal flush_task
+            flush_task = asyncio.create_task(
+                _flush_periodically(settings.METRICS_FLUSH_INTERVAL_SECONDS)
+            )
+
+        @app.on_event("shutdown")
+        async def stop_metrics_flush():
+            if flush_task is not None:
+                flush_task.cancel()
+            REGISTRY.retire()
@@ -0,0 +1,193 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.metrics import rate_limited_total
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    # Tokens left after this hit
+    remaining: float
+    # Seconds until the hit would have been allowed; 0 when it was
+    retry_after: float
+
+
+class LocalRateLimiter:
+    """
+    In-process token buckets; the stand-in for RedisRateLimiter when no
+    REDIS_URL is set. Each worker keeps its own buckets, so with N workers
+    a client gets up to N times the configured rate.
+
+    At most `max_entries` buckets are kept, least recently hit evicted
+    first: that bucket has had the longest to refill, so flooding the
+    limiter with new keys can't wipe the buckets of keys being limited
+    right now.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        # key -> (tokens, monotonic time they were counted), least recently hit first
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, capacity: int, period: float, cost: float = 1.0) -> Decision:
+        """
+        Take `cost` tokens from a bucket of `capacity` that refills completely
+        every `period` seconds. A cost of 0 only checks the bucket is not empty.
+        """
+        now = time.monotonic()
+        rate = capacity / period
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, entry[0] + (now - entry[1]) * rate)
+                self._buckets.move_to_end(key)
+            needed = cost or 1.0
+            if tokens < needed:
+                return Decision(False, tokens, (needed - tokens) / rate)
+            if cost:
+                if entry is None:
+                    while len(self._buckets) >= self.max_entries:
+                        self._buckets.popitem(last=False)
+                self._buckets[key] = (tokens - cost, now)
+            return Decision(True, tokens - cost, 0.0)
+
+
+# KEYS: bucket hash. ARGV: capacity, refill per second, cost
+_HIT_SCRIPT = """
+local capacity, rate, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = capacity
+if b[1] then tokens = math.min(capacity, tonumber(b[1]) + (now - tonumber(b[2])) * rate) end
+local needed = cost
+if cost == 0 then needed = 1 end
+if tokens < needed then return {0, tostring(tokens), tostring((needed - tokens) / rate)} end
+if cost > 0 then
+  redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - cost), 'ts', tostring(now))
+  redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+end
+return {1, tostring(tokens - cost), '0'}
+"""
+
+
+class RedisRateLimiter:
+    """
+    Token buckets shared by every worker, one small hash per key. The refill
+    arithmetic runs in a Lua script against the Redis clock, so a check is a
+    single round trip and workers with skewed clocks agree. A bucket expires
+    once it would have refilled, so idle clients cost no memory.
+
+    If Redis is unreachable the limiter lets requests through rather than
+    taking logins down with it.
+    """
+
+    def __init__(self, client, prefix: str = "rate-limit"):
+        self.client = client
+        self.prefix = prefix
+        self._hit = client.register_script(_HIT_SCRIPT)
+
+    async def hit(self, key: str, capacity: int, period: float, cost: float = 1.0) -> Decision:
+        try:
+            allowed, remaining, retry_after = await self._hit(
+                keys=[f"{self.prefix}:{key}"], args=[capacity, capacity / period, cost],
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return Decision(True, float(capacity), 0.0)
+        return Decision(bool(allowed), float(remaining), float(retry_after))
+
+
+def _create_limiter():
+    client = get_redis()
+    if client is None:
+        return LocalRateLimiter()
+    return RedisRateLimiter(client)
+
+
+rate_limiter = _create_limiter()
+
+
+def client_ip(request: Request) -> str:
+    """
+    The address the request came from. Behind RATE_LIMIT_TRUSTED_PROXIES
+    proxies it is read from X-Forwarded-For, counting from the right so a
+    client can't choose its own address by sending the header itself.
+    """
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if hops > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            return forwarded[-min(hops, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+
+def too_many_requests(rule: str, decision: Decision) -> HTTPException:
+    rate_limited_total.inc(rule)
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+    )
+
+
+def rate_limit(rule: str, capacity: int, period: float):
+    """
+    Dependency limiting a route to `capacity` requests per `period` seconds
+    per client IP, e.g. `dependencies=[Depends(rate_limit("login", 300, 60))]`.
+    """
+    async def limit(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        decision = await rate_limiter.hit(f"{rule}:ip:{client_ip(request)}", capacity, period)
+        if not decision.allowed:
+            raise too_many_requests(rule, decision)
+    return limit
+
+
+class LoginThrottle:
+    """
+    Per-account brute-force protection. Only failed attempts take tokens, so
+    an account allows RATE_LIMIT_LOGIN_FAILURES wrong passwords per
+    RATE_LIMIT_LOGIN_PERIOD_SECONDS from all addresses combined, and
+    students signing in to their own accounts from one school address never
+    hold each other up. Checking is a zero-cost hit: one dict lookup or one
+    Redis round trip, before any password hashing.
+    """
+
+    rule = "login_account"
+
+    def _key(self, email: str) -> str:
+        return f"{self.rule}:{email.strip().lower()}"
+
+    async def check(self, email: str) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        decision = await rate_limiter.hit(
+            self._key(email), settings.RATE_LIMIT_LOGIN_FAILURES, settings.RATE_LIMIT_LOGIN_PERIOD_SECONDS, cost=0,
+        )
+        if not decision.allowed:
+            raise too_many_requests(self.rule, decision)
+
+    async def failed(self, email: str) -> None:
+        if settings.RATE_LIMIT_ENABLED:
+            await rate_limiter.hit(
+                self._key(email), settings.RATE_LIMIT_LOGIN_FAILURES, settings.RATE_LIMIT_LOGIN_PERIOD_SECONDS,
+            )
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,25 @@
+from app.core.config import settings
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared asyncio Redis client, or None when REDIS_URL is not set.
+    The redis package is only imported when Redis is configured.
+    """
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        import redis.asyncio as redis
+
+        _client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
@@ -0,0 +1,62 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class TokenVersionState:
+    version: int
+    is_active: bool
+    checked_at: float
+
+
+class TokenVersionRegistry:
+    """
+    Per-process view of each user's current token version.
+
+    Access tokens carry the user's `token_version` as the `ver` claim. Bumping
+    the column (on deactivation or a role change) revokes every outstanding
+    token. Claims-only authentication trusts a remembered version for at most
+    `recheck_seconds` before re-reading it from the database, which bounds how
+    long a revoked token stays usable on workers that did not see the change.
+    """
+
+    def __init__(self, recheck_seconds: float = 60.0, max_entries: int = 100000):
+        self.recheck_seconds = recheck_seconds
+        self.max_entries = max_entries
+        self._states: dict[str, TokenVersionState] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, user_id: str) -> Optional[TokenVersionState]:
+        state = self._states.get(user_id)
+        if state is None or time.monotonic() - state.checked_at > self.recheck_seconds:
+            return None
+        return state
+
+    def record(self, user_id: str, version: int, is_active: bool) -> TokenVersionState:
+        state = TokenVersionState(
+            version=version, is_active=bool(is_active), checked_at=time.monotonic()
+        )
+        with self._lock:
+            if len(self._states) >= self.max_entries and user_id not in self._states:
+                self._prune()
+            self._states[user_id] = state
+        return state
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._states.pop(user_id, None)
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.recheck_seconds
+        stale = [key for key, state in self._states.items() if state.checked_at < cutoff]
+        for key in stale:
+            del self._states[key]
+        if len(self._states) >= self.max_entries:
+            self._states.clear()
+
+
+token_versions = TokenVersionRegistry(recheck_seconds=settings.CLAIMS_RECHECK_SECONDS)
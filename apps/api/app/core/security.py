@@ -1,45 +1,67 @@
-from datetime import datetime, timedelta
-from typing import Any, Union
+import time
+from datetime import timedelta
+from typing import Any, Optional, Union
 
-from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.jwt_codec import HS256Codec, parse_key_ring
+from app.core.timing import timed
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max to the configured cost makes any other cost factor "needs update",
+# so hashes are transparently re-hashed on login when BCRYPT_ROUNDS changes
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 ALGORITHM = "HS256"
 
+# JWT_KEYS holds the rotating key ring; tokens without a kid (and deployments
+# without a ring) use JWT_SECRET_KEY
+jwt_codec = HS256Codec(
+    keys=parse_key_ring(settings.JWT_KEYS),
+    active_kid=settings.JWT_ACTIVE_KID or None,
+    default_secret=settings.JWT_SECRET_KEY,
+)
+
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None, data: dict = None
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    data: dict = None,
+    now: Optional[int] = None,
 ) -> str:
+    if now is None:
+        now = int(time.time())
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
+        expire = now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     to_encode = data.copy() if data else {}
     to_encode["exp"] = expire
     to_encode["sub"] = str(subject)
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return jwt_codec.encode(to_encode)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
 def decode_access_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise ValueError("Token has expired")
-    except jwt.JWTError:
-        raise ValueError("Invalid token")
+    """Verify a token and return its claims; raises ValueError when invalid or expired"""
+    with timed("jwt"):
+        return jwt_codec.decode(token)
@@ -0,0 +1,250 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+
+@dataclass
+class RefreshFamily:
+    """
+    One login session: the chain of refresh tokens descended from a login.
+    Only `current` may be exchanged; `previous` is honoured for
+    `reuse_grace` seconds so two tabs refreshing at once don't trip reuse
+    detection.
+    """
+
+    id: str
+    user_id: str
+    role: str
+    token_version: int
+    current: str
+    previous: str = ""
+    rotated_at: float = 0.0
+    created_at: float = 0.0
+
+
+@dataclass(frozen=True)
+class Rotation:
+    # "rotated": the current token was exchanged for `family.current`
+    # "grace": a just-replaced token was presented again; `family.current` is reissued
+    # "reused": an older token was presented; the family has been revoked
+    # "unknown": no such family (expired, revoked or never issued)
+    status: str
+    family: Optional[RefreshFamily] = None
+    user_id: Optional[str] = None
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex
+
+
+class LocalSessionStore:
+    """
+    In-process refresh-token families; the stand-in for RedisSessionStore
+    when no REDIS_URL is set. Families are only visible to the worker that
+    issued them, so it suits a single worker.
+    """
+
+    def __init__(self, ttl_seconds: float = 604800.0, reuse_grace: float = 10.0):
+        self.ttl_seconds = ttl_seconds
+        self.reuse_grace = reuse_grace
+        # family id -> (family, unix time it expires)
+        self._families: dict[str, tuple[RefreshFamily, float]] = {}
+        self._by_user: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self._last_expiry = time.monotonic()
+
+    async def create(self, user_id: str, role: str, token_version: int) -> RefreshFamily:
+        """Start a family for a new login; returns it with its first token id"""
+        now = time.time()
+        family = RefreshFamily(_new_id(), user_id, role, token_version, _new_id(), created_at=now)
+        with self._lock:
+            if time.monotonic() - self._last_expiry > 60:
+                self._expire(now)
+            self._families[family.id] = (family, now + self.ttl_seconds)
+            self._by_user.setdefault(user_id, set()).add(family.id)
+        return replace(family)
+
+    async def rotate(self, family_id: str, token_id: str) -> Rotation:
+        """Exchange a refresh token id for the next one in its family"""
+        now = time.time()
+        with self._lock:
+            entry = self._families.get(family_id)
+            if entry is None or entry[1] < now:
+                return Rotation("unknown")
+            family = entry[0]
+            if token_id == family.current:
+                family.previous, family.current, family.rotated_at = token_id, _new_id(), now
+                self._families[family_id] = (family, now + self.ttl_seconds)
+                return Rotation("rotated", replace(family), family.user_id)
+            if token_id == family.previous and now - family.rotated_at <= self.reuse_grace:
+                return Rotation("grace", replace(family), family.user_id)
+            self._drop(family_id)
+            return Rotation("reused", user_id=family.user_id)
+
+    async def families(self, user_id: str) -> list[RefreshFamily]:
+        """A user's live sessions"""
+        now = time.time()
+        with self._lock:
+            entries = [self._families.get(family_id) for family_id in self._by_user.get(user_id, ())]
+            return [replace(entry[0]) for entry in entries if entry is not None and entry[1] >= now]
+
+    async def revoke(self, family_id: str) -> None:
+        with self._lock:
+            self._drop(family_id)
+
+    async def revoke_user(self, user_id: str) -> int:
+        """Revoke every family of a user; returns how many there were"""
+        with self._lock:
+            family_ids = list(self._by_user.get(user_id, ()))
+            for family_id in family_ids:
+                self._drop(family_id)
+            return len(family_ids)
+
+    def _drop(self, family_id: str) -> None:
+        entry = self._families.pop(family_id, None)
+        if entry is not None:
+            members = self._by_user.get(entry[0].user_id)
+            if members is not None:
+                members.discard(family_id)
+                if not members:
+                    del self._by_user[entry[0].user_id]
+
+    def _expire(self, now: float) -> None:
+        self._last_expiry = time.monotonic()
+        for family_id in [key for key, (_, expires) in self._families.items() if expires < now]:
+            self._drop(family_id)
+
+
+# KEYS: family hash. ARGV: presented token id, next token id, now, reuse grace, ttl
+_ROTATE_SCRIPT = """
+local f = redis.call('HMGET', KEYS[1], 'user_id', 'role', 'token_version', 'current', 'previous', 'rotated_at', 'created_at')
+if not f[1] then return {'unknown'} end
+if f[4] == ARGV[1] then
+  redis.call('HSET', KEYS[1], 'current', ARGV[2], 'previous', ARGV[1], 'rotated_at', ARGV[3])
+  redis.call('EXPIRE', KEYS[1], ARGV[5])
+  return {'rotated', f[1], f[2], f[3], ARGV[2], ARGV[1], ARGV[3], f[7]}
+end
+if f[5] == ARGV[1] and tonumber(ARGV[3]) - tonumber(f[6]) <= tonumber(ARGV[4]) then
+  return {'grace', f[1], f[2], f[3], f[4], f[5], f[6], f[7]}
+end
+redis.call('DEL', KEYS[1])
+return {'reused', f[1]}
+"""
+
+
+class RedisSessionStore:
+    """
+    Refresh-token families shared by every worker: one Redis hash per family
+    plus a set of family ids per user.
+
+    Rotation (compare the presented token with the family's current one,
+    then advance it, or delete the family on reuse) is a single Lua script,
+    so a refresh costs one round trip and two racing refreshes can't both
+    win. Revoking a session is one DEL; revoking a user pipelines the DELs
+    of all their families.
+    """
+
+    def __init__(self, client, ttl_seconds: int = 604800, reuse_grace: float = 10.0):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.reuse_grace = reuse_grace
+        self._rotate = client.register_script(_ROTATE_SCRIPT)
+
+    @staticmethod
+    def _key(family_id: str) -> str:
+        return f"refresh-family:{family_id}"
+
+    @staticmethod
+    def _user_key(user_id: str) -> str:
+        return f"refresh-families:{user_id}"
+
+    async def create(self, user_id: str, role: str, token_version: int) -> RefreshFamily:
+        family = RefreshFamily(_new_id(), user_id, role, token_version, _new_id(), created_at=time.time())
+        key, user_key = self._key(family.id), self._user_key(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "user_id": user_id,
+                "role": role,
+                "token_version": token_version,
+                "current": family.current,
+                "previous": "",
+                "rotated_at": 0,
+                "created_at": family.created_at,
+            })
+            pipe.expire(key, self.ttl_seconds)
+            pipe.sadd(user_key, family.id)
+            pipe.expire(user_key, self.ttl_seconds)
+            await pipe.execute()
+        return family
+
+    async def rotate(self, family_id: str, token_id: str) -> Rotation:
+        result = await self._rotate(
+            keys=[self._key(family_id)],
+            args=[token_id, _new_id(), time.time(), self.reuse_grace, self.ttl_seconds],
+        )
+        status = result[0]
+        if status in ("unknown", "reused"):
+            return Rotation(status, user_id=result[1] if status == "reused" else None)
+        user_id, role, version, current, previous, rotated_at, created_at = result[1:]
+        family = RefreshFamily(
+            family_id, user_id, role, int(version), current, previous, float(rotated_at), float(created_at)
+        )
+        return Rotation(status, family, user_id)
+
+    async def families(self, user_id: str) -> list[RefreshFamily]:
+        user_key = self._user_key(user_id)
+        family_ids = list(await self.client.smembers(user_key))
+        if not family_ids:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for family_id in family_ids:
+                pipe.hgetall(self._key(family_id))
+            results = await pipe.execute()
+        families, gone = [], []
+        for family_id, fields in zip(family_ids, results, strict=True):
+            if not fields:
+                gone.append(family_id)
+                continue
+            families.append(RefreshFamily(
+                family_id,
+                fields["user_id"],
+                fields["role"],
+                int(fields["token_version"]),
+                fields["current"],
+                fields["previous"],
+                float(fields["rotated_at"]),
+                float(fields["created_at"]),
+            ))
+        if gone:
+            await self.client.srem(user_key, *gone)
+        return families
+
+    async def revoke(self, family_id: str) -> None:
+        # The user's set keeps the id until revoke_user; deleting a missing key is harmless
+        await self.client.delete(self._key(family_id))
+
+    async def revoke_user(self, user_id: str) -> int:
+        user_key = self._user_key(user_id)
+        family_ids = await self.client.smembers(user_key)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for family_id in family_ids:
+                pipe.delete(self._key(family_id))
+            pipe.delete(user_key)
+            results = await pipe.execute()
+        return sum(results[:-1])
+
+
+def _create_store():
+    ttl = settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    client = get_redis()
+    if client is None:
+        return LocalSessionStore(ttl_seconds=ttl, reuse_grace=settings.REFRESH_REUSE_GRACE_SECONDS)
+    return RedisSessionStore(client, ttl_seconds=ttl, reuse_grace=settings.REFRESH_REUSE_GRACE_SECONDS)
+
+
+session_store = _create_store()
@@ -0,0 +1,112 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import request_phase_seconds
+
+# Phase name -> accumulated seconds for the request being served; None when off.
+# Threadpool workers run in a copy of the request context, which shares this dict.
+_phases: ContextVar[Optional[dict]] = ContextVar("request_phases", default=None)
+
+def record(name: str, seconds: float) -> None:
+    phases = _phases.get()
+    if phases is not None:
+        phases[name] = phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(name: str):
+    """Add the duration of the block to the current request's `name` phase"""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def timing_summary() -> dict:
+    return {
+        key[0]: request_phase_seconds.summary(series)
+        for key, series in request_phase_seconds.collect().items()
+    }
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that accounts its encoding time to the "render" phase"""
+
+    def render(self, content) -> bytes:
+        with timed("render"):
+            return super().render(content)
+
+
+def instrument_engine(engine) -> None:
+    """Account SQL execution time on `engine` to the "db" phase"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record("db", time.perf_counter() - conn.info["query_start"].pop())
+
+
+class ServerTimingMiddleware:
+    """
+    Collects named phase timings for each request, reports them in a
+    Server-Timing response header and folds them into the
+    eduequity_request_phase_seconds histogram.
+    """
+
+    def __init__(self, app, emit_header: bool = True):
+        self.app = app
+        self.emit_header = emit_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases: dict[str, float] = {}
+        token = _phases.set(phases)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.emit_header:
+                elapsed = time.perf_counter() - start
+                metrics = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+                metrics.append(f"total;dur={elapsed * 1000:.2f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(metrics).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _phases.reset(token)
+            phases["total"] = time.perf_counter() - start
+            for name, seconds in phases.items():
+                request_phase_seconds.observe(seconds, name)
+
+
+def setup_timing(app, engines: list) -> None:
+    """
+    Install the middleware and instrument `engines`. The engines are passed
+    in so this module stays free of app.db imports: security imports it,
+    and the password-hashing worker processes should not build engines.
+    """
+    if not settings.SERVER_TIMING_ENABLED:
+        return
+    for bind in engines:
+        instrument_engine(bind)
+    app.add_middleware(ServerTimingMiddleware, emit_header=settings.SERVER_TIMING_HEADER)
@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Slim, detached snapshot of the User columns needed per request"""
+
+    id: str
+    email: str
+    full_name: str
+    is_active: bool
+    role: str
+
+    @classmethod
+    def from_user(cls, user) -> "CachedUser":
+        return cls(
+            id=str(user.id),
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            role=user.role,
+        )
+
+
+@dataclass
+class _Entry:
+    claims: dict
+    user: CachedUser
+    expires_at: float
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified access tokens.
+
+    Entries are keyed by the SHA-256 of the raw token, so the token itself is
+    never kept in memory. Each entry expires after `ttl_seconds` or at the
+    token's own `exp`, whichever comes first.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._keys_by_user: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[tuple[dict, CachedUser]]:
+        key = self.key_for(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.claims, entry.user
+
+    def set(self, token: str, claims: dict, user: CachedUser) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        exp = claims.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= time.time():
+            return
+
+        key = self.key_for(token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(claims=claims, user=user, expires_at=expires_at)
+            self._keys_by_user.setdefault(user.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached token for a user, e.g. after deactivation or a role change"""
+        with self._lock:
+            keys = self._keys_by_user.pop(str(user_id), set())
+            for key in keys:
+                self._entries.pop(key, None)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry.user.id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry.user.id]
+
+
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+)
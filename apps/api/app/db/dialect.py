@@ -0,0 +1,28 @@
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(bind, table):
+    """
+    INSERT construct for the session's backend, exposing ON CONFLICT
+    (on_conflict_do_nothing / on_conflict_do_update) on PostgreSQL and SQLite.
+    """
+    name = bind.dialect.name
+    try:
+        return _INSERTS[name](table)
+    except KeyError:
+        raise NotImplementedError(f"Upserts are not supported on {name}") from None
+
+
+def lock_for_writes(db, table) -> None:
+    """
+    Make other writers of `table` wait until this transaction ends; readers
+    are not blocked. SQLite already admits one writer at a time.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE"))
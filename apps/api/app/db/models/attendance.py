@@ -0,0 +1,71 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+
+from app.db.models.base import BaseModel
+
+
+class AttendanceSession(BaseModel):
+    __tablename__ = "attendance_sessions"
+
+    class_id = Column(String, index=True, nullable=False)
+    title = Column(String, nullable=False)
+    teacher_id = Column(String(36), ForeignKey("users.id"), index=True, nullable=False)
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
+    is_open = Column(Boolean, nullable=False, default=True)
+
+
+class Attendance(BaseModel):
+    __tablename__ = "attendance"
+    __table_args__ = (
+        UniqueConstraint("session_id", "student_id", name="uq_attendance_session_student"),
+    )
+
+    session_id = Column(String(36), ForeignKey("attendance_sessions.id"), index=True, nullable=False)
+    student_id = Column(String(36), ForeignKey("users.id"), index=True, nullable=False)
+    marked_at = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String, nullable=False, default="present")
+
+
+class AttendanceClassRollup(BaseModel):
+    """Sessions held and marks recorded per class per day/week (keyed by session start, UTC)"""
+
+    __tablename__ = "attendance_class_rollups"
+    __table_args__ = (
+        UniqueConstraint("class_id", "period", "period_start", name="uq_attendance_class_rollup"),
+        Index("ix_attendance_class_rollups_period", "period", "period_start"),
+    )
+
+    class_id = Column(String, nullable=False)
+    period = Column(String, nullable=False)  # "day", "week"
+    period_start = Column(Date, nullable=False)
+    sessions = Column(Integer, nullable=False, default=0)
+    marks = Column(Integer, nullable=False, default=0)
+
+
+class AttendanceStudentRollup(BaseModel):
+    """Sessions attended per student per class per day/week"""
+
+    __tablename__ = "attendance_student_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "student_id", "class_id", "period", "period_start",
+            name="uq_attendance_student_rollup",
+        ),
+        Index("ix_attendance_student_rollups_class", "class_id", "period", "period_start"),
+    )
+
+    student_id = Column(String(36), nullable=False)
+    class_id = Column(String, nullable=False)
+    period = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False)
+    attended = Column(Integer, nullable=False, default=0)
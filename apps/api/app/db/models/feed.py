@@ -0,0 +1,25 @@
+from sqlalchemy import JSON, Column, ForeignKey, Index, String, Text
+
+from app.db.models.base import BaseModel
+
+
+class FeedItem(BaseModel):
+    """
+    One entry in the activity feed, written once for its audience and
+    merged into each reader's timeline when read.
+    """
+
+    __tablename__ = "feed_items"
+    __table_args__ = (
+        # Serves the per-audience keyset scans; id breaks ties between equal timestamps
+        Index("ix_feed_items_audience_created", "audience", "created_at", "id"),
+    )
+
+    # "school", "staff", "class:<class id>" or "user:<user id>"
+    audience = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # "announcement", "quiz_result", "approval"
+    actor_id = Column(String(36), ForeignKey("users.id"), nullable=True)
+    title = Column(String, nullable=False)
+    body = Column(Text, nullable=True)
+    # Kind-specific payload, e.g. quiz id and score
+    data = Column(JSON, nullable=False, default=dict)
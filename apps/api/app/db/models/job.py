@@ -0,0 +1,45 @@
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+
+from app.db.models.base import BaseModel
+
+
+class Job(BaseModel):
+    """A unit of background work, claimed and run by app.modules.jobs.runner"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # The claim query: queued jobs that are due, highest priority first
+        Index("ix_jobs_claim", "status", "priority", "run_after"),
+    )
+
+    kind = Column(String, index=True, nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="queued")  # "queued", "running", "succeeded", "failed", "cancelled"
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False)
+    # Worker holding the job while it runs, and when it last checked in
+    worker = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    message = Column(String, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    result = Column(JSON, nullable=True)
+    # File name of the job's output under JOBS_ARTIFACT_DIR/<job id>/
+    artifact = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, String
+
+from app.db.models.base import BaseModel
+
+
+class LearningGapAlert(BaseModel):
+    """Current learning-gap alerts; each analysis run replaces the whole set"""
+
+    __tablename__ = "learning_gap_alerts"
+
+    student_id = Column(String(36), ForeignKey("users.id"), index=True, nullable=False)
+    class_id = Column(String, index=True, nullable=False)
+    kind = Column(String, nullable=False)  # "low_performance", "declining", "low_attendance"
+    severity = Column(String, nullable=False)  # "medium", "high"
+    # The metrics behind the alert (z-score, class gap, trend, attendance rate)
+    details = Column(JSON, nullable=False, default=dict)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
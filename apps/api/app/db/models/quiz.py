@@ -0,0 +1,67 @@
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+
+from app.db.models.base import BaseModel
+
+
+class Quiz(BaseModel):
+    __tablename__ = "quizzes"
+
+    title = Column(String, nullable=False)
+    class_id = Column(String, index=True, nullable=False)
+    teacher_id = Column(String(36), ForeignKey("users.id"), index=True, nullable=False)
+    questions = Column(JSON, nullable=False, default=list)
+    # Bumped on every edit; submissions record the version they answered
+    version = Column(Integer, nullable=False, default=1)
+    is_published = Column(Boolean, nullable=False, default=False)
+    time_limit_minutes = Column(Integer, nullable=True)
+
+
+class QuizSubmission(BaseModel):
+    __tablename__ = "quiz_submissions"
+    __table_args__ = (
+        UniqueConstraint("quiz_id", "student_id", name="uq_quiz_submission_student"),
+        Index("ix_quiz_submissions_class_submitted", "class_id", "submitted_at"),
+    )
+
+    quiz_id = Column(String(36), ForeignKey("quizzes.id"), index=True, nullable=False)
+    student_id = Column(String(36), ForeignKey("users.id"), index=True, nullable=False)
+    # Copied from the quiz so analytics can read scores without a join
+    class_id = Column(String, nullable=False)
+    quiz_version = Column(Integer, nullable=False)
+    answers = Column(JSON, nullable=False, default=dict)
+    score = Column(Float, nullable=False, default=0.0)
+    max_score = Column(Float, nullable=False, default=0.0)
+    submitted_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class QuizAttempt(BaseModel):
+    """
+    Autosaved progress of an attempt that has not been submitted yet.
+    Live attempts are kept in the attempt store; this row is its periodic
+    checkpoint and is deleted when the attempt is submitted.
+    """
+
+    __tablename__ = "quiz_attempts"
+    __table_args__ = (
+        UniqueConstraint("quiz_id", "student_id", name="uq_quiz_attempt_student"),
+    )
+
+    quiz_id = Column(String(36), ForeignKey("quizzes.id"), index=True, nullable=False)
+    student_id = Column(String(36), ForeignKey("users.id"), index=True, nullable=False)
+    quiz_version = Column(Integer, nullable=False)
+    answers = Column(JSON, nullable=False, default=dict)
+    # Highest autosave sequence number applied
+    seq = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    saved_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,7 +1,9 @@
-from sqlalchemy import Boolean, Column, String
+from sqlalchemy import Boolean, Column, Integer, String, event, inspect
 from sqlalchemy.orm import relationship
 
+from app.core.revocation import token_versions
 from app.core.security import get_password_hash
+from app.core.token_cache import token_cache
 from app.db.models.base import BaseModel
 
 
@@ -13,6 +15,37 @@ class User(BaseModel):
     full_name = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     role = Column(String, nullable=False)  # "student", "teacher", "principal"
+    # Embedded in access tokens as "ver"; bumping it revokes outstanding tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     def hash_password(self, password: str) -> str:
         return get_password_hash(password)
+
+
+# Columns whose change must not be masked by a cached token
+AUTH_SENSITIVE_COLUMNS = ("email", "full_name", "is_active", "role")
+
+# Columns whose change revokes every token already issued to the user
+REVOKING_COLUMNS = ("is_active", "role")
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in REVOKING_COLUMNS):
+        target.token_version = (target.token_version or 0) + 1
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_cached_tokens(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in AUTH_SENSITIVE_COLUMNS):
+        token_cache.invalidate_user(str(target.id))
+    if state.attrs.token_version.history.has_changes():
+        token_versions.record(str(target.id), target.token_version, target.is_active)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User) -> None:
+    token_cache.invalidate_user(str(target.id))
+    token_versions.record(str(target.id), (target.token_version or 0) + 1, False)
@@ -1,18 +1,96 @@
+import itertools
+
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+    enable_sqlite_concurrency,
+    pool_status,
+)
 
-# Use SQLite for development if PostgreSQL is not available
-# Replace postgresql:// with sqlite:///
 db_url = settings.DATABASE_URL
-if "postgresql" in db_url:
-    # Try to use SQLite for local development when PostgreSQL is not available
-    db_url = "sqlite:///./eduequity.db"
 
-engine = create_engine(db_url, pool_pre_ping=True)
+
+def engine_options(url: str, async_: bool = False) -> dict:
+    """Pool configuration from Settings, adapted to the database backend"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        # In-memory databases live in a single connection; let SQLAlchemy pick the pool
+        if parsed.database in (None, "", ":memory:"):
+            return {}
+        options = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+        if not async_:
+            options["connect_args"] = {"check_same_thread": False}
+    else:
+        options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        }
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    options["poolclass"] = InstrumentedAsyncQueuePool if async_ else InstrumentedQueuePool
+    return options
+
+
+def build_engine(url: str):
+    engine = create_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        enable_sqlite_concurrency(engine)
+    return engine
+
+
+engine = build_engine(db_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replicas, used round-robin for read-only requests
+replica_engines = [
+    build_engine(url.strip())
+    for url in settings.DATABASE_REPLICA_URLS.split(",")
+    if url.strip()
+]
+ReplicaSessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica)
+    for replica in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessions) if ReplicaSessions else None
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching asyncio driver"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+async_db_url = settings.ASYNC_DATABASE_URL or to_async_url(db_url)
+
+
+def build_async_engine(url: str):
+    async_engine = create_async_engine(url, **engine_options(url, async_=True))
+    if async_engine.dialect.name == "sqlite":
+        enable_sqlite_concurrency(async_engine.sync_engine)
+    return async_engine
+
+
+# Only built when DB_ASYNC is on, so sync deployments don't need an asyncio driver
+async_engine = build_async_engine(async_db_url) if settings.DB_ASYNC else None
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
 
 def get_db():
     db = SessionLocal()
@@ -20,3 +98,48 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def read_session():
+    """Session on the next read replica, or the primary when none are configured"""
+    return next(_replica_cycle)() if _replica_cycle is not None else SessionLocal()
+
+
+def get_read_db():
+    """Session on the next read replica, or the primary when none are configured"""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_routed_db(request: Request):
+    """
+    Route read-only requests to a replica and everything else to the primary.
+    For route bodies only: authentication stays on get_db, so a revoked or
+    deactivated user is refused without waiting for replication.
+    """
+    if _replica_cycle is not None and request.method in READ_ONLY_METHODS:
+        db = next(_replica_cycle)()
+    else:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_status() -> dict:
+    """Pool occupancy and checkout wait metrics for every configured engine"""
+    status = {"primary": pool_status(engine)}
+    for index, replica in enumerate(replica_engines):
+        status[f"replica_{index}"] = pool_status(replica)
+    if async_engine is not None:
+        status["async"] = pool_status(async_engine.sync_engine)
+    return status
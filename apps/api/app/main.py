@@ -1,17 +1,29 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
+import functools
 import logging
 
 from app.core.config import settings
+from app.core.hashing import HashingOverloaded, password_hasher
 from app.core.logging import setup_logging
 from app.core.middleware import setup_middleware
+from app.core.monitoring import setup_metrics
+from app.core.redis_client import close_redis
+from app.core.timing import TimedJSONResponse, setup_timing
 from app.api.v1.router import api_router
 from app.db.models.base import Base
-from app.db.session import engine
+from app.db.session import async_engine, engine, replica_engines
+from app.modules.analytics.learning_gaps import run_learning_gap_analysis, run_periodically
+from app.modules.attendance.buffer import mark_buffer
+from app.modules.jobs.runner import job_runner
+from app.modules.quiz.attempts import attempt_checkpointer
+from app.modules.quiz.submissions import submission_batcher
+from app.modules.realtime.hub import hub
 
 # Setup logging
-setup_logging()
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_LEVELS)
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +44,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    default_response_class=TimedJSONResponse,
 )
 
 # CORS middleware
@@ -44,6 +57,11 @@ app.add_middleware(
 )
 
 # Setup custom middleware
+setup_timing(
+    app,
+    [engine, *replica_engines, *([async_engine.sync_engine] if async_engine is not None else [])],
+)
+setup_metrics(app)
 setup_middleware(app)
 
 # Include API routes
@@ -54,6 +72,35 @@ app.include_router(api_router, prefix="/api/v1")
 async def startup_event():
     """Create tables on startup"""
     create_tables()
+    await hub.start()
+    await mark_buffer.start()
+    await attempt_checkpointer.start()
+    if settings.JOBS_ENABLED:
+        await job_runner.start()
+    if settings.LEARNING_GAP_INTERVAL_MINUTES:
+        # Through the job queue when it runs, so at most one analysis runs at a time
+        run = (
+            functools.partial(job_runner.submit, "learning_gaps")
+            if settings.JOBS_ENABLED else run_learning_gap_analysis
+        )
+        app.state.learning_gap_task = asyncio.create_task(
+            run_periodically(settings.LEARNING_GAP_INTERVAL_MINUTES, run)
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and jobs, write buffered marks and submissions, and stop the hashing workers"""
+    task = getattr(app.state, "learning_gap_task", None)
+    if task is not None:
+        task.cancel()
+    await job_runner.stop(settings.JOBS_SHUTDOWN_GRACE_SECONDS)
+    await submission_batcher.stop()
+    await attempt_checkpointer.stop()
+    await mark_buffer.stop()
+    await hub.stop()
+    await close_redis()
+    password_hasher.shutdown()
 
 
 @app.get("/")
@@ -73,6 +120,16 @@ async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
 
+@app.exception_handler(HashingOverloaded)
+async def hashing_overloaded_handler(request, exc: HashingOverloaded):
+    """Shed login/registration load instead of queueing behind bcrypt"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
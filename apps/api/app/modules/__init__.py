@@ -0,0 +1 @@
+# Business logic modules
@@ -0,0 +1,377 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.dialect import lock_for_writes
+from app.db.models.attendance import AttendanceClassRollup, AttendanceStudentRollup
+from app.db.models.learning_gap import LearningGapAlert
+from app.db.models.quiz import QuizSubmission
+from app.db.session import SessionLocal
+from app.modules.attendance.rollups import period_start
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+
+# Rows fetched per round trip while loading columns
+LOAD_PARTITION_SIZE = 50000
+
+# Fewer submissions than this in the trend window gives no trend
+MIN_TREND_POINTS = 3
+
+
+@dataclass
+class Thresholds:
+    z_score: float = -1.5
+    trend_per_week: float = -0.05
+    attendance: float = 0.75
+
+    @classmethod
+    def from_settings(cls) -> "Thresholds":
+        return cls(
+            z_score=settings.LEARNING_GAP_Z_THRESHOLD,
+            trend_per_week=settings.LEARNING_GAP_TREND_THRESHOLD,
+            attendance=settings.LEARNING_GAP_ATTENDANCE_THRESHOLD,
+        )
+
+
+@dataclass
+class ScoreColumns:
+    """Quiz results as parallel arrays, one element per submission"""
+
+    students: np.ndarray  # distinct student ids
+    classes: np.ndarray  # distinct class ids
+    student_idx: np.ndarray  # index into students
+    class_idx: np.ndarray  # index into classes
+    quiz_idx: np.ndarray  # index into the distinct quiz ids
+    days: np.ndarray  # days relative to the analysis time (negative = past)
+    score: np.ndarray  # share of the maximum score, 0..1
+
+
+@dataclass
+class AttendanceColumns:
+    """Attendance rates as parallel arrays, one element per (student, class)"""
+
+    students: np.ndarray
+    classes: np.ndarray
+    rate: np.ndarray
+
+
+def _group_mean(index: np.ndarray, values: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    counts = np.bincount(index, minlength=size).astype(np.float64)
+    sums = np.bincount(index, weights=values, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan), counts
+
+
+def score_metrics(columns: ScoreColumns, trend_days: float) -> dict:
+    """
+    Per (student, class) metrics, computed with grouped reductions over the
+    whole district at once:
+
+    - mean score and its gap to the class mean
+    - mean z-score of the student's results, each against the class's
+      results on the same quiz, so a hard quiz doesn't pull everyone down
+    - least-squares trend (score share per week) over the last `trend_days`
+    - rolling change: mean of the last `trend_days` minus the window before
+    """
+    n_classes = len(columns.classes)
+    # Compact (student, class) pair index
+    pair_keys = columns.student_idx.astype(np.int64) * n_classes + columns.class_idx
+    pairs, pair_idx = np.unique(pair_keys, return_inverse=True)
+    n_pairs = len(pairs)
+    pair_class = (pairs % n_classes).astype(np.int64)
+
+    score = columns.score
+    class_mean, _ = _group_mean(columns.class_idx, score, n_classes)
+
+    # (quiz, class) group index for the z-scores
+    _, group_idx = np.unique(columns.quiz_idx * n_classes + columns.class_idx, return_inverse=True)
+    n_groups = int(group_idx.max()) + 1
+    group_mean, _ = _group_mean(group_idx, score, n_groups)
+    group_sq, _ = _group_mean(group_idx, score * score, n_groups)
+    group_std = np.sqrt(np.maximum(group_sq - group_mean ** 2, 0.0))
+    spread = group_std[group_idx]
+    z = np.divide(
+        score - group_mean[group_idx], spread,
+        out=np.zeros_like(score), where=spread > 1e-9,
+    )
+
+    mean_score, counts = _group_mean(pair_idx, score, n_pairs)
+    mean_z, _ = _group_mean(pair_idx, z, n_pairs)
+
+    # Trend: closed-form least squares over the submissions in the window
+    recent = columns.days >= -trend_days
+    t = np.where(recent, columns.days, 0.0)
+    y = np.where(recent, score, 0.0)
+    w = recent.astype(np.float64)
+    n = np.bincount(pair_idx, weights=w, minlength=n_pairs)
+    st = np.bincount(pair_idx, weights=t, minlength=n_pairs)
+    sy = np.bincount(pair_idx, weights=y, minlength=n_pairs)
+    stt = np.bincount(pair_idx, weights=t * t, minlength=n_pairs)
+    sty = np.bincount(pair_idx, weights=t * y, minlength=n_pairs)
+    denominator = n * stt - st * st
+    slope = np.full(n_pairs, np.nan)
+    np.divide(
+        (n * sty - st * sy) * 7.0, denominator,
+        out=slope, where=(n >= MIN_TREND_POINTS) & (denominator > 1e-9),
+    )
+
+    prior = (columns.days < -trend_days) & (columns.days >= -2 * trend_days)
+    recent_mean = np.divide(sy, n, out=np.full(n_pairs, np.nan), where=n > 0)
+    prior_n = np.bincount(pair_idx, weights=prior.astype(np.float64), minlength=n_pairs)
+    prior_sum = np.bincount(pair_idx, weights=np.where(prior, score, 0.0), minlength=n_pairs)
+    prior_mean = np.divide(prior_sum, prior_n, out=np.full(n_pairs, np.nan), where=prior_n > 0)
+
+    return {
+        "student_idx": pairs // n_classes,
+        "class_idx": pair_class,
+        "submissions": counts,
+        "mean_score": mean_score,
+        "class_gap": mean_score - class_mean[pair_class],
+        "mean_z": mean_z,
+        "trend_per_week": slope,
+        "rolling_change": recent_mean - prior_mean,
+    }
+
+
+def attendance_metrics(columns: AttendanceColumns) -> dict:
+    """Attendance rate per (student, class) and its gap to the class average"""
+    classes, class_idx = np.unique(columns.classes, return_inverse=True)
+    class_rate, _ = _group_mean(class_idx, columns.rate, len(classes))
+    return {"class_gap": columns.rate - class_rate[class_idx]}
+
+
+def _severity(high: np.ndarray) -> np.ndarray:
+    return np.where(high, "high", "medium")
+
+
+def detect_alerts(
+    scores: ScoreColumns,
+    attendance: AttendanceColumns,
+    thresholds: Thresholds,
+    trend_days: float,
+) -> list[dict]:
+    """Evaluate every threshold as an array mask; only flagged pairs become Python objects"""
+    alerts: list[dict] = []
+
+    if len(scores.score):
+        m = score_metrics(scores, trend_days)
+        students = scores.students[m["student_idx"]]
+        classes = scores.classes[m["class_idx"]]
+
+        low = m["mean_z"] <= thresholds.z_score
+        severity = _severity(m["mean_z"] <= thresholds.z_score - 1.0)
+        for i in np.flatnonzero(low):
+            alerts.append({
+                "student_id": students[i],
+                "class_id": classes[i],
+                "kind": "low_performance",
+                "severity": str(severity[i]),
+                "details": {
+                    "mean_z": round(float(m["mean_z"][i]), 3),
+                    "mean_score": round(float(m["mean_score"][i]), 3),
+                    "class_gap": round(float(m["class_gap"][i]), 3),
+                    "submissions": int(m["submissions"][i]),
+                },
+            })
+
+        trend = m["trend_per_week"]
+        declining = np.nan_to_num(trend, nan=0.0) <= thresholds.trend_per_week
+        severity = _severity(np.nan_to_num(trend, nan=0.0) <= 2 * thresholds.trend_per_week)
+        for i in np.flatnonzero(declining):
+            change = m["rolling_change"][i]
+            alerts.append({
+                "student_id": students[i],
+                "class_id": classes[i],
+                "kind": "declining",
+                "severity": str(severity[i]),
+                "details": {
+                    "trend_per_week": round(float(trend[i]), 4),
+                    "rolling_change": None if np.isnan(change) else round(float(change), 3),
+                    "mean_score": round(float(m["mean_score"][i]), 3),
+                },
+            })
+
+    if len(attendance.rate):
+        a = attendance_metrics(attendance)
+        low = attendance.rate < thresholds.attendance
+        severity = _severity(attendance.rate < thresholds.attendance - 0.15)
+        for i in np.flatnonzero(low):
+            alerts.append({
+                "student_id": attendance.students[i],
+                "class_id": attendance.classes[i],
+                "kind": "low_attendance",
+                "severity": str(severity[i]),
+                "details": {
+                    "attendance_rate": round(float(attendance.rate[i]), 3),
+                    "class_gap": round(float(a["class_gap"][i]), 3),
+                },
+            })
+    return alerts
+
+
+def load_scores(db: Session, now: datetime, lookback_days: int) -> ScoreColumns:
+    since = now - timedelta(days=lookback_days)
+    result = db.execute(
+        select(
+            QuizSubmission.student_id,
+            QuizSubmission.class_id,
+            QuizSubmission.quiz_id,
+            QuizSubmission.score,
+            QuizSubmission.max_score,
+            QuizSubmission.submitted_at,
+        )
+        .where(QuizSubmission.submitted_at >= since, QuizSubmission.max_score > 0)
+        .execution_options(yield_per=LOAD_PARTITION_SIZE)
+    )
+    students, classes, quizzes, scores, maxima, stamps = [], [], [], [], [], []
+    for partition in result.partitions():
+        student, klass, quiz, score, maximum, submitted = zip(*partition, strict=True)
+        students.extend(student)
+        classes.extend(klass)
+        quizzes.extend(quiz)
+        scores.extend(score)
+        maxima.extend(maximum)
+        stamps.extend(
+            (ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts).timestamp()
+            for ts in submitted
+        )
+
+    student_ids, student_idx = np.unique(np.array(students, dtype=object), return_inverse=True)
+    class_ids, class_idx = np.unique(np.array(classes, dtype=object), return_inverse=True)
+    _, quiz_idx = np.unique(np.array(quizzes, dtype=object), return_inverse=True)
+    return ScoreColumns(
+        students=student_ids,
+        classes=class_ids,
+        student_idx=student_idx.astype(np.int64),
+        class_idx=class_idx.astype(np.int64),
+        quiz_idx=quiz_idx.astype(np.int64),
+        days=(np.array(stamps, dtype=np.float64) - now.timestamp()) / SECONDS_PER_DAY,
+        score=np.clip(np.array(scores, dtype=np.float64) / np.array(maxima, dtype=np.float64), 0.0, 1.0),
+    )
+
+
+def load_attendance(db: Session, now: datetime, window_days: int) -> AttendanceColumns:
+    """Attendance rates over the trend window, summed from the weekly rollups"""
+    since = period_start("week", (now - timedelta(days=window_days)).date())
+    S, C = AttendanceStudentRollup, AttendanceClassRollup
+    held = dict(db.execute(
+        select(C.class_id, func.sum(C.sessions))
+        .where(C.period == "week", C.period_start >= since)
+        .group_by(C.class_id)
+    ).all())
+    rows = db.execute(
+        select(S.student_id, S.class_id, func.sum(S.attended))
+        .where(S.period == "week", S.period_start >= since)
+        .group_by(S.student_id, S.class_id)
+    ).all()
+    rows = [row for row in rows if held.get(row[1])]
+    return AttendanceColumns(
+        students=np.array([row[0] for row in rows], dtype=object),
+        classes=np.array([row[1] for row in rows], dtype=object),
+        rate=np.array([row[2] / held[row[1]] for row in rows], dtype=np.float64),
+    )
+
+
+_run_lock = threading.Lock()
+
+
+def analysis_running() -> bool:
+    return _run_lock.locked()
+
+
+def run_learning_gap_analysis(
+    db: Optional[Session] = None,
+    now: Optional[datetime] = None,
+    thresholds: Optional[Thresholds] = None,
+    on_stage: Optional[Callable[[float, str], None]] = None,
+) -> Optional[dict]:
+    """
+    Recompute every learning-gap alert and replace the stored set in one
+    transaction. Returns per-stage timings, or None if a run is already in
+    progress in this process.
+
+    `on_stage(fraction, stage)` is called before loading, computing and
+    writing; an exception it raises (a cancelled job) abandons the run
+    before anything is written.
+    """
+    on_stage = on_stage or (lambda fraction, stage: None)
+    if not _run_lock.acquire(blocking=False):
+        return None
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        now = now or datetime.now(timezone.utc)
+        thresholds = thresholds or Thresholds.from_settings()
+        trend_days = settings.LEARNING_GAP_TREND_DAYS
+
+        started = time.perf_counter()
+        on_stage(0.0, "Loading")
+        scores = load_scores(db, now, settings.LEARNING_GAP_LOOKBACK_DAYS)
+        attendance = load_attendance(db, now, trend_days)
+        loaded = time.perf_counter()
+        on_stage(0.4, "Computing")
+        alerts = detect_alerts(scores, attendance, thresholds, trend_days)
+        computed = time.perf_counter()
+
+        on_stage(0.8, "Writing")
+        # _run_lock only covers this process; a run in another worker or in
+        # the job runner's process lane waits here instead of interleaving
+        lock_for_writes(db, LearningGapAlert.__table__)
+        db.execute(delete(LearningGapAlert))
+        rows = [
+            {"id": str(uuid.uuid4()), "computed_at": now, **alert}
+            for alert in alerts
+        ]
+        for start in range(0, len(rows), 1000):
+            db.execute(insert(LearningGapAlert.__table__), rows[start:start + 1000])
+        db.commit()
+        written = time.perf_counter()
+
+        summary = {
+            "students": len(scores.students),
+            "classes": len(scores.classes),
+            "submissions": len(scores.score),
+            "attendance_rows": len(attendance.rate),
+            "alerts": len(alerts),
+            "load_s": round(loaded - started, 3),
+            "compute_s": round(computed - loaded, 3),
+            "write_s": round(written - computed, 3),
+        }
+        logger.info(f"Learning-gap analysis finished: {summary}")
+        return summary
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+        _run_lock.release()
+
+
+async def run_periodically(
+    interval_minutes: float,
+    run: Callable[[], object] = run_learning_gap_analysis,
+) -> None:
+    """
+    Recompute the alerts every `interval_minutes` off the event loop. `run`
+    does the work; with the job runner enabled it only enqueues a
+    learning_gaps job, so periodic and on-demand runs share its queue.
+    """
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            await asyncio.to_thread(run)
+        except Exception as e:
+            logger.error(f"Learning-gap analysis failed: {e}", exc_info=True)
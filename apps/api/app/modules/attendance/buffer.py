@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import (
+    attendance_flush_failures_total,
+    attendance_flush_seconds,
+    attendance_flushed_marks_total,
+)
+from app.db.dialect import dialect_insert
+from app.db.models.attendance import Attendance
+from app.db.session import SessionLocal
+from app.modules.attendance.rollups import record_marks
+from app.modules.attendance.wal import MarkLog, Segment
+from app.modules.realtime.events import publish_attendance
+
+logger = logging.getLogger(__name__)
+
+# Idle sessions are swept from the dedup sets at most this often
+_EXPIRE_INTERVAL_SECONDS = 60.0
+
+
+@dataclass
+class _Shard:
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # session id -> students already marked present
+    seen: dict[str, set[str]] = field(default_factory=dict)
+    # session id -> monotonic time of its latest mark
+    last_mark: dict[str, float] = field(default_factory=dict)
+    pending: list[dict] = field(default_factory=list)
+
+
+class MarkBuffer:
+    """
+    In-memory deduplication and batched persistence of attendance marks.
+
+    Sessions are spread over `shards` independently locked shards, so a
+    hall full of students scanning at once only contends with marks for the
+    same session, and each mark is a set lookup plus a list append. A
+    background task drains every shard once `flush_interval` elapses or a
+    shard holds its share of `batch_size` marks, and writes them with one
+    multi-row INSERT ... ON CONFLICT DO NOTHING per batch, which also absorbs
+    duplicates that reached other workers.
+
+    With a MarkLog, every accepted mark is appended to the log first and
+    `mark()` returns only once it is fsynced, so an acknowledged mark
+    survives a crash: segments are deleted after their marks are committed
+    and leftover segments are replayed by `start()`.
+    """
+
+    def __init__(
+        self,
+        shards: int = 16,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        dedup_ttl: float = 14400.0,
+        session_factory: Callable[[], Session] = SessionLocal,
+        log: Optional[MarkLog] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dedup_ttl = dedup_ttl
+        self.session_factory = session_factory
+        self.log = log
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._shard_threshold = max(1, batch_size // len(self._shards))
+        self._closed: set[str] = set()
+        self._flush_lock = threading.Lock()
+        self._last_expiry = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    @property
+    def pending(self) -> int:
+        return sum(len(shard.pending) for shard in self._shards)
+
+    def is_closed(self, session_id: str) -> bool:
+        return session_id in self._closed
+
+    def add(self, session_id: str, student_id: str, marked_at: datetime) -> bool:
+        """Queue a mark; returns False if the student was already marked"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            students = shard.seen.get(session_id)
+            if students is not None and student_id in students:
+                return False
+            row = {
+                "id": str(uuid.uuid4()),
+                "session_id": session_id,
+                "student_id": student_id,
+                "marked_at": marked_at,
+                "status": "present",
+            }
+            if self.log is not None:
+                self.log.append(row)
+            if students is None:
+                students = shard.seen[session_id] = set()
+            students.add(student_id)
+            shard.last_mark[session_id] = time.monotonic()
+            shard.pending.append(row)
+            depth = len(shard.pending)
+        if depth == self._shard_threshold:
+            self._wake()
+        return True
+
+    async def mark(self, session_id: str, student_id: str, marked_at: datetime) -> bool:
+        """Queue a mark and wait until it is durable; returns False if already marked"""
+        added = self.add(session_id, student_id, marked_at)
+        if added and self.log is not None:
+            await self.log.sync()
+        return added
+
+    def close_session(self, session_id: str) -> None:
+        """Reject further marks for the session in this process"""
+        self._closed.add(session_id)
+        self._wake()
+
+    def _drain(self) -> tuple[list[dict], list[Segment]]:
+        """Take every pending mark, and with a log the segments holding exactly those marks"""
+        if self.log is None:
+            rows: list[dict] = []
+            for shard in self._shards:
+                with shard.lock:
+                    batch, shard.pending = shard.pending, []
+                rows.extend(batch)
+            return rows, []
+
+        # Appends happen under the shard locks, so holding all of them makes
+        # rotating the log and swapping the buffers one atomic step
+        with ExitStack() as stack:
+            for shard in self._shards:
+                stack.enter_context(shard.lock)
+            if not any(shard.pending for shard in self._shards):
+                return [], []
+            retired = self.log.rotate()
+            rows = []
+            for shard in self._shards:
+                rows.extend(shard.pending)
+                shard.pending = []
+        return rows, retired
+
+    def _write(self, rows: list[dict]) -> None:
+        """
+        Insert marks and fold the ones that were new into the rollups, in one
+        transaction, then push them to the sessions' live dashboards.
+        """
+        db = self.session_factory()
+        try:
+            table = Attendance.__table__
+            new_marks: dict[str, list[str]] = {}
+            classes: dict[str, str] = {}
+            for start in range(0, len(rows), self.batch_size):
+                statement = (
+                    dialect_insert(db.get_bind(), table)
+                    .values(rows[start:start + self.batch_size])
+                    .on_conflict_do_nothing(index_elements=["session_id", "student_id"])
+                    .returning(table.c.session_id, table.c.student_id)
+                )
+                inserted = db.execute(statement).all()
+                classes.update(record_marks(db, inserted))
+                for session_id, student_id in inserted:
+                    new_marks.setdefault(session_id, []).append(student_id)
+            present = dict(db.execute(
+                select(Attendance.session_id, func.count())
+                .where(Attendance.session_id.in_(new_marks))
+                .group_by(Attendance.session_id)
+            ).all()) if new_marks else {}
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for session_id, student_ids in new_marks.items():
+            if session_id in classes:
+                publish_attendance(classes[session_id], session_id, student_ids, present.get(session_id, 0))
+
+    def _requeue(self, rows: list[dict]) -> None:
+        for row in rows:
+            shard = self._shard(row["session_id"])
+            with shard.lock:
+                shard.pending.append(row)
+
+    def flush(self) -> int:
+        """Write every pending mark; on failure the marks are requeued and the error re-raised"""
+        with self._flush_lock:
+            rows, retired = self._drain()
+            if rows:
+                started = time.perf_counter()
+                try:
+                    self._write(rows)
+                except Exception:
+                    attendance_flush_failures_total.inc()
+                    # The retired segments stay on disk until a later flush commits these rows
+                    self._requeue(rows)
+                    raise
+                attendance_flush_seconds.observe(time.perf_counter() - started)
+                attendance_flushed_marks_total.inc("buffer", amount=len(rows))
+                if retired:
+                    self.log.discard(retired)
+            self._expire_idle_sessions()
+            return len(rows)
+
+    def recover(self) -> int:
+        """Write the marks from log segments left behind by dead processes"""
+        if self.log is None:
+            return 0
+        recovered = 0
+        orphans = self.log.claim_orphans()
+        try:
+            for path in orphans:
+                try:
+                    rows = list(MarkLog.read_segment(path))
+                except FileNotFoundError:
+                    # Another worker replayed it first
+                    continue
+                if rows:
+                    self._write(rows)
+                    attendance_flushed_marks_total.inc("replay", amount=len(rows))
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                recovered += len(rows)
+                logger.info(f"Replayed {len(rows)} attendance marks from {path}")
+        finally:
+            # Releases the lock on a segment whose replay failed
+            orphans.close()
+        return recovered
+
+    def _expire_idle_sessions(self) -> None:
+        now = time.monotonic()
+        if now - self._last_expiry < _EXPIRE_INTERVAL_SECONDS:
+            return
+        self._last_expiry = now
+        cutoff = now - self.dedup_ttl
+        for shard in self._shards:
+            with shard.lock:
+                idle = [key for key, last in shard.last_mark.items() if last < cutoff]
+                for session_id in idle:
+                    del shard.last_mark[session_id]
+                    shard.seen.pop(session_id, None)
+                    self._closed.discard(session_id)
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Attendance flush failed, marks requeued: {e}")
+
+    async def start(self) -> None:
+        """Replay any orphaned log and start the background flusher"""
+        if self.log is not None:
+            self.log.open()
+            await asyncio.to_thread(self.recover)
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        self._wakeup = None
+        try:
+            await asyncio.to_thread(self.flush)
+        finally:
+            if self.log is not None:
+                # Anything still pending stays on disk for the next start to replay
+                self.log.close(remove=not self.pending)
+
+
+mark_buffer = MarkBuffer(
+    shards=settings.ATTENDANCE_BUFFER_SHARDS,
+    batch_size=settings.ATTENDANCE_FLUSH_BATCH_SIZE,
+    flush_interval=settings.ATTENDANCE_FLUSH_INTERVAL_SECONDS,
+    dedup_ttl=settings.ATTENDANCE_DEDUP_TTL_SECONDS,
+    log=MarkLog(
+        settings.ATTENDANCE_WAL_DIR,
+        group_commit_window=settings.ATTENDANCE_WAL_GROUP_COMMIT_MS / 1000,
+    ) if settings.ATTENDANCE_WAL_DIR else None,
+)
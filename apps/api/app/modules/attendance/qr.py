@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+
+class InvalidQrToken(ValueError):
+    pass
+
+
+class ExpiredQrToken(InvalidQrToken):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class QrTokenSigner:
+    """
+    Stateless, time-rotating attendance QR tokens.
+
+    A token is "<session_id>.<window>.<signature>", where the window is the
+    current `rotate_seconds` slot and the signature is a truncated
+    HMAC-SHA256 of the first two parts. Verifying one is a single HMAC, so
+    the mark endpoint never reads the session from the database. A token is
+    accepted during its own window and `grace_windows` windows after it, so
+    a scan that lands just after the code on the projector rotated still
+    counts; screenshots shared later do not.
+    """
+
+    SIGNATURE_BYTES = 16
+
+    def __init__(self, secret: str, rotate_seconds: int = 10, grace_windows: int = 1):
+        if rotate_seconds <= 0:
+            raise ValueError("rotate_seconds must be positive")
+        self.rotate_seconds = rotate_seconds
+        self.grace_windows = grace_windows
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+    def window(self, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // self.rotate_seconds)
+
+    def _sign(self, session_id: str, window: int) -> str:
+        mac = self._mac.copy()
+        mac.update(f"{session_id}.{window}".encode())
+        return _b64encode(mac.digest()[: self.SIGNATURE_BYTES])
+
+    def mint(self, session_id: str, now: Optional[float] = None) -> tuple[str, float]:
+        """Return the token for the current window and when the next one starts"""
+        window = self.window(now)
+        token = f"{session_id}.{window}.{self._sign(session_id, window)}"
+        return token, (window + 1) * self.rotate_seconds
+
+    def verify(self, token: str, now: Optional[float] = None) -> str:
+        """Return the token's session id; raises InvalidQrToken or ExpiredQrToken"""
+        try:
+            session_id, window_part, signature = token.split(".")
+            window = int(window_part)
+        except ValueError:
+            raise InvalidQrToken("Invalid QR code") from None
+        if not hmac.compare_digest(self._sign(session_id, window), signature):
+            raise InvalidQrToken("Invalid QR code")
+
+        current = self.window(now)
+        if window > current:
+            raise InvalidQrToken("Invalid QR code")
+        if current - window > self.grace_windows:
+            raise ExpiredQrToken("QR code has expired")
+        return session_id
+
+
+qr_signer = QrTokenSigner(
+    settings.ATTENDANCE_QR_SECRET or settings.SECRET_KEY,
+    rotate_seconds=settings.ATTENDANCE_QR_ROTATE_SECONDS,
+    grace_windows=settings.ATTENDANCE_QR_GRACE_WINDOWS,
+)
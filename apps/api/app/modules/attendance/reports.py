@@ -0,0 +1,125 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import distinct, func, select
+from sqlalchemy.orm import Session
+
+from app.db.models.attendance import AttendanceClassRollup, AttendanceStudentRollup
+from app.db.models.user import User
+from app.modules.attendance.rollups import rollup_period
+
+
+def _in_range(query, model, period: str, start: Optional[date], end: Optional[date]):
+    query = query.where(model.period == period)
+    if start is not None:
+        query = query.where(model.period_start >= start)
+    if end is not None:
+        query = query.where(model.period_start <= end)
+    return query
+
+
+def _rate(attended: int, possible: int) -> Optional[float]:
+    return round(attended / possible, 4) if possible else None
+
+
+def class_summaries(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    class_ids: Optional[list[str]] = None,
+) -> list[dict]:
+    """Attendance per class over a date range, read from the rollups"""
+    period = rollup_period(start, end)
+    C, S = AttendanceClassRollup, AttendanceStudentRollup
+
+    totals = _in_range(
+        select(C.class_id, func.sum(C.sessions), func.sum(C.marks)).group_by(C.class_id),
+        C, period, start, end,
+    )
+    students = _in_range(
+        select(S.class_id, func.count(distinct(S.student_id))).group_by(S.class_id),
+        S, period, start, end,
+    )
+    if class_ids:
+        totals = totals.where(C.class_id.in_(class_ids))
+        students = students.where(S.class_id.in_(class_ids))
+
+    enrolled = dict(db.execute(students).all())
+    summaries = []
+    for class_id, sessions, marks in db.execute(totals):
+        count = enrolled.get(class_id, 0)
+        summaries.append({
+            "class_id": class_id,
+            "sessions": sessions or 0,
+            "marks": marks or 0,
+            "students": count,
+            "attendance_rate": _rate(marks or 0, (sessions or 0) * count),
+        })
+    return sorted(summaries, key=lambda summary: summary["class_id"])
+
+
+def class_series(
+    db: Session,
+    class_id: str,
+    period: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[dict]:
+    """Sessions and marks for one class per day or week"""
+    C = AttendanceClassRollup
+    query = _in_range(
+        select(C.period_start, C.sessions, C.marks).where(C.class_id == class_id),
+        C, period, start, end,
+    ).order_by(C.period_start)
+    return [
+        {"period_start": row.period_start, "sessions": row.sessions, "marks": row.marks}
+        for row in db.execute(query)
+    ]
+
+
+def student_summaries(
+    db: Session,
+    class_id: Optional[str] = None,
+    student_id: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[dict]:
+    """Per-student attendance rates for a class, or per-class rates for a student"""
+    period = rollup_period(start, end)
+    C, S = AttendanceClassRollup, AttendanceStudentRollup
+
+    attended = _in_range(
+        select(S.student_id, S.class_id, func.sum(S.attended).label("attended"))
+        .group_by(S.student_id, S.class_id),
+        S, period, start, end,
+    )
+    if class_id is not None:
+        attended = attended.where(S.class_id == class_id)
+    if student_id is not None:
+        attended = attended.where(S.student_id == student_id)
+    rows = db.execute(attended).all()
+    if not rows:
+        return []
+
+    class_ids = {row.class_id for row in rows}
+    held = dict(db.execute(_in_range(
+        select(C.class_id, func.sum(C.sessions))
+        .where(C.class_id.in_(class_ids))
+        .group_by(C.class_id),
+        C, period, start, end,
+    )).all())
+    names = dict(db.execute(
+        select(User.id, User.full_name).where(User.id.in_({row.student_id for row in rows}))
+    ).all())
+
+    return [
+        {
+            "student_id": row.student_id,
+            "full_name": names.get(row.student_id),
+            "class_id": row.class_id,
+            "attended": row.attended or 0,
+            "sessions": held.get(row.class_id) or 0,
+            "attendance_rate": _rate(row.attended or 0, held.get(row.class_id) or 0),
+        }
+        for row in sorted(rows, key=lambda row: (row.class_id, row.student_id))
+    ]
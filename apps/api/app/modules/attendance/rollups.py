@@ -0,0 +1,157 @@
+import uuid
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.db.dialect import dialect_insert, lock_for_writes
+from app.db.models.attendance import (
+    Attendance,
+    AttendanceClassRollup,
+    AttendanceSession,
+    AttendanceStudentRollup,
+)
+from app.modules.attendance.sessions import as_utc
+
+PERIODS = ("day", "week")
+
+# Rows per multi-row upsert
+UPSERT_CHUNK_SIZE = 500
+
+_CLASS_KEYS = ("class_id", "period", "period_start")
+_STUDENT_KEYS = ("student_id", "class_id", "period", "period_start")
+
+
+def period_start(period: str, day: date) -> date:
+    """Weeks start on Monday"""
+    return day - timedelta(days=day.weekday()) if period == "week" else day
+
+
+def rollup_period(start: Optional[date], end: Optional[date]) -> str:
+    """Weekly rows answer any range made of whole weeks; anything else reads daily rows"""
+    if (start is None or start.weekday() == 0) and (end is None or end.weekday() == 6):
+        return "week"
+    return "day"
+
+
+def _upsert(db: Session, model, keys: tuple, counts: Counter, column: str, extra: dict) -> None:
+    """Add `counts` ({key tuple: n}) onto `column`, creating missing rows"""
+    table = model.__table__
+    rows = [
+        {"id": str(uuid.uuid4()), **dict(zip(keys, key, strict=True)), **extra, column: n}
+        for key, n in counts.items()
+    ]
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        statement = dialect_insert(db.get_bind(), table).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: table.c[column] + statement.excluded[column], "updated_at": func.now()},
+        )
+        db.execute(statement)
+
+
+def _session_days(db: Session, session_ids: Iterable[str]) -> dict[str, tuple[str, date]]:
+    rows = db.execute(
+        select(AttendanceSession.id, AttendanceSession.class_id, AttendanceSession.starts_at)
+        .where(AttendanceSession.id.in_(set(session_ids)))
+    )
+    return {row.id: (row.class_id, as_utc(row.starts_at).date()) for row in rows}
+
+
+def record_session(db: Session, session: AttendanceSession) -> None:
+    """Count a new session in its class rollups; runs in the caller's transaction"""
+    day = as_utc(session.starts_at).date()
+    counts = Counter({(session.class_id, p, period_start(p, day)): 1 for p in PERIODS})
+    _upsert(db, AttendanceClassRollup, _CLASS_KEYS, counts, "sessions", {"marks": 0})
+
+
+def record_marks(db: Session, marks: Iterable[tuple[str, str]]) -> dict[str, str]:
+    """
+    Count newly inserted (session_id, student_id) marks in the class and
+    student rollups; runs in the caller's transaction so the rollups commit
+    with the marks themselves. Returns the class of each session seen.
+    """
+    marks = list(marks)
+    if not marks:
+        return {}
+    sessions = _session_days(db, (session_id for session_id, _ in marks))
+
+    class_counts: Counter = Counter()
+    student_counts: Counter = Counter()
+    for session_id, student_id in marks:
+        if session_id not in sessions:
+            continue
+        class_id, day = sessions[session_id]
+        for p in PERIODS:
+            start = period_start(p, day)
+            class_counts[(class_id, p, start)] += 1
+            student_counts[(student_id, class_id, p, start)] += 1
+
+    _upsert(db, AttendanceClassRollup, _CLASS_KEYS, class_counts, "marks", {"sessions": 0})
+    _upsert(db, AttendanceStudentRollup, _STUDENT_KEYS, student_counts, "attended", {})
+    return {session_id: class_id for session_id, (class_id, _) in sessions.items()}
+
+
+def rebuild_rollups(db: Session, since: Optional[date] = None) -> dict:
+    """
+    Recompute the rollups from the raw sessions and marks, from the Monday
+    of the week containing `since` (or from the beginning), and commit.
+
+    Both rollup tables are locked first, in the order mark flushes upsert
+    them: a flush either commits before the rebuild reads the marks or
+    applies its increments after the rebuild commits, never in between.
+    """
+    start = period_start("week", since) if since else None
+    for model in (AttendanceClassRollup, AttendanceStudentRollup):
+        lock_for_writes(db, model.__table__)
+    for model in (AttendanceClassRollup, AttendanceStudentRollup):
+        statement = delete(model)
+        if start is not None:
+            statement = statement.where(model.period_start >= start)
+        db.execute(statement)
+
+    session_query = select(
+        AttendanceSession.id, AttendanceSession.class_id, AttendanceSession.starts_at
+    )
+    if start is not None:
+        session_query = session_query.where(
+            AttendanceSession.starts_at >= datetime.combine(start, time.min, tzinfo=timezone.utc)
+        )
+
+    sessions: dict[str, tuple[str, date]] = {}
+    session_counts: Counter = Counter()
+    for row in db.execute(session_query):
+        day = as_utc(row.starts_at).date()
+        sessions[row.id] = (row.class_id, day)
+        for p in PERIODS:
+            session_counts[(row.class_id, p, period_start(p, day))] += 1
+
+    class_counts: Counter = Counter()
+    student_counts: Counter = Counter()
+    mark_query = (
+        select(Attendance.session_id, Attendance.student_id)
+        .where(Attendance.session_id.in_(session_query.with_only_columns(AttendanceSession.id)))
+        .execution_options(yield_per=10000)
+    )
+    marks = 0
+    for session_id, student_id in db.execute(mark_query):
+        class_id, day = sessions[session_id]
+        marks += 1
+        for p in PERIODS:
+            key_start = period_start(p, day)
+            class_counts[(class_id, p, key_start)] += 1
+            student_counts[(student_id, class_id, p, key_start)] += 1
+
+    _upsert(db, AttendanceClassRollup, _CLASS_KEYS, session_counts, "sessions", {"marks": 0})
+    _upsert(db, AttendanceClassRollup, _CLASS_KEYS, class_counts, "marks", {"sessions": 0})
+    _upsert(db, AttendanceStudentRollup, _STUDENT_KEYS, student_counts, "attended", {})
+    db.commit()
+    return {
+        "since": start.isoformat() if start else None,
+        "sessions": len(sessions),
+        "marks": marks,
+        "class_rows": len(set(session_counts) | set(class_counts)),
+        "student_rows": len(student_counts),
+    }
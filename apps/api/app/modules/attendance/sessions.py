@@ -0,0 +1,70 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.models.attendance import AttendanceSession
+
+
+def as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive datetimes; every timestamp we store is UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+@dataclass(frozen=True)
+class SessionInfo:
+    id: str
+    teacher_id: str
+    ends_at: datetime
+    is_open: bool
+
+    def accepting_marks(self, now: Optional[datetime] = None) -> bool:
+        return self.is_open and (now or datetime.now(timezone.utc)) < self.ends_at
+
+
+class SessionDirectory:
+    """
+    Short-lived cache of the session fields QR minting checks.
+
+    Projectors poll for a fresh QR code every rotation, so without this every
+    open session would cost a primary read every few seconds.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[SessionInfo, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, session_id: str) -> Optional[SessionInfo]:
+        entry = self._entries.get(session_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        row = db.get(AttendanceSession, session_id)
+        if row is None:
+            return None
+        return self.remember(row)
+
+    def remember(self, row: AttendanceSession) -> SessionInfo:
+        info = SessionInfo(
+            id=str(row.id),
+            teacher_id=str(row.teacher_id),
+            ends_at=as_utc(row.ends_at),
+            is_open=bool(row.is_open),
+        )
+        with self._lock:
+            if len(self._entries) >= self.max_entries and info.id not in self._entries:
+                self._entries.clear()
+            self._entries[info.id] = (info, time.monotonic() + self.ttl_seconds)
+        return info
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+
+session_directory = SessionDirectory()
@@ -0,0 +1,209 @@
+import asyncio
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Optional
+
+from app.core.metrics import attendance_wal_sync_seconds
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = "marks-*.log"
+
+
+@dataclass
+class Segment:
+    path: str
+    fd: int
+    closed: bool = False
+
+
+def _encode(row: dict) -> bytes:
+    record = {**row, "marked_at": row["marked_at"].isoformat()}
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode()
+
+
+def _decode(line: bytes) -> dict:
+    row = json.loads(line)
+    row["marked_at"] = datetime.fromisoformat(row["marked_at"])
+    return row
+
+
+class MarkLog:
+    """
+    Append-only, segmented log of buffered attendance marks.
+
+    Each mark is appended as one JSON line before it is acknowledged, and
+    `sync()` waits for an fsync covering it. Concurrent callers share fsyncs
+    (group commit): while one fsync runs, new appends pile up and the next
+    fsync covers all of them, optionally after waiting `group_commit_window`
+    seconds for more.
+
+    The buffer rotates to a fresh segment each time it drains, and deletes the
+    drained segments once their rows are committed, so the log only ever
+    holds marks that are not yet in the database. Segments are flock()ed by
+    the process writing them; on startup any segment nobody holds belongs to
+    a dead process and is replayed.
+    """
+
+    def __init__(self, directory: str, group_commit_window: float = 0.002):
+        self.directory = directory
+        self.group_commit_window = group_commit_window
+        self._segments: list[Segment] = []
+        self._close_lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._appended = 0
+        self._synced = 0
+        self._waiters: list[tuple[int, asyncio.Future]] = []
+        self._syncer: Optional[asyncio.Task] = None
+
+    @property
+    def segments(self) -> int:
+        return len(self._segments)
+
+    def _new_segment(self) -> Segment:
+        path = os.path.join(self.directory, f"marks-{time.time_ns()}-{os.getpid()}.log")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        segment = Segment(path=path, fd=fd)
+        self._segments.append(segment)
+        return segment
+
+    def open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._segments:
+            self._new_segment()
+
+    def claim_orphans(self) -> Iterator[str]:
+        """
+        Yield the segments left behind by processes that are no longer
+        running. Each one stays exclusively locked until the caller asks for
+        the next, so it can be replayed and deleted without another starting
+        process replaying it too; segments another process has claimed (still
+        locked, or already deleted) are skipped.
+        """
+        own = {segment.path for segment in self._segments}
+        for path in sorted(glob.glob(os.path.join(self.directory, SEGMENT_PATTERN))):
+            if path in own:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    # Replayed and deleted by whoever held the lock before us
+                    if os.fstat(fd).st_nlink == 0:
+                        continue
+                yield path
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def read_segment(path: str) -> Iterator[dict]:
+        """Yield the marks in a segment, skipping a torn final line"""
+        with open(path, "rb") as f:
+            for number, line in enumerate(f, start=1):
+                try:
+                    yield _decode(line)
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Skipping unreadable mark at {path}:{number}")
+
+    def append(self, row: dict) -> None:
+        """Write one mark; callers serialize appends against rotate()"""
+        os.write(self._segments[-1].fd, _encode(row))
+        self._appended = next(self._sequence)
+
+    def rotate(self) -> list[Segment]:
+        """
+        Start a new segment and return the ones before it.
+        Must be called while appends are excluded.
+        """
+        retired = self._segments[:]
+        self._new_segment()
+        return retired
+
+    def discard(self, segments: list[Segment]) -> None:
+        """Close and delete segments whose marks are committed"""
+        with self._close_lock:
+            for segment in segments:
+                if not segment.closed:
+                    os.close(segment.fd)
+                    segment.closed = True
+                try:
+                    os.unlink(segment.path)
+                except FileNotFoundError:
+                    pass
+            self._segments = [s for s in self._segments if not s.closed]
+
+    def _fsync(self) -> None:
+        with self._close_lock:
+            for segment in self._segments:
+                if not segment.closed:
+                    os.fsync(segment.fd)
+
+    async def sync(self) -> None:
+        """Wait until every mark appended so far is on disk"""
+        target = self._appended
+        if self._synced >= target:
+            return
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append((target, waiter))
+        if self._syncer is None or self._syncer.done():
+            self._syncer = loop.create_task(self._sync_waiters())
+        await waiter
+
+    async def _sync_waiters(self) -> None:
+        while self._waiters:
+            if self.group_commit_window:
+                await asyncio.sleep(self.group_commit_window)
+            target = self._appended
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._fsync)
+            except OSError as e:
+                waiters, self._waiters = self._waiters, []
+                for _, waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                continue
+            attendance_wal_sync_seconds.observe(time.perf_counter() - started)
+            self._synced = max(self._synced, target)
+
+            remaining = []
+            for seq, waiter in self._waiters:
+                if seq <= target:
+                    if not waiter.done():
+                        waiter.set_result(None)
+                else:
+                    remaining.append((seq, waiter))
+            self._waiters = remaining
+
+    def close(self, remove: bool = False) -> None:
+        """Close every segment, deleting them when `remove` is set (nothing left to replay)"""
+        with self._close_lock:
+            for segment in self._segments:
+                if not segment.closed:
+                    os.fsync(segment.fd)
+                    os.close(segment.fd)
+                    segment.closed = True
+                if remove:
+                    os.unlink(segment.path)
+            self._segments = []
@@ -0,0 +1,121 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.attendance import Attendance, AttendanceSession
+from app.db.models.quiz import Quiz, QuizSubmission
+from app.db.models.user import User
+from app.db.session import read_session
+from app.modules.exports.encoders import encode_csv, encode_xlsx, gzip_chunks
+
+ATTENDANCE_COLUMNS = (
+    "session_date", "class_id", "session_id", "session_title",
+    "student_id", "student_name", "student_email", "marked_at", "status",
+)
+GRADE_COLUMNS = (
+    "submitted_at", "class_id", "quiz_id", "quiz_title", "quiz_version",
+    "student_id", "student_name", "student_email", "score", "max_score", "percent",
+)
+
+
+def _bounds(column, start: Optional[date], end: Optional[date]) -> list:
+    """Conditions keeping `column` within whole UTC days from `start` to `end`"""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= datetime.combine(start, time.min, timezone.utc))
+    if end is not None:
+        conditions.append(column < datetime.combine(end + timedelta(days=1), time.min, timezone.utc))
+    return conditions
+
+
+def _stream(db: Session, query) -> Iterator:
+    # yield_per streams through a server-side cursor where the driver has one,
+    # holding EXPORT_FETCH_ROWS rows at a time instead of the whole result
+    yield from db.execute(query.execution_options(yield_per=settings.EXPORT_FETCH_ROWS))
+
+
+def attendance_rows(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    class_ids: Optional[list[str]] = None,
+) -> Iterator[tuple]:
+    """Every attendance mark in the range, by session start"""
+    S, A = AttendanceSession, Attendance
+    query = (
+        select(
+            S.starts_at, S.class_id, S.id, S.title,
+            A.student_id, User.full_name, User.email, A.marked_at, A.status,
+        )
+        .join(A, A.session_id == S.id)
+        .join(User, User.id == A.student_id)
+        .where(*_bounds(S.starts_at, start, end))
+        .order_by(S.starts_at, S.id, A.marked_at)
+    )
+    if class_ids:
+        query = query.where(S.class_id.in_(class_ids))
+    for starts_at, *rest in _stream(db, query):
+        yield (starts_at.date(), *rest)
+
+
+def grade_rows(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    class_ids: Optional[list[str]] = None,
+) -> Iterator[tuple]:
+    """Every graded quiz submission in the range, by class then submission time"""
+    Q, G = Quiz, QuizSubmission
+    query = (
+        select(
+            G.submitted_at, G.class_id, G.quiz_id, Q.title, G.quiz_version,
+            G.student_id, User.full_name, User.email, G.score, G.max_score,
+        )
+        .join(Q, Q.id == G.quiz_id)
+        .join(User, User.id == G.student_id)
+        .where(*_bounds(G.submitted_at, start, end))
+        .order_by(G.class_id, G.submitted_at)
+    )
+    if class_ids:
+        query = query.where(G.class_id.in_(class_ids))
+    for row in _stream(db, query):
+        score, max_score = row[-2], row[-1]
+        yield (*row, round(100 * score / max_score, 2) if max_score else None)
+
+
+REPORTS: dict[str, tuple[tuple[str, ...], Callable[..., Iterator[tuple]]]] = {
+    "attendance": (ATTENDANCE_COLUMNS, attendance_rows),
+    "grades": (GRADE_COLUMNS, grade_rows),
+}
+
+
+def stream_export(
+    report: str,
+    format: str = "csv",
+    compress: bool = False,
+    session_factory: Callable[[], Session] = read_session,
+    **filters,
+) -> Iterator[bytes]:
+    """
+    Encode a report as it is read, chunk by chunk.
+
+    The session is opened here rather than taken from the request, because
+    the response body is produced after the endpoint has returned; it closes
+    when the stream ends or the client goes away. XLSX is already deflated,
+    so `compress` only applies to CSV.
+    """
+    columns, rows = REPORTS[report]
+    db = session_factory()
+    try:
+        if format == "xlsx":
+            chunks = encode_xlsx(columns, rows(db, **filters), sheet_name=report.title())
+        else:
+            chunks = encode_csv(columns, rows(db, **filters))
+            if compress:
+                chunks = gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        db.close()
@@ -0,0 +1 @@
+# Activity feed
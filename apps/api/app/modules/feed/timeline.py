@@ -0,0 +1,184 @@
+import base64
+import binascii
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.feed import FeedItem
+from app.modules.attendance.sessions import as_utc
+
+_COLUMNS = (
+    FeedItem.id,
+    FeedItem.audience,
+    FeedItem.kind,
+    FeedItem.actor_id,
+    FeedItem.title,
+    FeedItem.body,
+    FeedItem.data,
+    FeedItem.created_at,
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    raw = f"{as_utc(created_at).isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, item_id = raw.split("|", 1)
+        return as_utc(datetime.fromisoformat(created_at)), item_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor") from None
+
+
+def audiences_for(user_id: str, role: str, class_ids: Iterable[str] = ()) -> tuple[str, ...]:
+    """Every audience whose items belong in a user's timeline"""
+    audiences = {"school", f"user:{user_id}"}
+    if role in ("teacher", "principal"):
+        audiences.add("staff")
+    audiences.update(f"class:{class_id}" for class_id in class_ids)
+    return tuple(sorted(audiences))
+
+
+def fetch_page(
+    db: Session,
+    audiences: tuple[str, ...],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """
+    One page of the merged timeline of `audiences`, newest first.
+
+    Fan-out on read: each audience contributes at most limit + 1 items from
+    a keyset range scan on (audience, created_at, id), so the cost of a page
+    depends on the number of audiences and the page size, never on how deep
+    into the feed the cursor points. The scans run as one UNION ALL.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    scans = []
+    for audience in audiences:
+        scan = select(*_COLUMNS).where(FeedItem.audience == audience)
+        if position is not None:
+            scan = scan.where(tuple_(FeedItem.created_at, FeedItem.id) < tuple_(*position))
+        scans.append(
+            scan.order_by(FeedItem.created_at.desc(), FeedItem.id.desc()).limit(limit + 1).subquery()
+        )
+    merged = union_all(*(select(scan) for scan in scans)).subquery()
+    rows = db.execute(
+        select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc()).limit(limit + 1)
+    ).all()
+
+    items = [
+        {
+            "id": row.id,
+            "audience": row.audience,
+            "kind": row.kind,
+            "actor_id": row.actor_id,
+            "title": row.title,
+            "body": row.body,
+            "data": row.data or {},
+            "created_at": as_utc(row.created_at),
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return items, next_cursor
+
+
+def feed_row(audience: str, kind: str, title: str, **fields) -> dict:
+    """Values for one FeedItem insert; timestamps come from the app so keyset order is exact"""
+    return {
+        "id": str(uuid.uuid4()),
+        "audience": audience,
+        "kind": kind,
+        "title": title,
+        "actor_id": fields.get("actor_id"),
+        "body": fields.get("body"),
+        "data": fields.get("data") or {},
+        "created_at": fields.get("created_at") or datetime.now(timezone.utc),
+    }
+
+
+def publish(db: Session, rows: list[dict]) -> None:
+    """Insert feed items in the caller's transaction; touch the cache after committing"""
+    if rows:
+        db.execute(insert(FeedItem.__table__), rows)
+
+
+class TimelineCache:
+    """
+    Short-lived cache of merged first pages, keyed by audience set and page size.
+
+    Publishing bumps a generation counter per audience, and an entry is only
+    served while the generations it was built from are current, so posts
+    made through this process show up at once; posts made elsewhere show up
+    within `ttl_seconds`. Deeper pages are cheap keyset reads and are never
+    cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (audiences, limit) -> (page, expiry, audience generations the page was built from)
+        self._entries: OrderedDict[tuple, tuple] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generations(self, audiences: tuple[str, ...]) -> tuple:
+        with self._lock:
+            return tuple(self._generations.get(audience, 0) for audience in audiences)
+
+    def get(self, audiences: tuple[str, ...], limit: int) -> Optional[tuple[list[dict], Optional[str]]]:
+        key = (audiences, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            page, expires_at, generations = entry
+            current = tuple(self._generations.get(audience, 0) for audience in audiences)
+            if expires_at <= time.monotonic() or generations != current:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return page
+
+    def put(
+        self,
+        audiences: tuple[str, ...],
+        limit: int,
+        page: tuple[list[dict], Optional[str]],
+        generations: tuple,
+    ) -> None:
+        """Cache a page; `generations` must be read before the page was queried"""
+        with self._lock:
+            self._entries[(audiences, limit)] = (page, time.monotonic() + self.ttl_seconds, generations)
+            self._entries.move_to_end((audiences, limit))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, audiences: Iterable[str]) -> None:
+        with self._lock:
+            for audience in audiences:
+                self._generations[audience] = self._generations.get(audience, 0) + 1
+
+
+timeline_cache = TimelineCache(
+    ttl_seconds=settings.FEED_CACHE_TTL_SECONDS,
+    max_entries=settings.FEED_CACHE_SIZE,
+)
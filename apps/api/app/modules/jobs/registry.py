@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+
+from app.db.models.job import Job
+from app.db.session import SessionLocal
+
+# Set while this process shuts down; jobs on the thread lane stop at their next progress report
+shutdown_requested = threading.Event()
+
+
+class JobCancelled(Exception):
+    """Raised from JobContext.progress() once the job's cancellation was requested"""
+
+
+class JobInterrupted(Exception):
+    """
+    Raised from JobContext.progress() when the worker is shutting down, or
+    no longer holds the job (it was handed back to the queue); the job is
+    requeued
+    """
+
+
+@dataclass(frozen=True)
+class JobType:
+    name: str
+    handler: Callable[["JobContext"], Optional[dict]]
+    lane: str = "thread"  # "thread" for I/O-bound work, "process" for CPU-bound work
+    max_attempts: int = 3
+    # Enqueueing while a job of this kind is queued or running returns that job instead
+    unique: bool = False
+
+
+JOB_TYPES: dict[str, JobType] = {}
+
+
+def job_type(name: str, lane: str = "thread", max_attempts: int = 3, unique: bool = False):
+    """Register a handler; it gets a JobContext and returns a JSON-serializable result"""
+    def register(handler: Callable[["JobContext"], Optional[dict]]):
+        JOB_TYPES[name] = JobType(name, handler, lane, max_attempts, unique)
+        return handler
+    return register
+
+
+@dataclass
+class JobContext:
+    """What a running handler sees of its job; picklable, so it crosses into the process lane"""
+
+    job_id: str
+    params: dict
+    artifact_dir: str
+    # The runner that claimed the job
+    worker: Optional[str] = None
+    progress_interval: float = 1.0
+    artifact: Optional[str] = None
+    _reported_at: float = field(default=0.0, repr=False)
+
+    def artifact_path(self, filename: str) -> str:
+        """Where to write the job's output file; the API serves it once the job succeeds"""
+        directory = os.path.join(self.artifact_dir, self.job_id)
+        os.makedirs(directory, exist_ok=True)
+        self.artifact = filename
+        return os.path.join(directory, filename)
+
+    def progress(self, fraction: Optional[float] = None, message: Optional[str] = None, force: bool = False) -> None:
+        """
+        Record progress, at most once per `progress_interval` unless forced.
+        Also the handler's cancellation point: raises JobCancelled or
+        JobInterrupted when the job should stop. `shutdown_requested` is only
+        ever set in the runner's own process, so process-lane jobs learn of a
+        shutdown from the job row, once the runner has handed the job back.
+        """
+        if shutdown_requested.is_set():
+            raise JobInterrupted()
+        now = time.monotonic()
+        if not force and now - self._reported_at < self.progress_interval:
+            return
+        self._reported_at = now
+
+        values = {"heartbeat_at": datetime.now(timezone.utc)}
+        if fraction is not None:
+            values["progress"] = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            values["message"] = message[:500]
+        db = SessionLocal()
+        try:
+            table = Job.__table__
+            held = (table.c.id == self.job_id, table.c.worker == self.worker)
+            db.execute(update(table).where(*held).values(**values))
+            job = db.execute(
+                select(table.c.cancel_requested, table.c.worker).where(table.c.id == self.job_id)
+            ).first()
+            db.commit()
+        finally:
+            db.close()
+        if job is None or job.worker != self.worker:
+            raise JobInterrupted()
+        if job.cancel_requested:
+            raise JobCancelled()
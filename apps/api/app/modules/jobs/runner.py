@@ -0,0 +1,420 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import job_duration_seconds, jobs_finished_total
+from app.db.models.job import Job
+from app.db.session import SessionLocal
+from app.modules.jobs.registry import JOB_TYPES, JobCancelled, JobInterrupted, shutdown_requested
+from app.modules.jobs.tasks import execute_job
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobRunner:
+    """
+    Claims queued jobs from the `jobs` table and runs them off the event loop.
+
+    Every API worker runs one; a job is claimed with a conditional UPDATE
+    (status still "queued"), so however many workers poll, each job runs
+    once. Jobs run on a thread lane (I/O-bound: exports, rollup rebuilds) or
+    a process lane (CPU-bound: analytics), each with its own number of
+    slots, highest priority first. Failures are retried with exponential
+    backoff up to the job type's max_attempts.
+
+    The runner heartbeats the jobs it holds; jobs whose worker stopped
+    heartbeating for `stale_after` seconds (crash, OOM kill) go back to the
+    queue. On shutdown, jobs still running after the grace period are
+    handed back to the queue without using up an attempt.
+    """
+
+    def __init__(
+        self,
+        thread_workers: int = 2,
+        process_workers: int = 1,
+        poll_interval: float = 2.0,
+        stale_after: float = 120.0,
+        retry_base: float = 30.0,
+        retry_max: float = 1800.0,
+        retention_days: int = 7,
+        artifact_dir: str = "var/job-artifacts",
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.capacity = {"thread": thread_workers, "process": process_workers}
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention_days = retention_days
+        self.artifact_dir = os.path.abspath(artifact_dir)
+        self.session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executors: dict[str, Executor] = {}
+        self._running: dict[str, tuple[str, asyncio.Task]] = {}  # job id -> (lane, task)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_housekeeping = 0.0
+
+    def running(self, lane: str) -> int:
+        return sum(1 for job_lane, _ in self._running.values() if job_lane == lane)
+
+    # Queue
+
+    def enqueue(
+        self,
+        db: Session,
+        kind: str,
+        params: Optional[dict] = None,
+        priority: int = 0,
+        created_by: Optional[str] = None,
+    ) -> Job:
+        """Queue a job (or return the pending one, for unique job types) and wake the runner"""
+        job_type = JOB_TYPES[kind]
+        if job_type.unique:
+            existing = (
+                db.query(Job)
+                .filter(Job.kind == kind, Job.status.in_(("queued", "running")))
+                .order_by(Job.created_at)
+                .first()
+            )
+            if existing is not None:
+                return existing
+        job = Job(
+            kind=kind,
+            params=params or {},
+            priority=priority,
+            max_attempts=job_type.max_attempts,
+            run_after=_now(),
+            created_by=created_by,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self.wake()
+        return job
+
+    def submit(self, kind: str, params: Optional[dict] = None) -> str:
+        """enqueue() from outside a request, with a session of its own; returns the job id"""
+        db = self.session_factory()
+        try:
+            return self.enqueue(db, kind, params).id
+        finally:
+            db.close()
+
+    def cancel(self, db: Session, job: Job) -> Job:
+        """
+        Cancel a queued job outright; a running one stops at its next
+        progress report (for learning_gaps: before its compute or write stage)
+        """
+        table = Job.__table__
+        cancelled = db.execute(
+            update(table)
+            .where(table.c.id == job.id, table.c.status == "queued")
+            .values(status="cancelled", finished_at=_now())
+        ).rowcount
+        if not cancelled:
+            db.execute(
+                update(table)
+                .where(table.c.id == job.id, table.c.status == "running")
+                .values(cancel_requested=True)
+            )
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def wake(self) -> None:
+        """Poll now instead of at the next interval; safe from any thread"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # Claiming
+
+    def _claim(self, free: dict[str, int]) -> list[tuple[str, str, str, dict]]:
+        """Claim up to `free[lane]` due jobs per lane; returns (lane, id, kind, params)"""
+        table = Job.__table__
+        claimed = []
+        db = self.session_factory()
+        try:
+            now = _now()
+            for lane, slots in free.items():
+                kinds = [name for name, job_type in JOB_TYPES.items() if job_type.lane == lane]
+                if slots <= 0 or not kinds:
+                    continue
+                candidates = db.execute(
+                    select(table.c.id, table.c.kind, table.c.params)
+                    .where(table.c.status == "queued", table.c.run_after <= now, table.c.kind.in_(kinds))
+                    .order_by(table.c.priority.desc(), table.c.run_after, table.c.created_at)
+                    .limit(slots * 2)
+                ).all()
+                for job_id, kind, params in candidates:
+                    if slots == 0:
+                        break
+                    won = db.execute(
+                        update(table)
+                        .where(table.c.id == job_id, table.c.status == "queued")
+                        .values(
+                            status="running",
+                            worker=self.worker_id,
+                            attempts=table.c.attempts + 1,
+                            started_at=now,
+                            heartbeat_at=now,
+                            progress=0.0,
+                            message=None,
+                        )
+                    ).rowcount
+                    db.commit()
+                    if won:
+                        claimed.append((lane, job_id, kind, params))
+                        slots -= 1
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # Running
+
+    def _executor(self, lane: str) -> Executor:
+        executor = self._executors.get(lane)
+        if executor is None:
+            if lane == "process":
+                executor = ProcessPoolExecutor(
+                    max_workers=self.capacity[lane],
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                executor = ThreadPoolExecutor(max_workers=self.capacity[lane], thread_name_prefix="job")
+            self._executors[lane] = executor
+        return executor
+
+    async def _execute(self, lane: str, job_id: str, kind: str, params: dict) -> None:
+        started = time.perf_counter()
+        outcome = "succeeded"
+        try:
+            output = await self._loop.run_in_executor(
+                self._executor(lane), execute_job, kind, job_id, params, self.artifact_dir, self.worker_id
+            )
+        except JobCancelled:
+            outcome = "cancelled"
+            await asyncio.to_thread(self._finish, job_id, "cancelled")
+        except JobInterrupted:
+            outcome = "interrupted"
+            await asyncio.to_thread(self._release, [job_id])
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._executors.pop(lane, None)
+            logger.error(f"Job {job_id} ({kind}) failed: {e!r}")
+            outcome = await asyncio.to_thread(self._fail, job_id, e)
+        else:
+            await asyncio.to_thread(
+                self._finish,
+                job_id,
+                "succeeded",
+                result=output["result"],
+                artifact=output["artifact"],
+                error=None,
+            )
+        finally:
+            self._running.pop(job_id, None)
+        jobs_finished_total.inc(kind, outcome)
+        job_duration_seconds.observe(time.perf_counter() - started, kind)
+        self.wake()
+
+    def _finish(self, job_id: str, status: str, **values) -> None:
+        table = Job.__table__
+        db = self.session_factory()
+        try:
+            # The worker guard skips jobs this runner no longer holds (handed back on shutdown)
+            db.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.worker == self.worker_id)
+                .values(
+                    status=status,
+                    worker=None,
+                    finished_at=_now(),
+                    progress=1.0 if status == "succeeded" else table.c.progress,
+                    **values,
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _fail(self, job_id: str, error: Exception) -> str:
+        """Schedule a retry with exponential backoff, or fail the job for good; returns the outcome"""
+        table = Job.__table__
+        db = self.session_factory()
+        try:
+            job = db.execute(
+                select(table.c.attempts, table.c.max_attempts).where(table.c.id == job_id)
+            ).first()
+            message = f"{type(error).__name__}: {error}"[:2000]
+            if job is not None and job.attempts < job.max_attempts:
+                delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+                values = {
+                    "status": "queued",
+                    "run_after": _now() + timedelta(seconds=delay * random.uniform(0.5, 1.0)),
+                    "error": message,
+                }
+                outcome = "retried"
+            else:
+                values = {"status": "failed", "finished_at": _now(), "error": message}
+                outcome = "failed"
+            db.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.worker == self.worker_id)
+                .values(worker=None, **values)
+            )
+            db.commit()
+            return outcome
+        finally:
+            db.close()
+
+    def _release(self, job_ids: list[str]) -> None:
+        """Hand running jobs back to the queue without using up an attempt"""
+        table = Job.__table__
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(table)
+                .where(table.c.id.in_(job_ids), table.c.worker == self.worker_id)
+                .values(status="queued", worker=None, attempts=table.c.attempts - 1, run_after=_now())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    # Housekeeping
+
+    def _housekeep(self, held: list[str]) -> None:
+        """Heartbeat held jobs, requeue or fail abandoned ones and prune old finished ones"""
+        table = Job.__table__
+        now = _now()
+        stale = now - timedelta(seconds=self.stale_after)
+        db = self.session_factory()
+        try:
+            if held:
+                db.execute(
+                    update(table)
+                    .where(table.c.id.in_(held), table.c.worker == self.worker_id)
+                    .values(heartbeat_at=now)
+                )
+            abandoned = (table.c.status == "running", table.c.heartbeat_at < stale)
+            requeued = db.execute(
+                update(table)
+                .where(*abandoned, table.c.attempts < table.c.max_attempts)
+                .values(status="queued", worker=None, run_after=now, error="Worker stopped responding")
+            ).rowcount
+            failed = db.execute(
+                update(table)
+                .where(*abandoned)
+                .values(status="failed", worker=None, finished_at=now, error="Worker stopped responding")
+            ).rowcount
+            if requeued or failed:
+                logger.warning(f"Recovered abandoned jobs: {requeued} requeued, {failed} failed")
+
+            cutoff = now - timedelta(days=self.retention_days)
+            expired = db.execute(
+                select(table.c.id)
+                .where(table.c.status.in_(FINISHED), table.c.finished_at < cutoff)
+                .limit(500)
+            ).scalars().all()
+            if expired:
+                db.execute(delete(table).where(table.c.id.in_(expired)))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for job_id in expired:
+            shutil.rmtree(os.path.join(self.artifact_dir, job_id), ignore_errors=True)
+
+    async def _tick(self) -> None:
+        if time.monotonic() - self._last_housekeeping >= self.stale_after / 4:
+            self._last_housekeeping = time.monotonic()
+            await asyncio.to_thread(self._housekeep, list(self._running))
+
+        free = {lane: slots - self.running(lane) for lane, slots in self.capacity.items()}
+        if not any(slots > 0 for slots in free.values()):
+            return
+        for lane, job_id, kind, params in await asyncio.to_thread(self._claim, free):
+            task = asyncio.create_task(self._execute(lane, job_id, kind, params))
+            self._running[job_id] = (lane, task)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"Job runner poll failed: {e}")
+
+    async def start(self) -> None:
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        shutdown_requested.clear()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, grace: float = 10.0) -> None:
+        """Stop claiming, give running jobs `grace` seconds, then hand the rest back to the queue"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        shutdown_requested.set()
+        tasks = [task for _, task in self._running.values()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=grace)
+        leftover = list(self._running)
+        if leftover:
+            logger.warning(f"Requeueing {len(leftover)} jobs still running at shutdown")
+            await asyncio.to_thread(self._release, leftover)
+            for _, task in self._running.values():
+                task.cancel()
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
+        self._loop = None
+
+
+job_runner = JobRunner(
+    thread_workers=settings.JOBS_THREAD_WORKERS,
+    process_workers=settings.JOBS_PROCESS_WORKERS,
+    poll_interval=settings.JOBS_POLL_SECONDS,
+    stale_after=settings.JOBS_STALE_SECONDS,
+    retry_base=settings.JOBS_RETRY_BASE_SECONDS,
+    retry_max=settings.JOBS_RETRY_MAX_SECONDS,
+    retention_days=settings.JOBS_RETENTION_DAYS,
+    artifact_dir=settings.JOBS_ARTIFACT_DIR,
+)
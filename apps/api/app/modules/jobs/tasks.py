@@ -0,0 +1,66 @@
+import os
+from datetime import date
+from typing import Optional
+
+from app.db.session import SessionLocal
+from app.modules.analytics.learning_gaps import run_learning_gap_analysis
+from app.modules.attendance.rollups import rebuild_rollups
+from app.modules.exports.reports import stream_export
+from app.modules.jobs.registry import JOB_TYPES, JobContext, job_type
+
+
+def _date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+@job_type("learning_gaps", lane="process", unique=True)
+def learning_gaps(ctx: JobContext) -> dict:
+    """Recompute every learning-gap alert; cancellable between its load, compute and write stages"""
+    summary = run_learning_gap_analysis(
+        on_stage=lambda fraction, stage: ctx.progress(fraction, stage, force=True),
+    )
+    if summary is None:
+        raise RuntimeError("Learning-gap analysis is already running in this process")
+    return summary
+
+
+@job_type("rollup_rebuild", unique=True)
+def rollup_rebuild(ctx: JobContext) -> dict:
+    """Recompute the attendance rollups from `since` (or from the beginning)"""
+    ctx.progress(0.0, "Rebuilding", force=True)
+    db = SessionLocal()
+    try:
+        return rebuild_rollups(db, since=_date(ctx.params.get("since")))
+    finally:
+        db.close()
+
+
+@job_type("export")
+def export(ctx: JobContext) -> dict:
+    """Write an attendance or grade export (gzipped CSV or XLSX) to the job's artifact"""
+    params = ctx.params
+    report, format = params["report"], params.get("format", "csv")
+    start, end = _date(params.get("start")), _date(params.get("end"))
+    extension = "xlsx" if format == "xlsx" else "csv.gz"
+    path = ctx.artifact_path(f"{report}-{start or 'all'}-{end or 'all'}.{extension}")
+
+    written = 0
+    with open(path + ".part", "wb") as output:
+        for chunk in stream_export(
+            report, format, compress=True, start=start, end=end, class_ids=params.get("class_ids"),
+        ):
+            output.write(chunk)
+            written += len(chunk)
+            ctx.progress(message=f"{written} bytes written")
+    os.replace(path + ".part", path)
+    return {"bytes": written}
+
+
+def execute_job(kind: str, job_id: str, params: dict, artifact_dir: str, worker: str) -> dict:
+    """
+    Run one job in a lane's thread or process. Importing this module is what
+    registers the job types, so spawned workers find them by name too.
+    """
+    ctx = JobContext(job_id, params, artifact_dir, worker)
+    result = JOB_TYPES[kind].handler(ctx)
+    return {"result": result, "artifact": ctx.artifact}
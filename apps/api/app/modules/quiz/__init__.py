@@ -0,0 +1 @@
+# Quizzes
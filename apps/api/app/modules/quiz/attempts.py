@@ -0,0 +1,374 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.db.dialect import dialect_insert
+from app.db.models.quiz import QuizAttempt
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class AttemptClosed(Exception):
+    """Raised when saving to an attempt whose time is up"""
+
+
+@dataclass
+class Attempt:
+    quiz_id: str
+    student_id: str
+    quiz_version: int
+    started_at: datetime
+    # Unix time after which saves are refused (deadline plus grace); 0 when untimed
+    closes_at: float = 0.0
+    seq: int = 0
+    answers: dict = field(default_factory=dict)
+
+    def is_closed(self, now: Optional[float] = None) -> bool:
+        return bool(self.closes_at) and (now or time.time()) > self.closes_at
+
+
+class LocalAttemptStore:
+    """
+    In-process attempt store; the stand-in for RedisAttemptStore when no
+    REDIS_URL is set. Attempts are only visible to the worker that holds
+    them, so it suits a single worker.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400.0):
+        self.ttl_seconds = ttl_seconds
+        # (quiz id, student id) -> (attempt, monotonic time of the last save)
+        self._attempts: dict[tuple[str, str], tuple[Attempt, float]] = {}
+        self._dirty: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    async def get(self, quiz_id: str, student_id: str) -> Optional[Attempt]:
+        with self._lock:
+            entry = self._attempts.get((quiz_id, student_id))
+            return replace(entry[0], answers=dict(entry[0].answers)) if entry else None
+
+    async def create(self, attempt: Attempt) -> Attempt:
+        """Store a new attempt; returns the existing one instead if there is one"""
+        owner = (attempt.quiz_id, attempt.student_id)
+        with self._lock:
+            if owner not in self._attempts:
+                stored = replace(attempt, answers=dict(attempt.answers))
+                self._attempts[owner] = (stored, time.monotonic())
+            return replace(self._attempts[owner][0], answers=dict(self._attempts[owner][0].answers))
+
+    async def apply(self, quiz_id: str, student_id: str, seq: int, changes: dict) -> Optional[int]:
+        """
+        Apply one autosave delta ({question id: answer}, None clears an answer).
+        Deltas at or below the attempt's sequence number are stale retries and
+        are ignored. Returns the attempt's sequence number, or None if there
+        is no such attempt.
+        """
+        owner = (quiz_id, student_id)
+        with self._lock:
+            entry = self._attempts.get(owner)
+            if entry is None:
+                return None
+            attempt = entry[0]
+            if attempt.is_closed():
+                raise AttemptClosed("Time is up for this attempt")
+            if seq > attempt.seq:
+                for question_id, answer in changes.items():
+                    if answer is None:
+                        attempt.answers.pop(question_id, None)
+                    else:
+                        attempt.answers[question_id] = answer
+                attempt.seq = seq
+                self._dirty.add(owner)
+            self._attempts[owner] = (attempt, time.monotonic())
+            return attempt.seq
+
+    async def take_dirty(self, limit: int) -> list[Attempt]:
+        """Remove and return up to `limit` attempts changed since they were last taken"""
+        with self._lock:
+            self._expire()
+            owners = [self._dirty.pop() for _ in range(min(limit, len(self._dirty)))]
+            return [
+                replace(self._attempts[owner][0], answers=dict(self._attempts[owner][0].answers))
+                for owner in owners
+                if owner in self._attempts
+            ]
+
+    async def mark_dirty(self, attempts: list[Attempt]) -> None:
+        with self._lock:
+            self._dirty.update((a.quiz_id, a.student_id) for a in attempts)
+
+    async def remove(self, quiz_id: str, student_id: str) -> None:
+        with self._lock:
+            self._attempts.pop((quiz_id, student_id), None)
+            self._dirty.discard((quiz_id, student_id))
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for owner in [owner for owner, (_, saved) in self._attempts.items() if saved < cutoff]:
+            del self._attempts[owner]
+            self._dirty.discard(owner)
+
+
+# KEYS: attempt hash, dirty set. ARGV: seq, ttl, dirty member, now, then field/value pairs
+_APPLY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+local closes_at = tonumber(redis.call('HGET', KEYS[1], 'closes_at'))
+if closes_at > 0 and tonumber(ARGV[4]) > closes_at then return -2 end
+local seq = tonumber(redis.call('HGET', KEYS[1], 'seq'))
+if tonumber(ARGV[1]) > seq then
+  seq = tonumber(ARGV[1])
+  redis.call('HSET', KEYS[1], 'seq', seq)
+  for i = 5, #ARGV, 2 do
+    if ARGV[i + 1] == '' then
+      redis.call('HDEL', KEYS[1], ARGV[i])
+    else
+      redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+  end
+  redis.call('SADD', KEYS[2], ARGV[3])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return seq
+"""
+
+# KEYS: attempt hash. ARGV: ttl, then field/value pairs
+_CREATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+for i = 2, #ARGV, 2 do
+  redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class RedisAttemptStore:
+    """
+    Attempts shared by every worker, one Redis hash per attempt.
+
+    Answers are stored as one JSON-encoded field per question ("a:<id>"), so
+    a delta rewrites only the fields it touches; the sequence check, the
+    update and marking the attempt for the next checkpoint run as one Lua
+    script.
+    """
+
+    DIRTY_KEY = "quiz-attempts:dirty"
+
+    def __init__(self, client, ttl_seconds: int = 86400):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._apply = client.register_script(_APPLY_SCRIPT)
+        self._create = client.register_script(_CREATE_SCRIPT)
+
+    @staticmethod
+    def _key(quiz_id: str, student_id: str) -> str:
+        return f"quiz-attempt:{quiz_id}:{student_id}"
+
+    @staticmethod
+    def _decode(quiz_id: str, student_id: str, fields: dict) -> Attempt:
+        return Attempt(
+            quiz_id=quiz_id,
+            student_id=student_id,
+            quiz_version=int(fields["quiz_version"]),
+            started_at=datetime.fromisoformat(fields["started_at"]),
+            closes_at=float(fields["closes_at"]),
+            seq=int(fields["seq"]),
+            answers={
+                name[2:]: json.loads(value) for name, value in fields.items() if name.startswith("a:")
+            },
+        )
+
+    async def get(self, quiz_id: str, student_id: str) -> Optional[Attempt]:
+        fields = await self.client.hgetall(self._key(quiz_id, student_id))
+        return self._decode(quiz_id, student_id, fields) if fields else None
+
+    async def create(self, attempt: Attempt) -> Attempt:
+        args = [
+            self.ttl_seconds,
+            "quiz_version", attempt.quiz_version,
+            "started_at", attempt.started_at.isoformat(),
+            "closes_at", attempt.closes_at,
+            "seq", attempt.seq,
+        ]
+        for question_id, answer in attempt.answers.items():
+            args += [f"a:{question_id}", json.dumps(answer)]
+        key = self._key(attempt.quiz_id, attempt.student_id)
+        if await self._create(keys=[key], args=args):
+            return attempt
+        return await self.get(attempt.quiz_id, attempt.student_id) or attempt
+
+    async def apply(self, quiz_id: str, student_id: str, seq: int, changes: dict) -> Optional[int]:
+        args = [seq, self.ttl_seconds, f"{quiz_id}:{student_id}", time.time()]
+        for question_id, answer in changes.items():
+            args += [f"a:{question_id}", "" if answer is None else json.dumps(answer)]
+        result = int(await self._apply(keys=[self._key(quiz_id, student_id), self.DIRTY_KEY], args=args))
+        if result == -1:
+            return None
+        if result == -2:
+            raise AttemptClosed("Time is up for this attempt")
+        return result
+
+    async def take_dirty(self, limit: int) -> list[Attempt]:
+        members = await self.client.spop(self.DIRTY_KEY, limit)
+        if not members:
+            return []
+        owners = [member.split(":", 1) for member in members]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for quiz_id, student_id in owners:
+                pipe.hgetall(self._key(quiz_id, student_id))
+            results = await pipe.execute()
+        return [
+            self._decode(quiz_id, student_id, fields)
+            for (quiz_id, student_id), fields in zip(owners, results, strict=True)
+            if fields
+        ]
+
+    async def mark_dirty(self, attempts: list[Attempt]) -> None:
+        if attempts:
+            await self.client.sadd(self.DIRTY_KEY, *(f"{a.quiz_id}:{a.student_id}" for a in attempts))
+
+    async def remove(self, quiz_id: str, student_id: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(quiz_id, student_id))
+            pipe.srem(self.DIRTY_KEY, f"{quiz_id}:{student_id}")
+            await pipe.execute()
+
+
+def load_checkpoint(db: Session, quiz_id: str, student_id: str) -> Optional[Attempt]:
+    """The last persisted state of an attempt, e.g. after the attempt store lost it"""
+    row = db.execute(
+        select(QuizAttempt).where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.student_id == student_id)
+    ).scalar_one_or_none()
+    if row is None:
+        return None
+    started_at = row.started_at if row.started_at.tzinfo else row.started_at.replace(tzinfo=timezone.utc)
+    return Attempt(
+        quiz_id=quiz_id,
+        student_id=student_id,
+        quiz_version=row.quiz_version,
+        started_at=started_at,
+        seq=row.seq,
+        answers=dict(row.answers or {}),
+    )
+
+
+class AttemptCheckpointer:
+    """
+    Periodically writes changed attempts to quiz_attempts.
+
+    However often a student autosaves, an attempt costs at most one upsert
+    per `interval`; all attempts changed in the interval go out in
+    multi-row statements of `batch_size`.
+    """
+
+    def __init__(
+        self,
+        store,
+        interval: float = 15.0,
+        batch_size: int = 500,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.store = store
+        self.interval = interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def _write(self, attempts: list[Attempt]) -> None:
+        db = self.session_factory()
+        try:
+            table = QuizAttempt.__table__
+            now = datetime.now(timezone.utc)
+            statement = dialect_insert(db.get_bind(), table).values([
+                {
+                    "id": str(uuid.uuid4()),
+                    "quiz_id": a.quiz_id,
+                    "student_id": a.student_id,
+                    "quiz_version": a.quiz_version,
+                    "answers": a.answers,
+                    "seq": a.seq,
+                    "started_at": a.started_at,
+                    "saved_at": now,
+                }
+                for a in attempts
+            ])
+            # Never move a checkpoint back to an older sequence number
+            statement = statement.on_conflict_do_update(
+                index_elements=["quiz_id", "student_id"],
+                set_={
+                    "answers": statement.excluded.answers,
+                    "seq": statement.excluded.seq,
+                    "saved_at": statement.excluded.saved_at,
+                },
+                where=table.c.seq < statement.excluded.seq,
+            )
+            db.execute(statement)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def checkpoint(self) -> int:
+        """Persist every changed attempt; on failure they stay marked for the next run"""
+        written = 0
+        while True:
+            attempts = await self.store.take_dirty(self.batch_size)
+            if not attempts:
+                return written
+            try:
+                await asyncio.to_thread(self._write, attempts)
+            except Exception:
+                await self.store.mark_dirty(attempts)
+                raise
+            written += len(attempts)
+            if len(attempts) < self.batch_size:
+                return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                logger.error(f"Quiz attempt checkpoint failed: {e}")
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the timer and write a final checkpoint"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.checkpoint()
+
+
+def _create_store():
+    client = get_redis()
+    if client is None:
+        return LocalAttemptStore(ttl_seconds=settings.QUIZ_ATTEMPT_TTL_SECONDS)
+    return RedisAttemptStore(client, ttl_seconds=settings.QUIZ_ATTEMPT_TTL_SECONDS)
+
+
+attempt_store = _create_store()
+attempt_checkpointer = AttemptCheckpointer(
+    attempt_store,
+    interval=settings.QUIZ_AUTOSAVE_PERSIST_SECONDS,
+)
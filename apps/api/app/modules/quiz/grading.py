@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.quiz import Quiz
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """
+    A quiz's answer key compiled to arrays.
+
+    Single- and multi-select questions become 64-bit masks of the correct
+    options, so both are graded with one equality test per answer; numeric
+    questions become a value and an absolute tolerance. Question order is
+    fixed: column j of every matrix is question_ids[j].
+    """
+
+    quiz_id: str
+    version: int
+    title: str
+    class_id: str
+    is_published: bool
+    time_limit_minutes: Optional[int]
+    question_ids: tuple[str, ...]
+    points: np.ndarray  # float64 per question
+    choice_columns: np.ndarray  # question positions graded by mask
+    choice_masks: np.ndarray  # uint64 correct-option mask per choice column
+    choice_options: tuple[int, ...]  # option count per choice column
+    choice_multi: tuple[bool, ...]  # whether each choice column is multi-select
+    numeric_columns: np.ndarray
+    numeric_values: np.ndarray
+    numeric_tolerances: np.ndarray
+
+    @property
+    def max_score(self) -> float:
+        return float(self.points.sum())
+
+
+def compile_key(quiz: Quiz) -> AnswerKey:
+    questions = quiz.questions or []
+    choice_columns, choice_masks, choice_options, choice_multi = [], [], [], []
+    numeric_columns, numeric_values, numeric_tolerances = [], [], []
+    for position, question in enumerate(questions):
+        if question["type"] == "numeric":
+            numeric_columns.append(position)
+            numeric_values.append(float(question["answer"]))
+            numeric_tolerances.append(float(question.get("tolerance", 0.0)))
+        else:
+            answer = question["answer"]
+            correct = answer if isinstance(answer, list) else [answer]
+            mask = 0
+            for option in correct:
+                mask |= 1 << option
+            choice_columns.append(position)
+            choice_masks.append(mask)
+            choice_options.append(len(question.get("options", [])))
+            choice_multi.append(question["type"] == "multi")
+
+    return AnswerKey(
+        quiz_id=str(quiz.id),
+        version=quiz.version,
+        title=quiz.title,
+        class_id=quiz.class_id,
+        is_published=bool(quiz.is_published),
+        time_limit_minutes=quiz.time_limit_minutes,
+        question_ids=tuple(question["id"] for question in questions),
+        points=np.array([float(q.get("points", 1.0)) for q in questions], dtype=np.float64),
+        choice_columns=np.array(choice_columns, dtype=np.int64),
+        choice_masks=np.array(choice_masks, dtype=np.uint64),
+        choice_options=tuple(choice_options),
+        choice_multi=tuple(choice_multi),
+        numeric_columns=np.array(numeric_columns, dtype=np.int64),
+        numeric_values=np.array(numeric_values, dtype=np.float64),
+        numeric_tolerances=np.array(numeric_tolerances, dtype=np.float64),
+    )
+
+
+def _multi_mask(value, options: int) -> int:
+    """Mask for a multi-select answer; 0 (never correct) when malformed"""
+    if not isinstance(value, list):
+        return 0
+    mask = 0
+    for option in value:
+        if type(option) is not int or not 0 <= option < options:
+            return 0
+        mask |= 1 << option
+    return mask
+
+
+def _choice_column(sheets: list[dict], question_id: str, options: int, multi: bool) -> np.ndarray:
+    """Submitted option masks for one question across a batch"""
+    values = [sheet.get(question_id) for sheet in sheets]
+    if multi:
+        return np.array([_multi_mask(v, options) for v in values], dtype=np.uint64)
+    # Single choice: shift in bulk; anything that is not an in-range int maps to mask 0
+    index = np.array([v if type(v) is int else -1 for v in values], dtype=np.int64)
+    valid = (index >= 0) & (index < options)
+    return np.where(valid, np.left_shift(np.uint64(1), np.where(valid, index, 0).astype(np.uint64)), 0)
+
+
+def _numeric_column(sheets: list[dict], question_id: str) -> np.ndarray:
+    values = [sheet.get(question_id) for sheet in sheets]
+    return np.array(
+        [v if type(v) is float or type(v) is int else np.nan for v in values],
+        dtype=np.float64,
+    )
+
+
+def grade_batch(key: AnswerKey, sheets: list[dict]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Grade many answer sheets ({question id: answer}) for one quiz at once.
+    Returns (scores, correct) where correct is a (sheets x questions) bool matrix.
+    """
+    correct = np.zeros((len(sheets), len(key.question_ids)), dtype=bool)
+
+    if len(key.choice_columns):
+        submitted = np.empty((len(sheets), len(key.choice_columns)), dtype=np.uint64)
+        for i, position in enumerate(key.choice_columns.tolist()):
+            submitted[:, i] = _choice_column(
+                sheets, key.question_ids[position], key.choice_options[i], key.choice_multi[i]
+            )
+        correct[:, key.choice_columns] = submitted == key.choice_masks
+
+    if len(key.numeric_columns):
+        submitted = np.empty((len(sheets), len(key.numeric_columns)), dtype=np.float64)
+        for i, position in enumerate(key.numeric_columns.tolist()):
+            submitted[:, i] = _numeric_column(sheets, key.question_ids[position])
+        with np.errstate(invalid="ignore"):
+            correct[:, key.numeric_columns] = (
+                np.abs(submitted - key.numeric_values) <= key.numeric_tolerances
+            )
+
+    return correct.astype(np.float64) @ key.points, correct
+
+
+class AnswerKeyCache:
+    """
+    Bounded LRU of compiled answer keys.
+
+    An entry is trusted for `ttl_seconds`; after that the quiz's version is
+    re-read and the key is recompiled only if it changed. Edits made through
+    this process invalidate the entry immediately.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[AnswerKey, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, quiz_id: str) -> Optional[AnswerKey]:
+        """The cached key if it is still trusted, without touching the database"""
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(quiz_id)
+                return entry[0]
+        return None
+
+    def get(self, db: Session, quiz_id: str) -> Optional[AnswerKey]:
+        key = self.peek(quiz_id)
+        if key is not None:
+            return key
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+
+        if entry is not None:
+            row = db.execute(
+                select(Quiz.version, Quiz.is_published).where(Quiz.id == quiz_id)
+            ).first()
+            if row is None:
+                self.invalidate(quiz_id)
+                return None
+            if row.version == entry[0].version and bool(row.is_published) == entry[0].is_published:
+                self._store(entry[0], now)
+                return entry[0]
+
+        quiz = db.get(Quiz, quiz_id)
+        if quiz is None:
+            return None
+        key = compile_key(quiz)
+        self._store(key, now)
+        return key
+
+    def _store(self, key: AnswerKey, now: float) -> None:
+        with self._lock:
+            self._entries[key.quiz_id] = (key, now + self.ttl_seconds)
+            self._entries.move_to_end(key.quiz_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, quiz_id: str) -> None:
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+
+answer_keys = AnswerKeyCache(
+    max_entries=settings.QUIZ_KEY_CACHE_SIZE,
+    ttl_seconds=settings.QUIZ_KEY_CACHE_TTL_SECONDS,
+)
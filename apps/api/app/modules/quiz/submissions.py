@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import quiz_grading_batch_seconds, quiz_submissions_total
+from app.db.dialect import dialect_insert
+from app.db.models.quiz import QuizAttempt, QuizSubmission
+from app.db.session import SessionLocal
+from app.modules.feed.timeline import feed_row, publish, timeline_cache
+from app.modules.quiz.grading import AnswerKey, grade_batch
+from app.modules.realtime.events import publish_quiz_results
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GradeResult:
+    status: str  # "graded", "already_submitted"
+    score: Optional[float] = None
+    max_score: Optional[float] = None
+
+
+@dataclass
+class _Pending:
+    key: AnswerKey
+    student_id: str
+    answers: dict
+    submitted_at: datetime
+    future: asyncio.Future
+
+
+class SubmissionBatcher:
+    """
+    Grades quiz submissions in batches and writes them together.
+
+    `submit()` queues a submission and waits for its result. Once `window`
+    seconds pass or `batch_size` submissions are queued, the batch is graded
+    per quiz with one vectorized pass over its compiled answer key and
+    written with a single multi-row INSERT ... ON CONFLICT DO NOTHING, which
+    turns a student's second submission into "already_submitted" even when
+    it arrived on another worker.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        window: float = 0.01,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.window = window
+        self.session_factory = session_factory
+        self._pending: list[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, key: AnswerKey, student_id: str, answers: dict) -> GradeResult:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(
+            _Pending(key, student_id, answers, datetime.now(timezone.utc), future)
+        )
+        if len(self._pending) >= self.batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._process(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, batch: list[_Pending]) -> None:
+        started = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(self.grade_and_write, batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} quiz submissions: {e}")
+            quiz_submissions_total.inc("failed", amount=len(batch))
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        quiz_grading_batch_seconds.observe(time.perf_counter() - started)
+        for item, result in zip(batch, results, strict=True):
+            quiz_submissions_total.inc("graded" if result.status == "graded" else "duplicate")
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def grade_and_write(self, batch: list[_Pending]) -> list[GradeResult]:
+        """Grade a batch and insert it; returns one result per submission, in order"""
+        # A student submitting twice within one batch keeps the first attempt
+        first: dict[tuple[str, str], int] = {}
+        groups: dict[tuple[str, int], list[int]] = {}
+        for position, item in enumerate(batch):
+            owner = (item.key.quiz_id, item.student_id)
+            if owner in first:
+                continue
+            first[owner] = position
+            groups.setdefault((item.key.quiz_id, item.key.version), []).append(position)
+
+        rows = []
+        scores: dict[int, float] = {}
+        for positions in groups.values():
+            key = batch[positions[0]].key
+            graded, _ = grade_batch(key, [batch[p].answers for p in positions])
+            max_score = key.max_score
+            for position, score in zip(positions, graded.tolist(), strict=True):
+                item = batch[position]
+                scores[position] = score
+                rows.append({
+                    "id": str(uuid.uuid4()),
+                    "quiz_id": key.quiz_id,
+                    "student_id": item.student_id,
+                    "class_id": key.class_id,
+                    "quiz_version": key.version,
+                    "answers": item.answers,
+                    "score": score,
+                    "max_score": max_score,
+                    "submitted_at": item.submitted_at,
+                })
+
+        titles = {item.key.quiz_id: item.key.title for item in batch}
+        inserted = self._write(rows, titles)
+        results = []
+        for position, item in enumerate(batch):
+            owner = (item.key.quiz_id, item.student_id)
+            if first[owner] == position and owner in inserted:
+                results.append(GradeResult("graded", scores[position], item.key.max_score))
+            else:
+                results.append(GradeResult("already_submitted"))
+        return results
+
+    def _write(self, rows: list[dict], titles: dict[str, str]) -> set[tuple[str, str]]:
+        """
+        Insert submissions, drop their autosave checkpoints, post the results
+        to each student's feed and push them to the class's live dashboards;
+        returns the new (quiz, student) pairs.
+        """
+        if not rows:
+            return set()
+        db = self.session_factory()
+        try:
+            table = QuizSubmission.__table__
+            statement = (
+                dialect_insert(db.get_bind(), table)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["quiz_id", "student_id"])
+                .returning(table.c.quiz_id, table.c.student_id)
+            )
+            inserted = {(row.quiz_id, row.student_id) for row in db.execute(statement)}
+            # Submitted attempts no longer need their autosave checkpoints
+            by_quiz: dict[str, list[str]] = {}
+            for quiz_id, student_id in inserted:
+                by_quiz.setdefault(quiz_id, []).append(student_id)
+            for quiz_id, student_ids in by_quiz.items():
+                db.execute(
+                    delete(QuizAttempt.__table__).where(
+                        QuizAttempt.quiz_id == quiz_id, QuizAttempt.student_id.in_(student_ids)
+                    )
+                )
+            results = [
+                feed_row(
+                    f"user:{row['student_id']}",
+                    "quiz_result",
+                    f"{titles[row['quiz_id']]} graded",
+                    data={"quiz_id": row["quiz_id"], "score": row["score"], "max_score": row["max_score"]},
+                    created_at=row["submitted_at"],
+                )
+                for row in rows
+                if (row["quiz_id"], row["student_id"]) in inserted
+            ]
+            publish(db, results)
+            totals = {
+                quiz_id: (submitted, average)
+                for quiz_id, submitted, average in db.execute(
+                    select(QuizSubmission.quiz_id, func.count(), func.avg(QuizSubmission.score))
+                    .where(QuizSubmission.quiz_id.in_(by_quiz))
+                    .group_by(QuizSubmission.quiz_id)
+                )
+            } if by_quiz else {}
+            db.commit()
+            timeline_cache.touch(result["audience"] for result in results)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        graded: dict[str, list[dict]] = {}
+        classes: dict[str, str] = {}
+        for row in rows:
+            if (row["quiz_id"], row["student_id"]) in inserted:
+                graded.setdefault(row["quiz_id"], []).append(
+                    {"student_id": row["student_id"], "score": row["score"]}
+                )
+                classes[row["quiz_id"]] = row["class_id"]
+        for quiz_id, submissions in graded.items():
+            submitted, average = totals[quiz_id]
+            publish_quiz_results(classes[quiz_id], quiz_id, submissions, submitted, float(average or 0.0))
+        return inserted
+
+    async def stop(self) -> None:
+        """Grade whatever is queued and wait for in-flight batches"""
+        self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+submission_batcher = SubmissionBatcher(
+    batch_size=settings.QUIZ_GRADING_BATCH_SIZE,
+    window=settings.QUIZ_GRADING_WINDOW_MS / 1000,
+)
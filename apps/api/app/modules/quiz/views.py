@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.quiz import Quiz
+from app.schemas.quiz import QuizDetail
+
+# Fields a student never sees
+_ANSWER_FIELDS = {"questions": {"__all__": {"answer", "tolerance"}}}
+
+
+def quiz_detail(quiz: Quiz) -> QuizDetail:
+    return QuizDetail(
+        id=str(quiz.id),
+        title=quiz.title,
+        class_id=quiz.class_id,
+        teacher_id=str(quiz.teacher_id),
+        version=quiz.version,
+        is_published=quiz.is_published,
+        time_limit_minutes=quiz.time_limit_minutes,
+        questions=quiz.questions or [],
+    )
+
+
+@dataclass(frozen=True)
+class QuizView:
+    """Both serialized forms of one quiz version"""
+
+    quiz_id: str
+    version: int
+    teacher_id: str
+    is_published: bool
+    student_body: bytes
+    teacher_body: bytes
+
+    @classmethod
+    def build(cls, quiz: Quiz) -> "QuizView":
+        detail = quiz_detail(quiz)
+        return cls(
+            quiz_id=detail.id,
+            version=detail.version,
+            teacher_id=detail.teacher_id,
+            is_published=detail.is_published,
+            student_body=detail.model_dump_json(exclude=_ANSWER_FIELDS).encode(),
+            teacher_body=detail.model_dump_json().encode(),
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.student_body) + len(self.teacher_body)
+
+    def body(self, with_answers: bool) -> bytes:
+        return self.teacher_body if with_answers else self.student_body
+
+    def etag(self, with_answers: bool) -> str:
+        return f'"{self.quiz_id}.{self.version}.{"t" if with_answers else "s"}"'
+
+
+class QuizViewCache:
+    """
+    Serialized quiz definitions, bounded by total size in bytes (LRU).
+
+    A cached view is served without touching the database for `ttl_seconds`;
+    after that one `SELECT version` decides whether it is still current.
+    Edits bump the version and invalidate the local entry, so other workers
+    pick them up within the TTL.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 30.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[QuizView, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, db: Session, quiz_id: str) -> Optional[QuizView]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(quiz_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        if entry is not None:
+            version = db.execute(select(Quiz.version).where(Quiz.id == quiz_id)).scalar()
+            if version == entry[0].version:
+                self._store(entry[0], now)
+                return entry[0]
+
+        quiz = db.get(Quiz, quiz_id)
+        if quiz is None:
+            self.invalidate(quiz_id)
+            return None
+        view = QuizView.build(quiz)
+        self._store(view, now)
+        return view
+
+    def _store(self, view: QuizView, now: float) -> None:
+        if view.size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(view.quiz_id)
+            self._entries[view.quiz_id] = (view, now + self.ttl_seconds)
+            self._bytes += view.size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def _remove(self, quiz_id: str) -> None:
+        entry = self._entries.pop(quiz_id, None)
+        if entry is not None:
+            self._bytes -= entry[0].size
+
+    def invalidate(self, quiz_id: str) -> None:
+        with self._lock:
+            self._remove(quiz_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+quiz_views = QuizViewCache(
+    max_bytes=settings.QUIZ_VIEW_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.QUIZ_VIEW_CACHE_TTL_SECONDS,
+)
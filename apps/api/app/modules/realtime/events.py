@@ -0,0 +1,57 @@
+from app.modules.realtime.hub import hub
+
+
+def class_channel(class_id: str) -> str:
+    return f"class:{class_id}"
+
+
+def publish_attendance(class_id: str, session_id: str, student_ids: list[str], present: int) -> None:
+    """New marks for a session, plus the session's head count as a coalescing snapshot"""
+    channel = class_channel(class_id)
+    hub.publish(channel, {
+        "type": "attendance.marked",
+        "class_id": class_id,
+        "session_id": session_id,
+        "student_ids": student_ids,
+    })
+    hub.publish(
+        channel,
+        {"type": "attendance.progress", "class_id": class_id, "session_id": session_id, "present": present},
+        coalesce_key=f"attendance.progress:{session_id}",
+    )
+
+
+def publish_session(class_id: str, session_id: str, is_open: bool) -> None:
+    hub.publish(class_channel(class_id), {
+        "type": "attendance.session_opened" if is_open else "attendance.session_closed",
+        "class_id": class_id,
+        "session_id": session_id,
+    })
+
+
+def publish_quiz_results(
+    class_id: str,
+    quiz_id: str,
+    results: list[dict],
+    submitted: int,
+    average: float,
+) -> None:
+    """Newly graded submissions, plus submission count and mean score as a coalescing snapshot"""
+    channel = class_channel(class_id)
+    hub.publish(channel, {
+        "type": "quiz.submitted",
+        "class_id": class_id,
+        "quiz_id": quiz_id,
+        "submissions": results,
+    })
+    hub.publish(
+        channel,
+        {
+            "type": "quiz.progress",
+            "class_id": class_id,
+            "quiz_id": quiz_id,
+            "submitted": submitted,
+            "average_score": average,
+        },
+        coalesce_key=f"quiz.progress:{quiz_id}",
+    )
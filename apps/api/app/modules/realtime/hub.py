@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from app.core.config import settings
+from app.core.metrics import realtime_events_dropped_total, realtime_events_published_total
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """
+    One connected dashboard: a bounded queue of serialized events.
+
+    Events published with a coalesce key are snapshots (e.g. how many
+    students are present), so a pending event with the same key is replaced
+    instead of queued behind. Other events are dropped oldest-first once
+    `max_queue` are pending, and the next batch the client reads starts with
+    an "overflow" event saying how many it missed, so it can resync over REST.
+    """
+
+    def __init__(self, channels: Iterable[str], max_queue: int = 256):
+        self.channels = frozenset(channels)
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._pending: OrderedDict[Any, str] = OrderedDict()
+        self._ids = itertools.count()
+        self._ready = asyncio.Event()
+
+    def offer(self, payload: str, coalesce_key: Optional[str] = None) -> None:
+        """Queue an event; must run on the event loop"""
+        if coalesce_key is not None and coalesce_key in self._pending:
+            del self._pending[coalesce_key]
+        elif len(self._pending) >= self.max_queue:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+            realtime_events_dropped_total.inc()
+        self._pending[coalesce_key if coalesce_key is not None else next(self._ids)] = payload
+        self._ready.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> list[str]:
+        """Wait for events and take all pending ones; [] when `timeout` passes first"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        if self.dropped:
+            batch.insert(0, json.dumps({"type": "overflow", "dropped": self.dropped}))
+            self.dropped = 0
+        return batch
+
+
+class LocalPubSub:
+    """In-process stand-in for RedisPubSub: events only reach this worker's subscribers"""
+
+    def __init__(self):
+        self._deliver = None
+
+    async def start(self, deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, channel: str, message: str) -> None:
+        self._deliver(channel, message)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class RedisPubSub:
+    """Fans events out to every worker through Redis PUBLISH on "events:<channel>" """
+
+    PREFIX = "events:"
+
+    def __init__(self, client):
+        self.client = client
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{self.PREFIX}*")
+        self._task = asyncio.create_task(self._listen(deliver))
+
+    async def _listen(self, deliver) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] == "pmessage":
+                        deliver(message["channel"][len(self.PREFIX):], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Realtime pub/sub listener failed, retrying: {e}")
+                await asyncio.sleep(1.0)
+
+    async def publish(self, channel: str, message: str) -> None:
+        await self.client.publish(f"{self.PREFIX}{channel}", message)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+class BroadcastHub:
+    """
+    Routes events to subscribers by channel ("class:<class id>", ...).
+
+    Each event is serialized once and the same string is queued for every
+    subscriber, so fan-out to thousands of dashboards is a dict lookup and
+    a queue append per subscriber. `publish()` may be called from any thread;
+    the event goes through the pub/sub backend so subscribers on every
+    worker receive it.
+    """
+
+    def __init__(self, backend, max_queue: int = 256):
+        self.backend = backend
+        self.max_queue = max_queue
+        self._channels: dict[str, set[Subscriber]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The loop only keeps weak references to tasks; hold in-flight sends here
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def subscribers(self) -> int:
+        return len(set().union(*self._channels.values())) if self._channels else 0
+
+    def subscribe(self, channels: Iterable[str]) -> Subscriber:
+        subscriber = Subscriber(channels, self.max_queue)
+        for channel in subscriber.channels:
+            self._channels.setdefault(channel, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for channel in subscriber.channels:
+            members = self._channels.get(channel)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self._channels[channel]
+
+    def _deliver(self, channel: str, message: str) -> None:
+        members = self._channels.get(channel)
+        if not members:
+            return
+        envelope = json.loads(message)
+        payload, coalesce_key = envelope["event"], envelope.get("coalesce")
+        for subscriber in list(members):
+            subscriber.offer(payload, coalesce_key)
+
+    def publish(self, channel: str, event: dict, coalesce_key: Optional[str] = None) -> None:
+        """Send an event to a channel's subscribers on every worker; safe from any thread"""
+        if self._loop is None:
+            return
+        message = json.dumps({"event": json.dumps(event, default=str), "coalesce": coalesce_key})
+        realtime_events_published_total.inc(event.get("type", ""))
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._start_send(channel, message)
+        else:
+            self._loop.call_soon_threadsafe(self._start_send, channel, message)
+
+    def _start_send(self, channel: str, message: str) -> None:
+        task = asyncio.get_running_loop().create_task(self._send(channel, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, channel: str, message: str) -> None:
+        try:
+            await self.backend.publish(channel, message)
+        except Exception as e:
+            logger.error(f"Could not publish realtime event to {channel}: {e}")
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.backend.start(self._deliver)
+
+    async def stop(self) -> None:
+        self._loop = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.backend.stop()
+
+
+def _create_backend():
+    client = get_redis()
+    return RedisPubSub(client) if client is not None else LocalPubSub()
+
+
+hub = BroadcastHub(_create_backend(), max_queue=settings.REALTIME_QUEUE_SIZE)
@@ -0,0 +1 @@
+# User management
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class SessionCreate(BaseModel):
+    class_id: str
+    title: str
+    # Defaults to now
+    starts_at: Optional[datetime] = None
+    duration_minutes: int = Field(default=60, ge=1, le=480)
+
+
+class SessionResponse(BaseModel):
+    id: str
+    class_id: str
+    title: str
+    teacher_id: str
+    starts_at: datetime
+    ends_at: datetime
+    is_open: bool
+
+    class Config:
+        from_attributes = True
+
+
+class QrCodeResponse(BaseModel):
+    session_id: str
+    token: str
+    # Unix time at which the next code replaces this one
+    refresh_at: float
+    rotate_seconds: int
+
+
+class MarkRequest(BaseModel):
+    token: str
+
+
+class MarkResponse(BaseModel):
+    session_id: str
+    status: str  # "marked", "already_marked"
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -23,6 +24,14 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 
+class SessionResponse(BaseModel):
+    id: str
+    created_at: datetime
+    last_refreshed_at: Optional[datetime] = None
+    # The session this request's refresh token belongs to
+    current: bool = False
+
+
 class UserResponse(BaseModel):
     id: str
     email: EmailStr
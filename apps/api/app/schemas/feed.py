@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class FeedItemResponse(BaseModel):
+    id: str
+    audience: str
+    kind: str
+    actor_id: Optional[str] = None
+    title: str
+    body: Optional[str] = None
+    data: dict[str, Any] = {}
+    created_at: datetime
+
+
+class FeedPage(BaseModel):
+    items: list[FeedItemResponse]
+    # Pass back as `cursor` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class AnnouncementCreate(BaseModel):
+    # "class" needs class_id; "school" and "staff" are for principals
+    audience: Literal["class", "school", "staff"] = "class"
+    class_id: Optional[str] = None
+    title: str = Field(min_length=1, max_length=200)
+    body: Optional[str] = Field(default=None, max_length=10000)
+
+    @model_validator(mode="after")
+    def check_class(self) -> "AnnouncementCreate":
+        if (self.audience == "class") != (self.class_id is not None):
+            raise ValueError("class_id is required for, and only for, class announcements")
+        return self
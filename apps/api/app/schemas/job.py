@@ -0,0 +1,58 @@
+from datetime import date, datetime
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LearningGapJobParams(BaseModel):
+    pass
+
+
+class RollupRebuildJobParams(BaseModel):
+    # Rebuild from the week containing this day; everything when omitted
+    since: Optional[date] = None
+
+
+class ExportJobParams(BaseModel):
+    report: Literal["attendance", "grades"]
+    format: Literal["csv", "xlsx"] = "csv"
+    start: Optional[date] = None
+    end: Optional[date] = None
+    class_ids: Optional[list[str]] = None
+
+
+JOB_PARAMS = {
+    "learning_gaps": LearningGapJobParams,
+    "rollup_rebuild": RollupRebuildJobParams,
+    "export": ExportJobParams,
+}
+
+
+class JobCreate(BaseModel):
+    kind: Literal["learning_gaps", "rollup_rebuild", "export"]
+    params: dict[str, Any] = Field(default_factory=dict)
+    # Higher runs first
+    priority: int = Field(default=0, ge=-100, le=100)
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    params: dict
+    status: str  # "queued", "running", "succeeded", "failed", "cancelled"
+    priority: int
+    attempts: int
+    max_attempts: int
+    progress: float
+    message: Optional[str] = None
+    result: Optional[dict] = None
+    artifact: Optional[str] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    run_after: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
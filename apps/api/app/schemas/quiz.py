@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import Literal, Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+# Choice answers are compiled to 64-bit option masks
+MAX_OPTIONS = 64
+
+
+class QuizQuestion(BaseModel):
+    id: str
+    type: Literal["mcq", "multi", "numeric"]
+    prompt: str
+    options: list[str] = []
+    # mcq: index of the correct option; multi: indices of every correct option; numeric: the value
+    answer: Union[int, list[int], float]
+    # numeric only: accepted absolute difference
+    tolerance: float = Field(default=0.0, ge=0)
+    points: float = Field(default=1.0, gt=0)
+
+    @model_validator(mode="after")
+    def check_answer(self) -> "QuizQuestion":
+        if self.type == "numeric":
+            if isinstance(self.answer, list):
+                raise ValueError(f"question {self.id}: numeric answer must be a number")
+            return self
+        if not 2 <= len(self.options) <= MAX_OPTIONS:
+            raise ValueError(f"question {self.id}: needs 2 to {MAX_OPTIONS} options")
+        correct = self.answer if isinstance(self.answer, list) else [self.answer]
+        if self.type == "mcq" and isinstance(self.answer, list):
+            raise ValueError(f"question {self.id}: mcq answer must be one option index")
+        if not correct or any(
+            not isinstance(i, int) or not 0 <= i < len(self.options) for i in correct
+        ):
+            raise ValueError(f"question {self.id}: answer must index into options")
+        return self
+
+
+class QuizCreate(BaseModel):
+    title: str
+    class_id: str
+    questions: list[QuizQuestion] = Field(min_length=1)
+    time_limit_minutes: Optional[int] = Field(default=None, ge=1)
+    is_published: bool = False
+
+    @model_validator(mode="after")
+    def check_question_ids(self) -> "QuizCreate":
+        ids = [question.id for question in self.questions]
+        if len(ids) != len(set(ids)):
+            raise ValueError("question ids must be unique")
+        return self
+
+
+class QuizUpdate(QuizCreate):
+    pass
+
+
+class QuizSummary(BaseModel):
+    id: str
+    title: str
+    class_id: str
+    teacher_id: str
+    version: int
+    is_published: bool
+    time_limit_minutes: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class QuizQuestionView(BaseModel):
+    id: str
+    type: str
+    prompt: str
+    options: list[str] = []
+    points: float = 1.0
+    # Omitted for students
+    answer: Optional[Union[int, list[int], float]] = None
+    tolerance: Optional[float] = None
+
+
+class QuizDetail(QuizSummary):
+    questions: list[QuizQuestionView]
+
+
+# Answer to one question: option index, list of option indices, or number
+Answer = Union[int, float, list[int], None]
+
+
+class QuizSubmitRequest(BaseModel):
+    # Merged over the autosaved answers, if the attempt was started
+    answers: dict[str, Answer] = {}
+
+
+class AttemptResponse(BaseModel):
+    quiz_id: str
+    quiz_version: int
+    started_at: datetime
+    # None for untimed quizzes
+    deadline: Optional[datetime] = None
+    seq: int
+    answers: dict[str, Answer]
+
+
+class AutosaveRequest(BaseModel):
+    # Increases with every save of the attempt; retried or reordered saves are ignored
+    seq: int = Field(ge=1)
+    # Only the questions changed since the last save; null clears an answer
+    answers: dict[str, Answer]
+
+
+class AutosaveResponse(BaseModel):
+    seq: int
+
+
+class QuizSubmitResponse(BaseModel):
+    quiz_id: str
+    status: str  # "graded", "already_submitted"
+    score: Optional[float] = None
+    max_score: Optional[float] = None
+
+
+class QuizSubmissionResponse(BaseModel):
+    student_id: str
+    quiz_version: int
+    score: float
+    max_score: float
+    submitted_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,52 @@
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ClassAttendanceSummary(BaseModel):
+    class_id: str
+    sessions: int
+    marks: int
+    # Distinct students marked present at least once in the range
+    students: int
+    attendance_rate: Optional[float] = None
+
+
+class AttendancePeriod(BaseModel):
+    period_start: date
+    sessions: int
+    marks: int
+
+
+class ClassAttendanceSeries(BaseModel):
+    class_id: str
+    period: str
+    points: list[AttendancePeriod]
+
+
+class StudentAttendanceSummary(BaseModel):
+    student_id: str
+    full_name: Optional[str] = None
+    class_id: str
+    attended: int
+    sessions: int
+    attendance_rate: Optional[float] = None
+
+
+class LearningGapAlertResponse(BaseModel):
+    id: str
+    student_id: str
+    class_id: str
+    kind: str
+    severity: str
+    details: dict
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class LearningGapRunResponse(BaseModel):
+    status: str  # "scheduled", "running"
+    job_id: Optional[str] = None
@@ -33,3 +33,15 @@ class User(UserInDBBase):
 
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+
+class BulkUserRow(BaseModel):
+    # Plain strings so a bad row is reported in the results instead of failing the upload
+    email: str
+    password: str
+    full_name: str
+    role: str
+
+
+class BulkRegisterRequest(BaseModel):
+    users: list[BulkUserRow]
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Rebuild the attendance rollup tables from raw sessions and marks.
+
+Rollups are maintained incrementally as marks are flushed; run this after
+restoring or editing raw attendance data, or once to populate the rollups for
+data recorded before they existed. With --since only the weeks from that
+date's Monday onwards are rebuilt.
+
+Run it while no marks are being flushed for the affected weeks, since marks
+committed during the rebuild may be counted twice.
+
+    python scripts/backfill_attendance_rollups.py --since 2026-09-01
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.models.base import Base  # noqa: E402
+from app.db.models.user import User  # noqa: E402,F401
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.modules.attendance.rollups import rebuild_rollups  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--since", type=date.fromisoformat, default=None,
+        help="Rebuild from the week containing this date (YYYY-MM-DD); default: everything",
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        result = rebuild_rollups(db, since=args.since)
+    finally:
+        db.close()
+    result["elapsed_s"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
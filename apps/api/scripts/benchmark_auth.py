@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Auth hot-path benchmark for EduEquity OS.
+
+Drives the FastAPI app in-process (no server, no network) against a scratch
+SQLite database or any DATABASE_URL, and measures throughput and latency
+percentiles for /auth/login, /auth/refresh, /auth/me and an authenticated
+no-op endpoint at a configurable concurrency.
+
+Results are written as JSON; with --baseline the run is compared against a
+previous result file and the script exits non-zero on regressions.
+
+    python scripts/benchmark_auth.py --concurrency 32 --requests 2000 \\
+        --output bench.json --baseline bench-baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+ENDPOINTS = ("login", "refresh", "me", "noop")
+PASSWORD = "benchmark-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--users", type=int, default=50, help="Seeded user accounts")
+    parser.add_argument(
+        "--endpoints", default=",".join(ENDPOINTS),
+        help=f"Comma-separated subset of {','.join(ENDPOINTS)}",
+    )
+    parser.add_argument(
+        "--database-url", default=None,
+        help="Database to benchmark against (default: a scratch SQLite file)",
+    )
+    parser.add_argument(
+        "--bcrypt-rounds", type=int, default=None,
+        help="Override BCRYPT_ROUNDS (login cost is dominated by it)",
+    )
+    parser.add_argument("--async-db", action="store_true", help="Run with DB_ASYNC enabled")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15,
+        help="Allowed relative slowdown before flagging a regression (default 0.15)",
+    )
+    return parser.parse_args()
+
+
+def configure_environment(args) -> str:
+    """Settings are read at import time, so this must run before importing app"""
+    database_url = args.database_url
+    if database_url is None:
+        scratch = tempfile.mkdtemp(prefix="eduequity-bench-")
+        database_url = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+    os.environ.setdefault("ACCESS_LOG_SLOW_MS", "1e9")
+    # Every simulated client shares one address and would hit the login limit
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    if args.async_db:
+        os.environ["DB_ASYNC"] = "true"
+    return database_url
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def seed_users(count: int) -> list[str]:
+    from app.core.security import get_password_hash
+    from app.db.models.base import Base
+    from app.db.models.user import User
+    from app.db.session import SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash(PASSWORD)
+    emails = [f"bench-{i}@example.com" for i in range(count)]
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email.in_(emails)).delete(synchronize_session=False)
+        db.add_all(
+            User(email=email, hashed_password=hashed, full_name=f"Bench {i}", role="student")
+            for i, email in enumerate(emails)
+        )
+        db.commit()
+    finally:
+        db.close()
+    return emails
+
+
+def install_noop_endpoint(app) -> None:
+    from fastapi import Depends
+
+    from app.core.dependencies import get_authenticated_user
+
+    @app.get("/api/v1/bench/noop")
+    async def bench_noop(user=Depends(get_authenticated_user)):
+        return {"ok": True}
+
+
+async def run_endpoint(client, name: str, total: int, concurrency: int, sessions: list) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    issued = 0
+
+    def build_request(session: dict):
+        if name == "login":
+            return "POST", "/api/v1/auth/login", {
+                "json": {"email": session["email"], "password": PASSWORD}
+            }
+        if name == "refresh":
+            return "POST", "/api/v1/auth/refresh", {
+                "json": {"refresh_token": session["refresh_token"]}
+            }
+        headers = {"Authorization": f"Bearer {session['access_token']}"}
+        path = "/api/v1/auth/me" if name == "me" else "/api/v1/bench/noop"
+        return "GET", path, {"headers": headers}
+
+    async def timed_request(session: dict):
+        method, path, kwargs = build_request(session)
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        return response
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < total:
+            session = sessions[issued % len(sessions)]
+            issued += 1
+            if name == "refresh":
+                # Each refresh rotates the session's token, so refreshes of one
+                # session go one at a time and always send the latest token
+                async with session["lock"]:
+                    response = await timed_request(session)
+                    rotated = response.cookies.get("refresh_token")
+                    if rotated:
+                        session["refresh_token"] = rotated
+            else:
+                response = await timed_request(session)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def run_benchmarks(args, endpoints: list[str]) -> dict:
+    import httpx
+
+    from app.main import app
+
+    install_noop_endpoint(app)
+    await app.router.startup()
+    try:
+        emails = seed_users(args.users)
+        # Never store cookies: every request authenticates with exactly what it sends
+        jar = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        async with httpx.AsyncClient(
+            app=app, base_url="http://bench", cookies=jar
+        ) as client:
+            sessions = []
+            for email in emails:
+                response = await client.post(
+                    "/api/v1/auth/login", json={"email": email, "password": PASSWORD}
+                )
+                response.raise_for_status()
+                sessions.append({
+                    "email": email,
+                    "access_token": response.json()["access_token"],
+                    "refresh_token": response.cookies.get("refresh_token"),
+                    "lock": asyncio.Lock(),
+                })
+
+            results = {}
+            for name in endpoints:
+                print(f"  {name:<8} ...", end="", flush=True)
+                results[name] = await run_endpoint(
+                    client, name, args.requests, args.concurrency, sessions
+                )
+                r = results[name]
+                print(
+                    f" {r['throughput_rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}ms"
+                    f"  p95 {r['p95_ms']:>8.2f}ms  p99 {r['p99_ms']:>8.2f}ms"
+                    f"  errors {r['errors']}"
+                )
+            return results
+    finally:
+        await app.router.shutdown()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every endpoint that regressed beyond tolerance"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms"
+            )
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput_rps']:.1f} -> "
+                f"{current['throughput_rps']:.1f} req/s"
+            )
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        print(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        return 2
+
+    database_url = configure_environment(args)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.core.config import settings
+
+    print(f"Benchmarking against {database_url}")
+    print(
+        f"  concurrency={args.concurrency} requests={args.requests} users={args.users}"
+        f" bcrypt_rounds={settings.BCRYPT_ROUNDS} async_db={settings.DB_ASYNC}"
+    )
+    results = asyncio.run(run_benchmarks(args, endpoints))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database_url.split("://", 1)[0],
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "users": args.users,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "async_db": settings.DB_ASYNC,
+        },
+        "endpoints": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%} against {args.baseline}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Time feed page fetches at increasing depths.
+
+Seeds a throwaway database with a deep class feed plus school-wide and
+personal items, then fetches pages deep into it with keyset cursors (the
+API's path) and, for comparison, with OFFSET. Cursor pages should take the
+same time at every depth; OFFSET pages grow with it.
+
+    python scripts/benchmark_feed.py
+    python scripts/benchmark_feed.py --items 1000000 --database-url postgresql://...
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.models.base import Base  # noqa: E402
+from app.db.models.feed import FeedItem  # noqa: E402
+from app.db.models.user import User  # noqa: E402
+from app.modules.feed.timeline import (  # noqa: E402
+    audiences_for,
+    encode_cursor,
+    feed_row,
+    fetch_page,
+    publish,
+)
+
+
+def seed(db, items: int, classes: int) -> None:
+    start = datetime.now(timezone.utc) - timedelta(seconds=items)
+    audiences = [f"class:class-{i}" for i in range(classes)] + ["school", "user:reader"]
+    chunk = []
+    for i in range(items):
+        # Half the items land in class-0, the one the reader follows
+        audience = "class:class-0" if i % 2 else audiences[i % len(audiences)]
+        chunk.append(feed_row(audience, "announcement", f"Item {i}", created_at=start + timedelta(seconds=i)))
+        if len(chunk) == 10000:
+            publish(db, chunk)
+            chunk = []
+    publish(db, chunk)
+    db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, default=300000)
+    parser.add_argument("--classes", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default="", help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/feed-benchmark.db"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine, tables=[User.__table__, FeedItem.__table__])
+    db = sessionmaker(bind=engine)()
+
+    started = time.perf_counter()
+    seed(db, args.items, args.classes)
+    seed_s = time.perf_counter() - started
+
+    audiences = audiences_for("reader", "student", ["class-0"])
+    order = (FeedItem.created_at.desc(), FeedItem.id.desc())
+    visible = select(FeedItem.created_at, FeedItem.id).where(FeedItem.audience.in_(audiences))
+    total = db.query(FeedItem).filter(FeedItem.audience.in_(audiences)).count()
+
+    results = []
+    depth = 0
+    while depth < total:
+        anchor = db.execute(visible.order_by(*order).offset(depth).limit(1)).first() if depth else None
+        cursor = encode_cursor(anchor.created_at, anchor.id) if anchor else None
+        keyset_s = timed(lambda cursor=cursor: fetch_page(db, audiences, args.page_size, cursor), args.repeat)
+        offset_s = timed(
+            lambda depth=depth: db.execute(
+                select(FeedItem).where(FeedItem.audience.in_(audiences))
+                .order_by(*order).offset(depth).limit(args.page_size)
+            ).all(),
+            args.repeat,
+        )
+        results.append({
+            "depth": depth,
+            "cursor_ms": round(keyset_s * 1000, 3),
+            "offset_ms": round(offset_s * 1000, 3),
+        })
+        depth = depth * 10 if depth else 100
+
+    print(json.dumps({"items": args.items, "visible": total, "seed_s": round(seed_s, 1), "pages": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
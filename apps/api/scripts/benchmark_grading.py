@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Measure quiz grading throughput on one core.
+
+Grades synthetic submissions for a quiz mixing single-choice, multi-select
+and numeric questions, in batches the size the API uses, and compares the
+compiled, vectorized grader with grading each submission in plain Python.
+Nothing is written to the database.
+
+    python scripts/benchmark_grading.py
+    python scripts/benchmark_grading.py --submissions 200000 --questions 40
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+# Keep numpy on one core so the numbers are per core
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.modules.quiz.grading import compile_key, grade_batch  # noqa: E402
+
+
+def synthetic_quiz(questions: int, rng: random.Random) -> SimpleNamespace:
+    items = []
+    for i in range(questions):
+        kind = ("mcq", "multi", "numeric")[i % 3]
+        if kind == "numeric":
+            items.append({"id": f"q{i}", "type": kind, "answer": rng.uniform(0, 100),
+                          "tolerance": 0.5, "points": 2.0})
+        else:
+            options = rng.randint(4, 6)
+            answer = rng.randrange(options) if kind == "mcq" else sorted(
+                rng.sample(range(options), rng.randint(1, options - 1))
+            )
+            items.append({"id": f"q{i}", "type": kind, "options": ["x"] * options,
+                          "answer": answer, "points": 1.0})
+    return SimpleNamespace(id="bench", version=1, title="Benchmark quiz", class_id="class-1", is_published=True,
+                           time_limit_minutes=None, questions=items)
+
+
+def synthetic_sheets(quiz, count: int, rng: random.Random) -> list[dict]:
+    sheets = []
+    for _ in range(count):
+        sheet = {}
+        for question in quiz.questions:
+            if rng.random() < 0.05:
+                continue  # left blank
+            right = rng.random() < 0.7
+            if question["type"] == "numeric":
+                sheet[question["id"]] = question["answer"] + (rng.uniform(-0.4, 0.4) if right else 5.0)
+            elif question["type"] == "mcq":
+                options = len(question["options"])
+                sheet[question["id"]] = question["answer"] if right else (question["answer"] + 1) % options
+            else:
+                # A wrong multi-select answer also ticks one incorrect option
+                extra = min(set(range(len(question["options"]))) - set(question["answer"]))
+                sheet[question["id"]] = question["answer"] if right else question["answer"] + [extra]
+        sheets.append(sheet)
+    return sheets
+
+
+def grade_naive(quiz, sheet: dict) -> float:
+    """Reference grader: walks the questions dict by dict"""
+    score = 0.0
+    for question in quiz.questions:
+        given = sheet.get(question["id"])
+        if given is None:
+            continue
+        if question["type"] == "numeric":
+            ok = isinstance(given, (int, float)) and abs(given - question["answer"]) <= question["tolerance"]
+        elif question["type"] == "mcq":
+            ok = given == question["answer"]
+        else:
+            ok = isinstance(given, list) and sorted(set(given)) == question["answer"]
+        if ok:
+            score += question["points"]
+    return score
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--submissions", type=int, default=100000)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=settings.QUIZ_GRADING_BATCH_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    quiz = synthetic_quiz(args.questions, rng)
+    sheets = synthetic_sheets(quiz, args.submissions, rng)
+
+    started = time.perf_counter()
+    key = compile_key(quiz)
+    compile_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = np.concatenate([
+        grade_batch(key, sheets[i:i + args.batch_size])[0]
+        for i in range(0, len(sheets), args.batch_size)
+    ])
+    vectorized_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    naive = np.array([grade_naive(quiz, sheet) for sheet in sheets])
+    naive_s = time.perf_counter() - started
+
+    if not np.allclose(vectorized, naive):
+        print("Graders disagree", file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        "submissions": args.submissions,
+        "questions": args.questions,
+        "batch_size": args.batch_size,
+        "compile_ms": round(compile_s * 1000, 3),
+        "vectorized_per_s": round(args.submissions / vectorized_s),
+        "naive_per_s": round(args.submissions / naive_s),
+        "speedup": round(naive_s / vectorized_s, 2),
+    }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -232,7 +232,7 @@ def test_refresh_token():
     print_header("Token Refresh Tests")
     
     tests_passed = 0
-    tests_total = 2
+    tests_total = 3
     
     # Login first
     try:
@@ -244,10 +244,10 @@ def test_refresh_token():
         passed = response.status_code == 200
         print_result("Login before refresh test", passed, response.text if not passed else "")
         if not passed:
-            return 0, 2
+            return 0, 3
     except Exception as e:
         print_result("Login before refresh test", False, str(e))
-        return 0, 2
+        return 0, 3
     
     # Test refresh
     try:
@@ -264,6 +264,21 @@ def test_refresh_token():
         print_result("Refresh token", False, str(e))
         tests_total -= 1
     
+    # Test refresh token is not accepted as an access token (should fail)
+    try:
+        refresh = session.cookies.get("refresh_token")
+        if refresh:
+            response = requests.get(f"{API_BASE}/auth/me", headers={"Authorization": f"Bearer {refresh}"})
+            passed = response.status_code == 401
+            tests_passed += 1 if passed else 0
+            print_result("Reject refresh token as Bearer", passed, response.text if not passed else "")
+        else:
+            print_result("Reject refresh token as Bearer", False, "No refresh token available")
+            tests_total -= 1
+    except Exception as e:
+        print_result("Reject refresh token as Bearer", False, str(e))
+        tests_total -= 1
+
     # Test refresh without token (should fail)
     try:
         # Create new session without cookies